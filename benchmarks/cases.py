@@ -0,0 +1,206 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Benchmark cases.  Each case has a base item count, multiplied by the scale
+# factor, and a setup function taking (items, context) that prepares the inputs
+# and returns the callable to be timed.  setup may raise Skip.  Cases marked
+# needs_db get context["config"], a config dict for the throwaway database.
+# Anything a setup opens is registered with _closing() and closed by the runner
+# once the case has been timed.  The database clients are singletons, so they
+# are opened once per run with _shared() and closed by the runner at the end.
+
+import types
+from collections import namedtuple
+
+import damage_assessment as DA
+import postgres as PG
+import scenario_db as DB
+import synthetic as SY
+
+Case = namedtuple("Case", ["name", "base", "needs_db", "setup", "description"])
+
+
+class Skip(Exception):
+    """The case cannot run in this environment; the message says why."""
+
+
+def _closing(context, resource):
+    context.setdefault("closers", []).append(resource.close)
+    return resource
+
+
+def _shared(context, key, open_resource):
+    if key not in context:
+        context[key] = open_resource()
+        context.setdefault("shared_closers", []).append(context[key].close)
+    return context[key]
+
+
+def _parsed(items):
+    return [DA.parse_damage_assessment(text) for text in SY.damage_messages(items)]
+
+
+def setup_damage_parse(items, context):
+    messages = SY.damage_messages(items)
+
+    def run():
+        for text in messages:
+            DA.parse_damage_assessment(text)
+
+    return run
+
+
+def setup_damage_validate(items, context):
+    dicts = [assessment.to_dict() for assessment in _parsed(items)]
+
+    def run():
+        for init_dict in dicts:
+            DA.DamageAssessment(init_dict)
+
+    return run
+
+
+def setup_damage_serialize(items, context):
+    assessments = _parsed(items)
+
+    def run():
+        for assessment in assessments:
+            assessment.to_json()
+            assessment.to_message_format()
+            assessment.to_row()
+
+    return run
+
+
+def _damage_connection(context):
+    database = _shared(context, "damage_db", lambda: DA.DamageDB(context["config"]))
+    if database.conn is None:
+        raise Skip("could not connect to the benchmark database")
+    if database.conn.info.dbname != PG.BENCH_DBNAME:
+        # Never write to (or truncate) anything but the throwaway database
+        raise Skip(f"damage database is {database.conn.info.dbname}, not {PG.BENCH_DBNAME}")
+    return database.conn
+
+
+def setup_damage_save(items, context):
+    connection = _damage_connection(context)
+    assessments = _parsed(items)
+
+    def run():
+        # Upserts, so repeats rewrite the same rows
+        for assessment in assessments:
+            assessment.save_to_database(connection)
+
+    return run
+
+
+def setup_damage_retrieve(items, context):
+    connection = _damage_connection(context)
+    with connection.cursor() as cursor:
+        cursor.execute("TRUNCATE damage")
+    connection.commit()
+    for assessment in _parsed(items):
+        assessment.save_to_database(connection)
+
+    def run():
+        DA.retrieve_from_database(connection)
+
+    return run
+
+
+def _scenario_database(context):
+    database = _shared(context, "scenario_db", lambda: DB.ScenarioDB(context["config"]))
+    if database.conn is None:
+        raise Skip("could not connect to the benchmark database")
+    return database
+
+
+def setup_load_assets(items, context):
+    database = _scenario_database(context)
+    assets = SY.bridge_assets(items)
+
+    def run():
+        database.load_assets(assets)
+
+    return run
+
+
+def _meshtastic_client(context, database, n_nodes):
+    try:
+        import meshtastic_client as MC
+    except ImportError as e:
+        raise Skip(f"meshtastic client dependencies are not installed: {e}")
+    interface = types.SimpleNamespace(nodes=SY.mesh_nodes(n_nodes), close=lambda: None)
+    config = {"meshtastic": {"log_level": "WARNING"}}
+    client = MC.MeshtasticClient(config, lambda data: None, database, interface=interface)
+    return _closing(context, client)
+
+
+def _node_count(items):
+    # One radio for every 20 packets, so the node table grows with the scale too
+    return max(1, items // 20)
+
+
+def setup_meshtastic_handlers(items, context):
+    # No database: position updates return at the missing cursor, leaving the
+    # prefilter, name lookup and callback building
+    client = _meshtastic_client(
+        context, types.SimpleNamespace(conn=None, cursor=None), _node_count(items)
+    )
+    packets = SY.mesh_packets(items, _node_count(items))
+    interface = client.meshtastic_interface
+
+    def run():
+        for packet in packets:
+            client._onReceive(packet, interface)
+
+    return run
+
+
+def setup_meshtastic_ingest(items, context):
+    client = _meshtastic_client(context, _scenario_database(context), _node_count(items))
+    packets = SY.mesh_packets(items, _node_count(items), mix=(1.0, 0.0, 0.0))
+    interface = client.meshtastic_interface
+
+    def run():
+        for packet in packets:
+            client._onReceive(packet, interface)
+
+    return run
+
+
+CASES = [
+    Case("damage.parse", 100, False, setup_damage_parse, "parse_damage_assessment per message"),
+    Case("damage.validate", 100, False, setup_damage_validate, "DamageAssessment(dict) per report"),
+    Case(
+        "damage.serialize",
+        100,
+        False,
+        setup_damage_serialize,
+        "to_json + to_message_format + to_row per report",
+    ),
+    Case("damage.save", 100, True, setup_damage_save, "save_to_database per report"),
+    Case(
+        "damage.retrieve",
+        100,
+        True,
+        setup_damage_retrieve,
+        "retrieve_from_database of the whole table, per row",
+    ),
+    Case("scenario.load_assets", 50, True, setup_load_assets, "ScenarioDB.load_assets per bridge"),
+    Case(
+        "meshtastic.handlers",
+        1000,
+        False,
+        setup_meshtastic_handlers,
+        "_onReceive per packet (60% position, 30% telemetry, 10% text), no database",
+    ),
+    Case(
+        "meshtastic.ingest",
+        200,
+        True,
+        setup_meshtastic_ingest,
+        "_onReceive per position packet, including the tracked asset writes",
+    ),
+]
@@ -0,0 +1,489 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Synthetic load for capacity planning.  Simulates a large incident against the
+# real MeshtasticClient and POPClient and steps the offered rate up until they
+# stop keeping up.
+#
+# Mesh: nodes move along random-walk tracks and send position, telemetry and
+# chat packets.  Packets are delivered to MeshtasticClient._onReceive on one
+# thread, as the meshtastic library's reader thread does, from a queue filled at
+# the offered rate plus periodic bursts.
+#
+# Mail: PackItForms damage reports are dropped into a local POP3 stand-in
+# server at the offered rate; a POPClient polls it like pop_client.main and each
+# report is parsed with parse_damage_assessment.
+#
+# A step "keeps up" when at least 95% of what was offered was handled and the
+# 95th percentile lag (offered to handled) is under --max-lag.
+#
+#   python benchmarks/load_generator.py mesh --nodes 500 --rates 50,100,200,400
+#   python benchmarks/load_generator.py mail --rates 1,5,20 --poll-interval 1
+#   python benchmarks/load_generator.py mesh --config config.json      also write positions to the database
+
+import argparse
+import json
+import logging
+import math
+import os
+import queue
+import random
+import socketserver
+import sys
+import threading
+import time
+import types
+from email.message import EmailMessage
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "src", "info-sources"))
+
+import damage_assessment as DA  # noqa: E402
+import synthetic as SY  # noqa: E402
+
+DEFAULT_DURATION = 10.0  # seconds per step
+DEFAULT_MAX_LAG = 2.0  # seconds
+KEEP_UP_FRACTION = 0.95
+TICK = 0.01  # pacing granularity, seconds
+
+METERS_PER_DEGREE = 111320.0
+
+
+class FakeInterface:
+    """Stands in for meshtastic's TCPInterface: just the node table."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def close(self):
+        pass
+
+
+class MeshTraffic:
+    """
+    Packets from n_nodes radios walking around the incident area.
+
+    Args:
+                                    n_nodes (int): Number of radios
+                                    mix (tuple): Fractions of position, telemetry and text packets
+                                    speed_mps (float): Walking speed in meters per second
+    """
+
+    def __init__(self, n_nodes, mix=(0.6, 0.3, 0.1), speed_mps=1.5, seed=0):
+        self.rng = random.Random(seed)
+        self.mix = mix
+        self.speed_mps = speed_mps
+        self.nodes = SY.mesh_nodes(n_nodes)
+        self.node_nums = [node["num"] for node in self.nodes.values()]
+        self.tracks = {}
+        for node_num in self.node_nums:
+            lat = self.rng.uniform(*SY.LAT_RANGE)
+            lon = self.rng.uniform(*SY.LON_RANGE)
+            self.tracks[node_num] = [lat, lon, self.rng.uniform(0, 2 * math.pi), time.time()]
+        self.sent = 0
+
+    def _move(self, node_num, now):
+        track = self.tracks[node_num]
+        lat, lon, heading, last = track
+        distance = self.speed_mps * (now - last) / METERS_PER_DEGREE
+        heading += self.rng.gauss(0, 0.3)
+        lat = min(max(lat + distance * math.cos(heading), SY.LAT_RANGE[0]), SY.LAT_RANGE[1])
+        lon = min(max(lon + distance * math.sin(heading), SY.LON_RANGE[0]), SY.LON_RANGE[1])
+        track[:] = [lat, lon, heading, now]
+        return lat, lon
+
+    def next_packet(self):
+        now = time.time()
+        node_num = self.rng.choice(self.node_nums)
+        self.sent += 1
+        packet = {
+            "id": self.rng.getrandbits(32),
+            "from": node_num,
+            "fromId": SY.node_id(node_num),
+            "to": 0xFFFFFFFF,
+            "toId": "^all",
+            "rxTime": int(now),
+            "hopLimit": 3,
+        }
+        kind = self.rng.random()
+        if kind < self.mix[0]:
+            lat, lon = self._move(node_num, now)
+            packet["decoded"] = {
+                "portnum": "POSITION_APP",
+                "position": {"latitude": lat, "longitude": lon, "altitude": 20, "time": int(now)},
+            }
+        elif kind < self.mix[0] + self.mix[1]:
+            packet["decoded"] = {
+                "portnum": "TELEMETRY_APP",
+                "telemetry": {
+                    "deviceMetrics": {
+                        "batteryLevel": self.rng.randint(0, 100),
+                        "uptimeSeconds": self.rng.randint(0, 86400),
+                    }
+                },
+            }
+        else:
+            packet["decoded"] = {
+                "portnum": "TEXT_MESSAGE_APP",
+                "payload": f"load test chat {self.sent}".encode("utf-8"),
+            }
+        return packet
+
+
+class _Pop3Handler(socketserver.StreamRequestHandler):
+    # Enough of RFC 1939 for poplib: USER/PASS, STAT, LIST, RETR, DELE, NOOP,
+    # RSET and QUIT.  Deletions take effect at QUIT, as on a real server.
+
+    def _send(self, line):
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        self._send("+OK load generator POP3 ready")
+        with server.lock:
+            snapshot = list(server.mailbox)
+        deleted = set()
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode("utf-8", errors="replace").strip().partition(" ")
+            command = command.upper()
+            if command in ("USER", "PASS", "NOOP"):
+                self._send("+OK")
+            elif command == "STAT":
+                live = [m for i, m in enumerate(snapshot) if i not in deleted]
+                self._send(f"+OK {len(live)} {sum(len(m) for m in live)}")
+            elif command == "LIST":
+                self._send(f"+OK {len(snapshot)} messages")
+                for i, message in enumerate(snapshot):
+                    if i not in deleted:
+                        self._send(f"{i + 1} {len(message)}")
+                self._send(".")
+            elif command in ("RETR", "DELE"):
+                try:
+                    index = int(argument) - 1
+                    message = snapshot[index]
+                except (ValueError, IndexError):
+                    self._send("-ERR no such message")
+                    continue
+                if command == "DELE":
+                    deleted.add(index)
+                    self._send("+OK")
+                    continue
+                # One write per response: line-at-a-time writes stall on Nagle's
+                # algorithm and would make the stand-in the bottleneck
+                response = [f"+OK {len(message)} octets".encode("utf-8")]
+                for body_line in message.split(b"\r\n"):
+                    # Byte-stuff lines that start with the terminator
+                    response.append(b"." + body_line if body_line.startswith(b".") else body_line)
+                response.append(b".")
+                self.wfile.write(b"\r\n".join(response) + b"\r\n")
+            elif command == "RSET":
+                deleted.clear()
+                self._send("+OK")
+            elif command == "QUIT":
+                with server.lock:
+                    gone = {id(snapshot[i]) for i in deleted}
+                    server.mailbox = [m for m in server.mailbox if id(m) not in gone]
+                self._send("+OK bye")
+                return
+            else:
+                self._send("-ERR unknown command")
+
+
+class Pop3StandIn(socketserver.ThreadingTCPServer):
+    """A local POP3 server with one shared mailbox, listening on 127.0.0.1."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super().__init__(("127.0.0.1", port), _Pop3Handler)
+        self.lock = threading.Lock()
+        self.mailbox = []
+        self.thread = threading.Thread(target=self.serve_forever, name="pop3-stand-in", daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def deliver(self, message_bytes):
+        with self.lock:
+            self.mailbox.append(message_bytes)
+
+    def pending(self):
+        with self.lock:
+            return len(self.mailbox)
+
+
+def damage_email(report_text, sent_at):
+    """Wrap a damage report in an email as Outpost would send it, stamped with sent_at."""
+    message = EmailMessage()
+    message["From"] = "k6aaa@example.org"
+    message["To"] = "damage@example.org"
+    message["Subject"] = "DA report"
+    message["X-Load-Sent-At"] = repr(sent_at)
+    message.set_content(report_text)
+    return message.as_bytes().replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+
+
+def _pace(emit, rate, duration, burst_size, burst_every):
+    """Call emit() rate times a second for duration seconds, plus burst_size every burst_every seconds."""
+    started = time.monotonic()
+    emitted = 0
+    next_burst = started + burst_every if burst_size and burst_every else None
+    while True:
+        now = time.monotonic()
+        elapsed = now - started
+        if elapsed >= duration:
+            break
+        for _ in range(int(elapsed * rate) - emitted):
+            emit()
+            emitted += 1
+        if next_burst is not None and now >= next_burst:
+            for _ in range(burst_size):
+                emit()
+            next_burst += burst_every
+        time.sleep(TICK)
+
+
+def _drain(pending, max_lag):
+    # Give the consumer up to max_lag to finish what was offered near the end of
+    # the step; anything still pending after that counts as backlog
+    deadline = time.monotonic() + max_lag
+    while pending() and time.monotonic() < deadline:
+        time.sleep(TICK)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def _step_result(rate, duration, offered, handled, lags, backlog, max_lag):
+    p95 = _percentile(lags, 0.95)
+    return {
+        "rate": rate,
+        "duration_s": duration,
+        "offered": offered,
+        "handled": handled,
+        "handled_per_s": handled / duration,
+        "backlog": backlog,
+        "p50_lag_s": _percentile(lags, 0.50),
+        "p95_lag_s": p95,
+        "max_lag_s": max(lags) if lags else None,
+        "keeping_up": offered > 0
+        and handled >= KEEP_UP_FRACTION * offered
+        and p95 is not None
+        and p95 < max_lag,
+    }
+
+
+def run_mesh_step(client, traffic, rate, duration, burst_size, burst_every, max_lag):
+    """Offer mesh packets at rate for duration seconds and measure how the client keeps up."""
+    pending = queue.SimpleQueue()
+    stop = threading.Event()
+    lags = []
+    counts = {"offered": 0, "handled": 0}
+    interface = client.meshtastic_interface
+
+    def emit():
+        pending.put((time.monotonic(), traffic.next_packet()))
+        counts["offered"] += 1
+
+    def consume():
+        while not stop.is_set():
+            try:
+                offered_at, packet = pending.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            client._onReceive(packet, interface)
+            lags.append(time.monotonic() - offered_at)
+            counts["handled"] += 1
+
+    consumer = threading.Thread(target=consume, name="mesh-consumer", daemon=True)
+    consumer.start()
+    _pace(emit, rate, duration, burst_size, burst_every)
+    _drain(pending.qsize, max_lag)
+    stop.set()
+    consumer.join()
+    return _step_result(
+        rate, duration, counts["offered"], counts["handled"], lags, pending.qsize(), max_lag
+    )
+
+
+def run_mail_step(config, server, rate, duration, burst_size, burst_every, poll_interval, max_lag):
+    """Deliver damage reports at rate for duration seconds while a POPClient polls them."""
+    import pop_client as PC
+
+    stop = threading.Event()
+    lags = []
+    counts = {"offered": 0, "handled": 0, "invalid": 0}
+    bursts = int(duration / burst_every) + 1 if burst_every else 0
+    reports = iter(SY.damage_messages(int(rate * duration) + burst_size * bursts + 1))
+    logger = PC.build_logger("WARNING")
+
+    def emit():
+        server.deliver(damage_email(next(reports), time.time()))
+        counts["offered"] += 1
+
+    def consume():
+        while not stop.is_set():
+            client = PC.POPClient(config, "load", "load", logger)
+            for message in client.messages():
+                try:
+                    DA.parse_damage_assessment(message["body"])
+                except ValueError:
+                    counts["invalid"] += 1
+                sent_at = message["headers"].get("X-Load-Sent-At")
+                if sent_at is not None:
+                    lags.append(time.time() - float(sent_at))
+                counts["handled"] += 1
+            stop.wait(poll_interval)
+
+    consumer = threading.Thread(target=consume, name="mail-consumer", daemon=True)
+    consumer.start()
+    _pace(emit, rate, duration, burst_size, burst_every)
+    _drain(lambda: counts["handled"] < counts["offered"], max_lag)
+    stop.set()
+    consumer.join()
+    result = _step_result(
+        rate, duration, counts["offered"], counts["handled"], lags, server.pending(), max_lag
+    )
+    result["invalid"] = counts["invalid"]
+    with server.lock:
+        server.mailbox = []
+    return result
+
+
+def _mesh_client(args):
+    import meshtastic_client as MC
+
+    if args.config:
+        import config as CF
+        import scenario_db as DB
+
+        config_repo = CF.Config()  # singleton
+        config_repo.load("main", args.config)
+        database = DB.ScenarioDB(config_repo.config("main"))
+    else:
+        # No cursor: position updates skip the database writes
+        database = types.SimpleNamespace(conn=None, cursor=None)
+    traffic = MeshTraffic(args.nodes, speed_mps=args.speed)
+    config = {"meshtastic": {"log_level": "WARNING"}}
+    client = MC.MeshtasticClient(
+        config, lambda data: None, database, interface=FakeInterface(traffic.nodes)
+    )
+    return client, traffic
+
+
+def _print_step(kind, result):
+    lag = result["p95_lag_s"]
+    print(
+        f"{kind:<5} {result['rate']:>8.1f}/s offered {result['offered']:>7} "
+        f"handled {result['handled']:>7} backlog {result['backlog']:>6} "
+        f"p95 lag {'-' if lag is None else f'{lag * 1000:.0f} ms':>9} "
+        f"{'ok' if result['keeping_up'] else 'FALLING BEHIND'}"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="load-generator")
+    ap.add_argument("kind", choices=("mesh", "mail"), help="Traffic to generate")
+    ap.add_argument(
+        "--rates",
+        required=True,
+        help="Comma-separated offered rates (per second), one step each, e.g. 50,100,200",
+    )
+    ap.add_argument(
+        "--duration",
+        type=float,
+        default=DEFAULT_DURATION,
+        help=f"Seconds per step (default: {DEFAULT_DURATION})",
+    )
+    ap.add_argument("--burst-size", type=int, default=0, help="Extra items per burst (default: 0)")
+    ap.add_argument(
+        "--burst-every", type=float, default=5.0, help="Seconds between bursts (default: 5)"
+    )
+    ap.add_argument(
+        "--max-lag",
+        type=float,
+        default=DEFAULT_MAX_LAG,
+        help=f"95th percentile lag in seconds above which a step is falling behind (default: {DEFAULT_MAX_LAG})",
+    )
+    ap.add_argument("--nodes", type=int, default=200, help="Mesh: number of radios (default: 200)")
+    ap.add_argument(
+        "--speed", type=float, default=1.5, help="Mesh: node speed in m/s (default: 1.5)"
+    )
+    ap.add_argument(
+        "--config",
+        help="Mesh: config file whose database receives the position updates (default: no database)",
+    )
+    ap.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Mail: seconds between POP polls, as in pop_client (default: 1)",
+    )
+    ap.add_argument("--output", help="Write the step results as JSON to this file")
+    ap.add_argument(
+        "--stop-when-behind",
+        action="store_true",
+        help="Stop at the first step that falls behind",
+    )
+    args = ap.parse_args()
+
+    logging.disable(logging.INFO)
+    rates = [float(rate) for rate in args.rates.split(",")]
+    results = []
+    server = None
+    try:
+        if args.kind == "mesh":
+            client, traffic = _mesh_client(args)
+        else:
+            server = Pop3StandIn().start()
+            config = {"pop": {"host": "127.0.0.1", "port": server.port}}
+        for rate in rates:
+            if args.kind == "mesh":
+                result = run_mesh_step(
+                    client, traffic, rate, args.duration, args.burst_size, args.burst_every, args.max_lag
+                )
+            else:
+                result = run_mail_step(
+                    config,
+                    server,
+                    rate,
+                    args.duration,
+                    args.burst_size,
+                    args.burst_every,
+                    args.poll_interval,
+                    args.max_lag,
+                )
+            results.append(result)
+            _print_step(args.kind, result)
+            if args.stop_when_behind and not result["keeping_up"]:
+                break
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"kind": args.kind, "steps": results}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,517 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Local stand-in for a Mattermost server, for latency and failure testing of
+# MattermostClient without a live Mattermost.  Implements the part of the v4 API
+# that mattermostdriver uses here:
+#
+#   GET  /users/me                              (token login)
+#   POST /users/login, /users/logout
+#   GET  /users/username/{username}
+#   GET  /users/{user_id}/teams
+#   GET  /users/{user_id}/teams/{team_id}/channels
+#   POST /posts
+#
+# Users, teams and channels, including the bridge bot's bridged channels, are
+# seeded from the "mattermost" section of a config file, so the daemon's own
+# config works against it unchanged apart from host and port.  Faults can be
+# injected: fixed plus random latency, a per-token rate limit answered with
+# HTTP 429 and X-RateLimit-*/Retry-After headers as Mattermost sends them, and
+# a fraction of requests failing with a chosen status.  Control endpoints,
+# outside the API basepath:
+#
+#   GET  /__mock/stats     requests by route and status, TCP connections, posts
+#   GET  /__mock/posts     the posts made so far
+#   POST /__mock/faults    change faults, e.g. {"latency": 0.2, "rate_limit": 5}
+#   POST /__mock/reset     clear stats and posts
+#
+#   python benchmarks/mock_mattermost.py --config config.json --port 8065 --latency 0.05 --rate-limit 10
+#   python benchmarks/mock_mattermost.py --config config.json --drive 100 --callsign k6aaa
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "src", "info-sources"))
+
+DEFAULT_PORT = 8065
+BASEPATH = "/api/v4"
+
+DEFAULT_FAULTS = {
+    "latency": 0.0,  # seconds added to every API request
+    "jitter": 0.0,  # up to this many more seconds, uniformly at random
+    "rate_limit": 0.0,  # requests per second per token; 0 for no limit
+    "burst": 10,  # requests a token may make at once before the rate limit applies
+    "fail_rate": 0.0,  # fraction of API requests that fail
+    "fail_status": 500,  # HTTP status of those failures
+    "fail_paths": "",  # only fail requests whose path starts with this (after the basepath)
+}
+
+ADMIN_TOKEN = "mock-admin-token"
+
+
+def _new_id():
+    # Mattermost IDs are 26 lowercase alphanumerics
+    return uuid.uuid4().hex[:26]
+
+
+class MockState:
+    """Users, teams, channels and posts, plus fault settings and request stats."""
+
+    def __init__(self, mattermost_config, faults=None):
+        self.lock = threading.Lock()
+        self.faults = dict(DEFAULT_FAULTS)
+        self.faults.update(faults or {})
+        self.users = {}  # id -> user
+        self.users_by_name = {}
+        self.tokens = {}  # token -> user id
+        self.teams = {}  # id -> team
+        self.channels = {}  # id -> channel
+        self.memberships = {}  # user id -> set of channel ids
+        self.posts = []
+        self.buckets = {}  # token -> [tokens available, last refill]
+        self.requests = Counter()
+        self.connections = 0
+
+        admin = self._add_user("admin")
+        self.tokens[mattermost_config.get("admin-token") or ADMIN_TOKEN] = admin["id"]
+        for entry in mattermost_config.get("users", []):
+            user = self._add_user(entry["callsign"].lower())
+            self.tokens[entry.get("token") or f"mock-{user['username']}"] = user["id"]
+            team = self._find_or_add(self.teams, entry.get("team", "Team"), team_id=None)
+            # Users also belong to any digest channel they may post to
+            digest_channel = mattermost_config.get("digest", {}).get("channel")
+            for channel_name in (entry.get("channel", "Channel"), entry.get("digest_channel"), digest_channel):
+                if channel_name:
+                    channel = self._find_or_add(self.channels, channel_name, team["id"])
+                    self.memberships.setdefault(user["id"], set()).add(channel["id"])
+        # The bridge bot (admin unless it has its own token) belongs to its bridged channels
+        bridge = mattermost_config.get("bridge", {})
+        bot = admin
+        if bridge.get("token"):
+            bot = self._add_user("bridge")
+            self.tokens[bridge["token"]] = bot["id"]
+        for entry in bridge.get("channels", []):
+            team = self._find_or_add(self.teams, entry.get("team", "Team"), team_id=None)
+            channel = self._find_or_add(self.channels, entry.get("channel", "Channel"), team["id"])
+            self.memberships.setdefault(bot["id"], set()).add(channel["id"])
+
+    def _add_user(self, username):
+        user = self.users_by_name.get(username)
+        if user is None:
+            user = {"id": _new_id(), "username": username, "roles": "system_user"}
+            self.users[user["id"]] = user
+            self.users_by_name[username] = user
+        return user
+
+    def _find_or_add(self, table, display_name, team_id):
+        for item in table.values():
+            if item["display_name"] == display_name and item.get("team_id") == team_id:
+                return item
+        item = {
+            "id": _new_id(),
+            "display_name": display_name,
+            "name": re.sub(r"[^a-z0-9]+", "-", display_name.lower()).strip("-"),
+        }
+        if team_id is not None:
+            item["team_id"] = team_id
+        table[item["id"]] = item
+        return item
+
+    def take_rate_token(self, token):
+        """Return 0 if the request may proceed, else the seconds until it may."""
+        rate = float(self.faults["rate_limit"])
+        if rate <= 0:
+            return 0
+        burst = max(1, int(self.faults["burst"]))
+        now = time.monotonic()
+        with self.lock:
+            available, last = self.buckets.get(token, (burst, now))
+            available = min(burst, available + (now - last) * rate)
+            if available >= 1:
+                self.buckets[token] = (available - 1, now)
+                return 0
+            self.buckets[token] = (available, now)
+            return (1 - available) / rate
+
+    def stats(self):
+        with self.lock:
+            return {
+                "connections": self.connections,
+                "requests": {key: count for key, count in sorted(self.requests.items())},
+                "total_requests": sum(self.requests.values()),
+                "posts": len(self.posts),
+                "faults": dict(self.faults),
+            }
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.connections = 0
+            self.posts = []
+            self.buckets = {}
+
+
+# Route patterns under the basepath, as (method, regex, handler name)
+ROUTES = [
+    ("GET", re.compile(r"^/users/me$"), "get_me"),
+    ("POST", re.compile(r"^/users/login$"), "login"),
+    ("POST", re.compile(r"^/users/logout$"), "logout"),
+    ("GET", re.compile(r"^/users/username/([^/]+)$"), "get_user_by_username"),
+    ("GET", re.compile(r"^/users/([a-z0-9]+)/teams$"), "get_user_teams"),
+    ("GET", re.compile(r"^/users/([a-z0-9]+)/teams/([a-z0-9]+)/channels$"), "get_channels_for_user"),
+    ("POST", re.compile(r"^/posts$"), "create_post"),
+]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive; every response sets Content-Length
+    protocol_version = "HTTP/1.1"
+    server_version = "MockMattermost/1.0"
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message, headers=None):
+        self._send_json(
+            status,
+            {"id": "mock.error", "message": message, "status_code": status},
+            headers,
+        )
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length == 0:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return None
+
+    def _token(self):
+        authorization = self.headers.get("Authorization", "")
+        if authorization.lower().startswith("bearer "):
+            return authorization[7:].strip()
+        return None
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        state = self.server.state
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/__mock/"):
+            return self._control(method, path)
+        if not path.startswith(BASEPATH + "/"):
+            return self._error(404, f"No route for {path}")
+        path = path[len(BASEPATH) :]
+
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            name, match = None, None
+        body = self._read_json() if method == "POST" else {}
+
+        faults = state.faults
+        delay = float(faults["latency"]) + random.uniform(0, float(faults["jitter"]))
+        if delay > 0:
+            time.sleep(delay)
+
+        token = self._token()
+        status = self._handle(state, method, path, name, match, body, token, faults)
+        with state.lock:
+            state.requests[f"{method} {name or path} {status}"] += 1
+
+    def _handle(self, state, method, path, name, match, body, token, faults):
+        if name is None:
+            self._error(404, f"No route for {method} {path}")
+            return 404
+        if body is None:
+            self._error(400, "Invalid JSON body")
+            return 400
+
+        if name != "login":
+            user_id = state.tokens.get(token)
+            if user_id is None:
+                self._error(401, "Invalid or expired session, please login again.")
+                return 401
+            wait = state.take_rate_token(token)
+            if wait > 0:
+                rate = float(faults["rate_limit"])
+                self._error(
+                    429,
+                    "Too many requests. Please try again later.",
+                    {
+                        "X-RateLimit-Limit": str(int(rate)),
+                        "X-RateLimit-Remaining": "0",
+                        "X-RateLimit-Reset": str(max(1, round(wait))),
+                        "Retry-After": str(max(1, round(wait))),
+                    },
+                )
+                return 429
+
+        if float(faults["fail_rate"]) > 0 and path.startswith(faults["fail_paths"] or "/"):
+            if random.random() < float(faults["fail_rate"]):
+                status = int(faults["fail_status"])
+                self._error(status, "Injected failure")
+                return status
+
+        return getattr(self, f"_api_{name}")(state, match, body, token)
+
+    def _api_get_me(self, state, match, body, token):
+        self._send_json(200, state.users[state.tokens[token]])
+        return 200
+
+    def _api_login(self, state, match, body, token):
+        user = state.users_by_name.get(str(body.get("login_id", "")).lower())
+        if user is None:
+            self._error(401, "Enter a valid email or username and/or password.")
+            return 401
+        # Any password is accepted; the session token is the user's configured one
+        session = next(t for t, user_id in state.tokens.items() if user_id == user["id"])
+        self._send_json(200, user, {"Token": session})
+        return 200
+
+    def _api_logout(self, state, match, body, token):
+        self._send_json(200, {"status": "OK"})
+        return 200
+
+    def _api_get_user_by_username(self, state, match, body, token):
+        user = state.users_by_name.get(match.group(1).lower())
+        if user is None:
+            self._error(404, "Unable to find an existing account matching your username.")
+            return 404
+        self._send_json(200, user)
+        return 200
+
+    def _api_get_user_teams(self, state, match, body, token):
+        channel_ids = state.memberships.get(match.group(1), set())
+        team_ids = {state.channels[channel_id]["team_id"] for channel_id in channel_ids}
+        self._send_json(200, [state.teams[team_id] for team_id in sorted(team_ids)])
+        return 200
+
+    def _api_get_channels_for_user(self, state, match, body, token):
+        user_id, team_id = match.groups()
+        channels = [
+            state.channels[channel_id]
+            for channel_id in sorted(state.memberships.get(user_id, set()))
+            if state.channels[channel_id]["team_id"] == team_id
+        ]
+        self._send_json(200, channels)
+        return 200
+
+    def _api_create_post(self, state, match, body, token):
+        channel_id = body.get("channel_id")
+        if channel_id not in state.channels:
+            self._error(400, "Invalid or missing channel_id in request body.")
+            return 400
+        post = {
+            "id": _new_id(),
+            "create_at": int(time.time() * 1000),
+            "user_id": state.tokens[token],
+            "channel_id": channel_id,
+            "message": body.get("message", ""),
+        }
+        with state.lock:
+            state.posts.append(post)
+        self._send_json(201, post)
+        return 201
+
+    def _control(self, method, path):
+        state = self.server.state
+        if method == "GET" and path == "/__mock/stats":
+            return self._send_json(200, state.stats())
+        if method == "GET" and path == "/__mock/posts":
+            with state.lock:
+                return self._send_json(200, list(state.posts))
+        if method == "POST" and path == "/__mock/faults":
+            body = self._read_json()
+            unknown = set(body or {}) - set(DEFAULT_FAULTS) if body is not None else None
+            if body is None or unknown:
+                return self._error(400, f"Unknown fault settings: {sorted(unknown or [])}")
+            with state.lock:
+                state.faults.update(body)
+            return self._send_json(200, dict(state.faults))
+        if method == "POST" and path == "/__mock/reset":
+            state.reset()
+            return self._send_json(200, {"status": "OK"})
+        return self._error(404, f"No route for {method} {path}")
+
+
+class MockMattermost(ThreadingHTTPServer):
+    """
+    The stand-in server.  start() serves on a background thread; client_config()
+    returns a config dict pointing MattermostClient at it.
+
+    Args:
+                                    mattermost_config (dict): "mattermost" config section to seed users, teams and channels
+                                    port (int): Port on 127.0.0.1; 0 picks a free one
+                                    faults (dict, optional): Overrides of DEFAULT_FAULTS
+    """
+
+    daemon_threads = True
+
+    def __init__(self, mattermost_config, port=0, faults=None):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.mattermost_config = mattermost_config
+        self.state = MockState(mattermost_config, faults)
+        self.thread = threading.Thread(target=self.serve_forever, name="mock-mattermost", daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def client_config(self):
+        section = dict(self.mattermost_config)
+        section.update(
+            {"host": "127.0.0.1", "scheme": "http", "port": self.port, "basepath": BASEPATH}
+        )
+        section.setdefault("admin-token", ADMIN_TOKEN)
+        return {"mattermost": section}
+
+
+def default_mattermost_config(n_users=5):
+    """A "mattermost" section with n_users callsigns, K6AAA..., in one team and channel."""
+    return {
+        "admin-token": ADMIN_TOKEN,
+        "users": [
+            {
+                "callsign": f"k6a{chr(ord('a') + i // 26)}{chr(ord('a') + i % 26)}",
+                "team": "Palo Alto OES",
+                "channel": "Field Reports",
+                "token": f"mock-token-{i}",
+            }
+            for i in range(n_users)
+        ],
+    }
+
+
+def drive(server, n_posts, callsign, timeout=60.0):
+    """
+    Make n_posts posts through MattermostClient, wait up to timeout seconds for
+    its outbox to drain, and return timing and request counts.
+    """
+    import logging
+    import mattermost_client as MM
+
+    logging.disable(logging.CRITICAL)
+    config = server.client_config()
+    # A private in-memory outbox, so a run never replays or leaves posts behind
+    config["mattermost"]["posting"] = dict(
+        config["mattermost"].get("posting", {}), outbox=":memory:"
+    )
+    client = MM.MattermostClient(config)
+    server.state.reset()
+    started = time.perf_counter()
+    for i in range(n_posts):
+        client._post(callsign, f"mock post {i}")
+    queued = time.perf_counter() - started
+    while len(client.poster.outbox) and time.perf_counter() - started < timeout:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    undelivered = len(client.poster.outbox)
+    client.close()
+    stats = server.state.stats()
+    return {
+        "posts_attempted": n_posts,
+        "posts_made": stats["posts"],
+        "posts_undelivered": undelivered,
+        "queue_ms_per_post": queued / n_posts * 1000,
+        "seconds": elapsed,
+        "ms_per_post": elapsed / n_posts * 1000,
+        "requests_per_post": stats["total_requests"] / n_posts,
+        "connections_per_post": stats["connections"] / n_posts,
+        "requests": stats["requests"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="mock-mattermost")
+    ap.add_argument(
+        "--config",
+        help="Config file whose mattermost section seeds users, teams and channels "
+        "(default: five users K6AAA..K6AAE in one team and channel)",
+    )
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    for name, default in DEFAULT_FAULTS.items():
+        ap.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=type(default),
+            default=default,
+            help=f"Fault setting (default: {default!r})",
+        )
+    ap.add_argument(
+        "--drive",
+        type=int,
+        metavar="N",
+        help="Instead of serving, make N posts through MattermostClient and print the costs",
+    )
+    ap.add_argument("--callsign", help="Callsign to post as with --drive (default: the first user)")
+    args = ap.parse_args()
+
+    if args.config:
+        with open(args.config) as f:
+            mattermost_config = json.load(f).get("mattermost", {})
+    else:
+        mattermost_config = default_mattermost_config()
+    faults = {name: getattr(args, name) for name in DEFAULT_FAULTS}
+
+    server = MockMattermost(mattermost_config, 0 if args.drive else args.port, faults)
+    if args.drive:
+        server.start()
+        try:
+            callsign = args.callsign or mattermost_config["users"][0]["callsign"]
+            print(json.dumps(drive(server, args.drive, callsign), indent=2))
+        finally:
+            server.stop()
+        return
+
+    print(f"✅ [Mock Mattermost] Serving {BASEPATH} on http://127.0.0.1:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🚨 [Mock Mattermost] Exiting.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
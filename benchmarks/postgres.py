@@ -0,0 +1,171 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# A throwaway PostgreSQL for the database benchmarks.  Either an existing server
+# is named with --dsn (the benchmark database is created and dropped there), or
+# initdb/pg_ctl on the PATH start a private cluster in a temporary directory on
+# a free port.  database/schema.sql is loaded in both cases, so the server needs
+# the PostGIS and TimescaleDB extensions available.
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import psycopg2
+from psycopg2 import extensions
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(REPO_ROOT, "database", "schema.sql")
+
+BENCH_DBNAME = "sa_benchmark"
+
+
+class Unavailable(Exception):
+    """No PostgreSQL could be found or started; database benchmarks are skipped."""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _dsn_params(dsn):
+    return extensions.parse_dsn(dsn)
+
+
+class ThrowawayPostgres:
+    """
+    Context manager yielding a config dict whose "database" and "damage" sections
+    both point at an empty benchmark database with the schema loaded.
+
+    Args:
+                                    dsn (str, optional): libpq connection string of an existing server to use
+    """
+
+    def __init__(self, dsn=None):
+        self.dsn = dsn
+        self.directory = None
+        self.params = None
+
+    def __enter__(self):
+        if self.dsn is not None:
+            self.params = _dsn_params(self.dsn)
+        else:
+            self._start_cluster()
+        try:
+            self._create_database()
+        except Exception:
+            self._stop_cluster()
+            raise
+        section = {
+            "dbname": BENCH_DBNAME,
+            "user": self.params.get("user", "postgres"),
+            "host": self.params.get("host", "localhost"),
+            "password": self.params.get("password", ""),
+            "port": int(self.params.get("port", 5432)),
+            "log_level": "WARNING",
+        }
+        # DamageDB reads "damage", ScenarioDB reads "database"
+        return {"database": dict(section), "damage": dict(section)}
+
+    def __exit__(self, *exc_info):
+        try:
+            self._drop_database()
+        finally:
+            self._stop_cluster()
+        return False
+
+    def _start_cluster(self):
+        for binary in ("initdb", "pg_ctl"):
+            if shutil.which(binary) is None:
+                raise Unavailable(f"{binary} is not on the PATH and no --dsn was given")
+        self.directory = tempfile.mkdtemp(prefix="sa-bench-pg-")
+        data = os.path.join(self.directory, "data")
+        port = _free_port()
+        try:
+            subprocess.run(
+                ["initdb", "-D", data, "-U", "postgres", "-A", "trust"],
+                check=True,
+                capture_output=True,
+            )
+            subprocess.run(
+                [
+                    "pg_ctl",
+                    "-D",
+                    data,
+                    "-l",
+                    os.path.join(self.directory, "server.log"),
+                    "-o",
+                    f"-p {port} -k {self.directory} -c listen_addresses=127.0.0.1 "
+                    "-c shared_preload_libraries=timescaledb -c fsync=off",
+                    "-w",
+                    "start",
+                ],
+                check=True,
+                capture_output=True,
+            )
+        except subprocess.CalledProcessError as e:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+            raise Unavailable(
+                f"Could not start a private cluster: {e.stderr.decode(errors='replace').strip()}"
+            )
+        self.params = {"user": "postgres", "host": "127.0.0.1", "port": port}
+
+    def _stop_cluster(self):
+        if self.directory is None:
+            return
+        subprocess.run(
+            ["pg_ctl", "-D", os.path.join(self.directory, "data"), "-m", "immediate", "stop"],
+            capture_output=True,
+        )
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory = None
+
+    def _admin_connection(self):
+        params = dict(self.params)
+        params.setdefault("dbname", "postgres")
+        try:
+            connection = psycopg2.connect(**params)
+        except psycopg2.OperationalError as e:
+            raise Unavailable(f"Could not connect to PostgreSQL: {e}")
+        connection.autocommit = True
+        return connection
+
+    def _create_database(self):
+        admin = self._admin_connection()
+        try:
+            with admin.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DBNAME}")
+                cursor.execute(f"CREATE DATABASE {BENCH_DBNAME}")
+        finally:
+            admin.close()
+        params = dict(self.params, dbname=BENCH_DBNAME)
+        connection = psycopg2.connect(**params)
+        try:
+            with open(SCHEMA_PATH) as f, connection.cursor() as cursor:
+                cursor.execute(f.read())
+            connection.commit()
+        except psycopg2.Error as e:
+            raise Unavailable(f"Could not load {SCHEMA_PATH}: {e}")
+        finally:
+            connection.close()
+
+    def _drop_database(self):
+        if self.params is None:
+            return
+        admin = self._admin_connection()
+        try:
+            with admin.cursor() as cursor:
+                # A connection a case failed to close would block the drop
+                cursor.execute(
+                    "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                    "WHERE datname = %s AND pid <> pg_backend_pid()",
+                    (BENCH_DBNAME,),
+                )
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DBNAME}")
+        finally:
+            admin.close()
@@ -0,0 +1,240 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# End-to-end benchmarks for the ingest and storage paths: damage report parsing,
+# validation, serialization, save and retrieval; tracked asset loading; and the
+# Meshtastic packet handlers.  Each case runs on synthetic data at several
+# scales and reports the median time per item.  Database cases run against a
+# throwaway PostgreSQL (see postgres.py) and are skipped if none is available.
+#
+#   python benchmarks/run.py                                  all cases at 1x, 10x, 100x
+#   python benchmarks/run.py --output baseline.json           save results
+#   python benchmarks/run.py --compare baseline.json          fail on a >10% per-item slowdown
+#   python benchmarks/run.py --case damage. --scales 1,10 --dsn "host=localhost user=postgres"
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "src", "info-sources"))
+
+import cases as BC  # noqa: E402
+import postgres as PG  # noqa: E402
+
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10
+
+
+def time_case(run, repeat):
+    """Run once to warm up, then repeat times; return the list of wall times in seconds."""
+    run()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _close(context, key, echo):
+    for close in reversed(context.pop(key, [])):
+        try:
+            close()
+        except Exception as e:
+            echo(f"❌ [Benchmark] Error closing a benchmark resource: {e}")
+
+
+def run_cases(selected, scales, repeat, dsn=None, echo=print):
+    """
+    Run the selected cases at each scale.
+
+    Returns:
+                                    dict: The results document written by --output; skipped cases are listed
+                                          with their reason under "skipped", and cases that raised under "errors"
+    """
+
+    results = []
+    skipped = []
+    errors = []
+    context = {}
+    database = None
+    if any(case.needs_db for case in selected):
+        try:
+            database = PG.ThrowawayPostgres(dsn)
+            context["config"] = database.__enter__()
+        except PG.Unavailable as e:
+            database = None
+            echo(f"🚨 [Benchmark] Skipping database cases: {e}")
+
+    try:
+        for case in selected:
+            if case.needs_db and database is None:
+                skipped.append({"case": case.name, "reason": "no database available"})
+                continue
+            for scale in scales:
+                items = case.base * scale
+                try:
+                    run = case.setup(items, context)
+                    timings = time_case(run, repeat)
+                except BC.Skip as e:
+                    skipped.append({"case": case.name, "reason": str(e)})
+                    echo(f"🚨 [Benchmark] Skipping {case.name}: {e}")
+                    break
+                except Exception as e:
+                    errors.append({"case": case.name, "scale": scale, "error": repr(e)})
+                    echo(f"❌ [Benchmark] {case.name} at {scale}x failed: {e}")
+                    break
+                finally:
+                    _close(context, "closers", echo)
+                median = statistics.median(timings)
+                result = {
+                    "case": case.name,
+                    "scale": scale,
+                    "items": items,
+                    "repeat": repeat,
+                    "best_s": min(timings),
+                    "median_s": median,
+                    "per_item_us": median / items * 1e6,
+                }
+                results.append(result)
+                echo(
+                    f"{case.name:<24} {scale:>4}x {items:>7} items "
+                    f"{median * 1000:>10.2f} ms {result['per_item_us']:>10.2f} us/item"
+                )
+    finally:
+        _close(context, "shared_closers", echo)
+        if database is not None:
+            try:
+                database.__exit__(None, None, None)
+            except Exception as e:
+                echo(f"❌ [Benchmark] Could not drop the benchmark database: {e}")
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": list(scales),
+        "results": results,
+        "skipped": skipped,
+        "errors": errors,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare per-item times against a baseline results document.
+
+    Returns:
+                                    list: One dict per (case, scale) present in both, with baseline_us,
+                                          current_us, ratio and regressed (ratio above 1 + threshold)
+    """
+
+    previous = {(r["case"], r["scale"]): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = previous.get((result["case"], result["scale"]))
+        if before is None:
+            continue
+        ratio = result["per_item_us"] / before["per_item_us"]
+        rows.append(
+            {
+                "case": result["case"],
+                "scale": result["scale"],
+                "baseline_us": before["per_item_us"],
+                "current_us": result["per_item_us"],
+                "ratio": ratio,
+                "regressed": ratio > 1.0 + threshold,
+            }
+        )
+    return rows
+
+
+def _format_comparison(rows):
+    lines = [f"{'case':<24} {'scale':>5} {'baseline us':>12} {'current us':>12} {'change':>8}"]
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        lines.append(
+            f"{row['case']:<24} {row['scale']:>4}x {row['baseline_us']:>12.2f} "
+            f"{row['current_us']:>12.2f} {row['ratio'] - 1.0:>+8.1%}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="benchmarks")
+    ap.add_argument(
+        "--scales",
+        default=",".join(str(scale) for scale in DEFAULT_SCALES),
+        help="Comma-separated scale factors (default: 1,10,100)",
+    )
+    ap.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Timed runs per case and scale (default: {DEFAULT_REPEAT})",
+    )
+    ap.add_argument(
+        "--case",
+        action="append",
+        help="Only run cases whose name starts with this; repeat for several",
+    )
+    ap.add_argument(
+        "--dsn",
+        help="Existing PostgreSQL to use, e.g. 'host=localhost user=postgres' "
+        "(default: start a private cluster with initdb)",
+    )
+    ap.add_argument("--output", help="Write the results as JSON to this file")
+    ap.add_argument("--compare", help="Baseline results file to compare against")
+    ap.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Per-item slowdown counted as a regression (default: {DEFAULT_THRESHOLD})",
+    )
+    ap.add_argument(
+        "--with-logging",
+        action="store_true",
+        help="Keep INFO logging on while timing (default: WARNING and above only)",
+    )
+    args = ap.parse_args()
+
+    if not args.with_logging:
+        logging.disable(logging.INFO)
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    selected = [
+        case
+        for case in BC.CASES
+        if not args.case or any(case.name.startswith(prefix) for prefix in args.case)
+    ]
+    if not selected:
+        ap.error(f"no case matches {args.case}")
+
+    current = run_cases(selected, scales, args.repeat, args.dsn)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(current, baseline, args.threshold)
+        print(_format_comparison(rows))
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+    if current["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
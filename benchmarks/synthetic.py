@@ -0,0 +1,183 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Deterministic synthetic inputs for the benchmarks: damage report messages,
+# bridge assets and Meshtastic packets shaped like the ones the daemons see.
+
+import random
+
+# Palo Alto, roughly; positions and bridges are scattered inside this box
+LAT_RANGE = (37.38, 37.47)
+LON_RANGE = (-122.19, -122.09)
+
+JURISDICTIONS = ("Palo Alto", "Mountain View", "Los Altos", "Menlo Park")
+STRUCTURES = ("Single Family", "Multi-Family", "Business", "Mobile Home")
+# Values the damage table CHECK constraints accept
+DAMAGE_CLASSES = ("Affected", "No Visible Damage", "Major", "Destroyed")
+TAGS = ("Green", "Yellow", "Red")
+
+DAMAGE_MESSAGE_TEMPLATE = """!SCCoPIFO!
+#T: form-damage-assessment.html
+#V: 3.20-1.0
+MsgNo: [{msg_no}]
+1a.: [{month:02d}/{day:02d}/2025]
+1b.: [{hour:02d}:{minute:02d}]
+5.: [ROUTINE]
+7a.: [Damage/Safety Assessment Group]
+8a.: [Developer]
+7b.: [Palo Alto]
+8b.: [Palo Alto]
+7c.: [Bob Iannucci]
+8c.: [Bob Iannucci]
+7d.: [Bob]
+8d.: [Bob]
+20.: [{jurisdiction}]
+21.: [Benchmark report {index}]
+22.: [{street_number} South Court]
+23.: [None]
+24.: [{structure}]
+25.: [{stories}]
+26.: [Own]
+27a.: [checked]
+28.: [N/A]
+29.: [{damage_class}]
+30.: [{tag}]
+31.: [No]
+32.: [{estimate}]
+33.: [Synthetic benchmark data]
+34.: [Bob Iannucci]
+35.: [6507141200]
+OpName: [Bob Iannucci]
+OpCall: [{op_call}]
+OpDate: [{month:02d}/{day:02d}/2025]
+OpTime: [{hour:02d}:{minute:02d}]
+!/ADDON!
+"""
+
+
+def _callsign(index):
+    # K6 plus a three-letter suffix spelled from index: K6AAA, K6AAB, ...
+    suffix = ""
+    for _ in range(3):
+        index, letter = divmod(index, 26)
+        suffix = chr(ord("A") + letter) + suffix
+    return f"K6{suffix}"
+
+
+def damage_messages(n, seed=0):
+    """Return n distinct damage report messages in the PackItForms text format."""
+    rng = random.Random(seed)
+    messages = []
+    for index in range(n):
+        messages.append(
+            DAMAGE_MESSAGE_TEMPLATE.format(
+                msg_no=f"BEN-{index:06d}M",
+                index=index,
+                month=rng.randint(1, 12),
+                day=rng.randint(1, 28),
+                hour=rng.randint(0, 23),
+                minute=rng.randint(0, 59),
+                jurisdiction=rng.choice(JURISDICTIONS),
+                street_number=rng.randint(100, 9999),
+                structure=rng.choice(STRUCTURES),
+                stories=rng.randint(1, 3),
+                damage_class=rng.choice(DAMAGE_CLASSES),
+                tag=rng.choice(TAGS),
+                estimate=rng.randint(0, 500) * 1000,
+                op_call=_callsign(index),
+            )
+        )
+    return messages
+
+
+def _point(rng):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+
+
+def bridge_assets(n, seed=0):
+    """Return n entries in the assets.json "assets" list format."""
+    rng = random.Random(seed)
+    assets = []
+    for index in range(n):
+        lat, lon = _point(rng)
+        assets.append(
+            {
+                "type": "bridge",
+                "asset_id": f"BRIDGE-BENCH-{index:05d}",
+                "description": f"Benchmark bridge {index}",
+                "location": {"lat": lat, "lon": lon},
+                "url": "",
+            }
+        )
+    return assets
+
+
+def node_id(node_num):
+    return f"!{node_num:08x}"
+
+
+def mesh_nodes(n_nodes, first_node=0x10000000):
+    """Return an interface.nodes style dict for n_nodes radios named K6Bnnn."""
+    nodes = {}
+    for index in range(n_nodes):
+        callsign = f"K6B{index:03d}"
+        nodes[node_id(first_node + index)] = {
+            "num": first_node + index,
+            "user": {"longName": f"{callsign} Benchmark", "shortName": callsign[-4:]},
+        }
+    return nodes
+
+
+def mesh_packets(n, n_nodes, mix=(0.6, 0.3, 0.1), first_node=0x10000000, seed=0):
+    """
+    Return n received-packet dicts as meshtastic publishes them.
+
+    Args:
+                                    n (int): Number of packets
+                                    n_nodes (int): Number of distinct sending nodes (see mesh_nodes)
+                                    mix (tuple): Fractions of position, telemetry and text packets
+    """
+    rng = random.Random(seed)
+    packets = []
+    rx_time = 1758750000
+    for index in range(n):
+        node_num = first_node + rng.randrange(n_nodes)
+        packet = {
+            "id": rng.getrandbits(32),
+            "from": node_num,
+            "fromId": node_id(node_num),
+            "to": 0xFFFFFFFF,
+            "toId": "^all",
+            "rxTime": rx_time + index,
+            "hopLimit": 3,
+        }
+        kind = rng.random()
+        if kind < mix[0]:
+            lat, lon = _point(rng)
+            packet["decoded"] = {
+                "portnum": "POSITION_APP",
+                "position": {
+                    "latitude": lat,
+                    "longitude": lon,
+                    "altitude": rng.randint(0, 100),
+                    "time": rx_time + index,
+                },
+            }
+        elif kind < mix[0] + mix[1]:
+            packet["decoded"] = {
+                "portnum": "TELEMETRY_APP",
+                "telemetry": {
+                    "deviceMetrics": {
+                        "batteryLevel": rng.randint(0, 100),
+                        "uptimeSeconds": rng.randint(0, 86400),
+                    }
+                },
+            }
+        else:
+            packet["decoded"] = {
+                "portnum": "TEXT_MESSAGE_APP",
+                "payload": f"benchmark message {index}".encode("utf-8"),
+            }
+        packets.append(packet)
+    return packets
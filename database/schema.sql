@@ -41,6 +41,7 @@ CREATE TABLE IF NOT EXISTS incidents (
     reported_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     dispatched_at TIMESTAMPTZ,
     created_by TEXT NOT NULL DEFAULT 'SYSTEM',
+    source_ref TEXT,
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     
     CONSTRAINT fk_incidents_type FOREIGN KEY (incident_type_id) REFERENCES incident_types(id)
@@ -88,10 +89,97 @@ CREATE TABLE IF NOT EXISTS damage (
  op_time TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Damage rollups by tag, class, jurisdiction and structure type.  Maintained
+-- incrementally by the statement-level triggers on damage below, so reports are
+-- answered from a handful of rows rather than a scan of damage.
+CREATE TABLE IF NOT EXISTS damage_summary (
+    tag TEXT NOT NULL,
+    damage_class TEXT NOT NULL,
+    jurisdiction TEXT NOT NULL,
+    type_structure TEXT NOT NULL,
+    report_count BIGINT NOT NULL DEFAULT 0,
+    total_estimate BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (tag, damage_class, jurisdiction, type_structure)
+);
+
+-- Applies the rows changed by one statement on damage to damage_summary
+CREATE OR REPLACE FUNCTION damage_summary_apply() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE damage_summary s SET
+            report_count = s.report_count - d.report_count,
+            total_estimate = s.total_estimate - d.total_estimate,
+            updated_at = NOW()
+        FROM (
+            SELECT tag, damage_class, jurisdiction, type_structure,
+                   COUNT(*) AS report_count, COALESCE(SUM(estimate), 0) AS total_estimate
+            FROM old_rows
+            GROUP BY tag, damage_class, jurisdiction, type_structure
+        ) d
+        WHERE s.tag = d.tag AND s.damage_class = d.damage_class
+          AND s.jurisdiction = d.jurisdiction AND s.type_structure = d.type_structure;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO damage_summary (tag, damage_class, jurisdiction, type_structure, report_count, total_estimate)
+        SELECT tag, damage_class, jurisdiction, type_structure, COUNT(*), COALESCE(SUM(estimate), 0)
+        FROM new_rows
+        GROUP BY tag, damage_class, jurisdiction, type_structure
+        ON CONFLICT (tag, damage_class, jurisdiction, type_structure) DO UPDATE SET
+            report_count = damage_summary.report_count + EXCLUDED.report_count,
+            total_estimate = damage_summary.total_estimate + EXCLUDED.total_estimate,
+            updated_at = NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger
+CREATE OR REPLACE TRIGGER damage_summary_insert
+    AFTER INSERT ON damage REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION damage_summary_apply();
+
+CREATE OR REPLACE TRIGGER damage_summary_update
+    AFTER UPDATE ON damage REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION damage_summary_apply();
+
+CREATE OR REPLACE TRIGGER damage_summary_delete
+    AFTER DELETE ON damage REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION damage_summary_apply();
+
+-- Seed the rollups from reports stored before damage_summary existed; the
+-- triggers keep them current from here on (damage_summary.py --rebuild redoes this)
+INSERT INTO damage_summary (tag, damage_class, jurisdiction, type_structure, report_count, total_estimate)
+SELECT tag, damage_class, jurisdiction, type_structure, COUNT(*), COALESCE(SUM(estimate), 0)
+FROM damage
+WHERE NOT EXISTS (SELECT 1 FROM damage_summary)
+GROUP BY tag, damage_class, jurisdiction, type_structure;
+
+-- Per-year incident number counters.  generate_incident_id() bumps a single row,
+-- so allocation is constant time and the row lock serializes concurrent inserts.
+CREATE TABLE IF NOT EXISTS incident_id_counters (
+    year INTEGER PRIMARY KEY,
+    last_value INTEGER NOT NULL
+);
+
+-- Carry over numbers already allocated by earlier versions of generate_incident_id()
+INSERT INTO incident_id_counters (year, last_value)
+SELECT CAST(SUBSTRING(incident_id FROM 5 FOR 4) AS INTEGER), MAX(CAST(SUBSTRING(incident_id FROM 10) AS INTEGER))
+FROM incidents
+WHERE incident_id ~ '^INC-[0-9]{4}-[0-9]+$'
+GROUP BY 1
+ON CONFLICT (year) DO UPDATE SET last_value = GREATEST(incident_id_counters.last_value, EXCLUDED.last_value);
+
 -- Add incident_id generation function
 CREATE OR REPLACE FUNCTION generate_incident_id() RETURNS TEXT AS $$
+DECLARE
+    current_year INTEGER := extract(year from now())::INTEGER;
+    next_value INTEGER;
 BEGIN
-    RETURN 'INC-' || extract(year from now()) || '-' || lpad((SELECT COALESCE(MAX(CAST(SUBSTRING(incident_id FROM 10) AS INTEGER)), 0) + 1 FROM incidents WHERE incident_id LIKE 'INC-' || extract(year from now()) || '-%')::TEXT, 6, '0');
+    INSERT INTO incident_id_counters (year, last_value) VALUES (current_year, 1)
+    ON CONFLICT (year) DO UPDATE SET last_value = incident_id_counters.last_value + 1
+    RETURNING last_value INTO next_value;
+    RETURN 'INC-' || current_year || '-' || lpad(next_value::TEXT, 6, '0');
 END;
 $$ LANGUAGE plpgsql;
 
@@ -160,6 +248,9 @@ BEGIN
     END;
 END $$;
 
+-- Compression, retention and the 1-minute position rollup for tracked_asset_locations
+-- are configurable and applied by src/info-sources/location_policies.py
+
 
 -- Service boundaries table for Palo Alto
 CREATE TABLE IF NOT EXISTS service_boundaries (
@@ -174,19 +265,61 @@ CREATE TABLE IF NOT EXISTS service_boundaries (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Assets entering and leaving service boundaries, written by the Meshtastic
+-- ingest path (src/info-sources/geofence.py)
+CREATE TABLE IF NOT EXISTS geofence_events (
+    id BIGSERIAL PRIMARY KEY,
+    asset_id TEXT NOT NULL,
+    boundary_id INTEGER NOT NULL,
+    event_type TEXT NOT NULL CHECK (event_type IN ('enter', 'exit')),
+    location GEOMETRY(POINT, 4326) NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT fk_geofence_events_asset_id FOREIGN KEY (asset_id) REFERENCES tracked_assets(asset_id),
+    CONSTRAINT fk_geofence_events_boundary_id FOREIGN KEY (boundary_id) REFERENCES service_boundaries(id) ON DELETE CASCADE
+);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_incidents_location ON incidents USING GIST (location);
 CREATE INDEX IF NOT EXISTS idx_incidents_reported_at ON incidents USING BTREE (reported_at);
 CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents USING BTREE (status);
 CREATE INDEX IF NOT EXISTS idx_incidents_severity ON incidents USING BTREE (severity);
+-- What an incident was created from, e.g. a damage report, so it is converted only
+-- once.  Not UNIQUE: a hypertable's unique indexes must include reported_at.
+ALTER TABLE incidents ADD COLUMN IF NOT EXISTS source_ref TEXT;
+CREATE INDEX IF NOT EXISTS idx_incidents_source_ref ON incidents USING BTREE (source_ref) WHERE source_ref IS NOT NULL;
 
 CREATE INDEX IF NOT EXISTS idx_tracked_asset_locations_location ON tracked_asset_locations USING GIST (location);
 CREATE INDEX IF NOT EXISTS idx_tracked_asset_locations_timestamp ON tracked_asset_locations USING BTREE (timestamp);
 CREATE INDEX IF NOT EXISTS idx_tracked_asset_locations_asset_id ON tracked_asset_locations USING BTREE (asset_id);
 
 CREATE INDEX IF NOT EXISTS idx_tracked_assets_status ON tracked_assets USING BTREE (status);
+-- KNN (<->) nearest-asset queries over each asset's current position
+CREATE INDEX IF NOT EXISTS idx_tracked_assets_location ON tracked_assets USING GIST (location);
+
+-- Natural key of a damage report; re-polled or re-imported messages upsert onto it.
+-- Databases created before the key may already hold re-polled duplicates, which
+-- would make the index fail: keep the newest copy of each report (the one an
+-- upsert would have left) and delete the rest.  Skipped once the index exists.
+DO $$
+BEGIN
+    IF to_regclass('idx_damage_natural_key') IS NULL THEN
+        DELETE FROM damage a
+        USING damage b
+        WHERE a.msg_no = b.msg_no
+          AND a.op_call = b.op_call
+          AND a.date = b.date
+          AND a.id < b.id;
+    END IF;
+END
+$$;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_damage_natural_key ON damage USING BTREE (msg_no, op_call, date);
+-- Newest-first retrieval and (date, id) keyset pagination, with and without an operator filter
+CREATE INDEX IF NOT EXISTS idx_damage_date_id ON damage USING BTREE (date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_damage_op_call_date_id ON damage USING BTREE (UPPER(op_call), date DESC, id DESC);
 
 CREATE INDEX IF NOT EXISTS idx_service_boundaries_geometry ON service_boundaries USING GIST (boundary_geometry);
+-- Latest event per (asset, boundary), read when the geofence engine starts
+CREATE INDEX IF NOT EXISTS idx_geofence_events_asset_boundary ON geofence_events USING BTREE (asset_id, boundary_id, timestamp DESC);
 
 -- Functions
 CREATE OR REPLACE FUNCTION update_updated_at_column()
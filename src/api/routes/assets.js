@@ -1,4 +1,5 @@
 const express = require("express");
+const Cursor = require("pg-cursor");
 const router = express.Router();
 
 router.get("/status", async (req, res) => {
@@ -67,6 +68,251 @@ router.get("/status", async (req, res) => {
     }
 });
 
+// Simplification tolerance in meters and the conversion to SRID 4326 degrees (see track_playback.py)
+const DEFAULT_TOLERANCE_M = 10;
+const METERS_PER_DEGREE = 111320;
+const TRACK_BATCH_ROWS = 100;
+const TRACK_SOURCES = {
+    raw: { table: "tracked_asset_locations", timeColumn: "timestamp" },
+    "1m": { table: "tracked_asset_positions_1m", timeColumn: "bucket" }
+};
+
+// Resolves true when res can take more output, or false if it was closed first
+function drained(res) {
+    return new Promise((resolve) => {
+        const done = () => {
+            res.off("drain", done);
+            res.off("close", done);
+            resolve(!res.destroyed);
+        };
+        res.on("drain", done);
+        res.on("close", done);
+    });
+}
+
+// e.g. /api/v1/assets/tracks?start=2025-09-24T17:00Z&end=2025-09-24T21:00Z&asset_id=KK6ABC,W6EI&tolerance=10&source=1m
+router.get("/tracks", async (req, res) => {
+    try {
+        const pool = req.app.get("db");
+
+        if (!pool) {
+            console.warn("[assets] Database pool not available");
+            return res.json({ type: "FeatureCollection", features: [], note: "Database not connected" });
+        }
+
+        const start = new Date(req.query.start);
+        const end = new Date(req.query.end);
+        const tolerance = req.query.tolerance === undefined ? DEFAULT_TOLERANCE_M : Number(req.query.tolerance);
+        const source = TRACK_SOURCES[req.query.source || "raw"];
+        if (isNaN(start) || isNaN(end) || end <= start || !(tolerance >= 0) || !source) {
+            return res.status(400).json({
+                success: false,
+                error: {
+                    code: "INVALID_PARAMETER",
+                    message: "start and end must be datetimes with end after start, tolerance a non-negative number and source one of raw, 1m"
+                }
+            });
+        }
+        const assetIds = req.query.asset_id === undefined
+            ? []
+            : String(req.query.asset_id).split(",").map((a) => a.trim()).filter((a) => a);
+
+        // source is restricted to TRACK_SOURCES above, so it is safe to interpolate.
+        // The asset filter and time range scan the (asset_id, timestamp) primary key.
+        const params = [tolerance / METERS_PER_DEGREE, start, end];
+        let assetFilter = "";
+        if (assetIds.length > 0) {
+            params.push(assetIds);
+            assetFilter = "AND asset_id = ANY($4)";
+        }
+        const query = `
+            SELECT asset_id,
+                   COUNT(*) AS points,
+                   MIN(${source.timeColumn}) AS started_at,
+                   MAX(${source.timeColumn}) AS ended_at,
+                   CASE WHEN COUNT(*) > 1
+                        THEN ST_AsGeoJSON(ST_SimplifyPreserveTopology(
+                                 ST_MakeLine(location ORDER BY ${source.timeColumn}), $1), 6)
+                        ELSE ST_AsGeoJSON((ARRAY_AGG(location))[1], 6)
+                   END AS geometry
+            FROM ${source.table}
+            WHERE ${source.timeColumn} >= $2 AND ${source.timeColumn} < $3 ${assetFilter}
+            GROUP BY asset_id
+            ORDER BY asset_id
+        `;
+
+        // Read the tracks through a cursor and write each batch as it arrives, so
+        // neither the result set nor the response is held in memory whole
+        const client = await pool.connect();
+        const cursor = client.query(new Cursor(query, params));
+        try {
+            let rows;
+            try {
+                rows = await cursor.read(TRACK_BATCH_ROWS);
+            } catch (dbError) {
+                console.warn("[assets] Track query failed", dbError.message);
+                return res.json({ type: "FeatureCollection", features: [], note: "Database query failed" });
+            }
+
+            res.type("application/geo+json");
+            res.write('{"type":"FeatureCollection","features":[');
+            let count = 0;
+            while (rows.length > 0) {
+                for (const row of rows) {
+                    const more = res.write((count++ > 0 ? ",\n" : "\n") + JSON.stringify({
+                        type: "Feature",
+                        geometry: JSON.parse(row.geometry),
+                        properties: {
+                            asset_id: row.asset_id,
+                            points: Number(row.points),
+                            started_at: row.started_at,
+                            ended_at: row.ended_at
+                        }
+                    }));
+                    if (!more && !(await drained(res))) {
+                        return; // the client went away
+                    }
+                }
+                rows = await cursor.read(TRACK_BATCH_ROWS);
+            }
+            res.end("\n]}\n");
+        } finally {
+            await cursor.close().catch(() => {});
+            client.release();
+        }
+    } catch (error) {
+        console.error("[assets] Error in asset/tracks:", error);
+        if (res.headersSent) {
+            // Failed partway through the features; the truncated body shows it
+            return res.destroy(error);
+        }
+        res.status(500).json({
+            success: false,
+            error: { code: "INTERNAL_ERROR", message: "Failed to retrieve asset tracks" }
+        });
+    }
+});
+
+const DEFAULT_NEAREST_K = 5;
+const MAX_NEAREST_K = 100;
+
+// e.g. /api/v1/assets/nearest?incident_id=INC-2025-000001&type_code=ESV&k=5
+//      /api/v1/assets/nearest?lat=37.4419&lon=-122.1430&status=Available,En Route
+// status defaults to Available; status=any includes every status (see nearest_assets.py)
+router.get("/nearest", async (req, res) => {
+    try {
+        const pool = req.app.get("db");
+
+        if (!pool) {
+            console.warn("[assets] Database pool not available");
+            return res.json({
+                success: true,
+                data: [],
+                count: 0,
+                timestamp: new Date().toISOString(),
+                note: "Database not connected"
+            });
+        }
+
+        const k = req.query.k === undefined ? DEFAULT_NEAREST_K : Number(req.query.k);
+        const hasPoint = req.query.lat !== undefined && req.query.lon !== undefined;
+        const lat = Number(req.query.lat);
+        const lon = Number(req.query.lon);
+        if (!Number.isInteger(k) || k < 1 || k > MAX_NEAREST_K ||
+            (req.query.incident_id === undefined && (!hasPoint || isNaN(lat) || isNaN(lon)))) {
+            return res.status(400).json({
+                success: false,
+                error: {
+                    code: "INVALID_PARAMETER",
+                    message: `Either incident_id or numeric lat and lon are required, and k must be an integer from 1 to ${MAX_NEAREST_K}`
+                }
+            });
+        }
+        const splitList = (value) => String(value).split(",").map((v) => v.trim()).filter((v) => v);
+        const statuses = req.query.status === undefined ? ["Available"] : splitList(req.query.status);
+        const typeCodes = req.query.type_code === undefined ? [] : splitList(req.query.type_code).map((t) => t.toUpperCase());
+
+        // The search point is either the incident's location or lat/lon
+        let origin = { latitude: lat, longitude: lon };
+        if (req.query.incident_id !== undefined) {
+            try {
+                const incident = await pool.query(
+                    "SELECT ST_Y(location) AS latitude, ST_X(location) AS longitude FROM incidents WHERE incident_id = $1",
+                    [String(req.query.incident_id)]
+                );
+                if (incident.rows.length === 0) {
+                    return res.status(404).json({
+                        success: false,
+                        error: { code: "NOT_FOUND", message: `Incident ${req.query.incident_id} not found` }
+                    });
+                }
+                origin = incident.rows[0];
+            } catch (dbError) {
+                console.warn("[assets] Incident lookup failed", dbError.message);
+                return res.json({
+                    success: true,
+                    data: [],
+                    count: 0,
+                    timestamp: new Date().toISOString(),
+                    note: "Database query failed"
+                });
+            }
+        }
+
+        const params = [origin.longitude, origin.latitude];
+        const whereConditions = [];
+        if (!(statuses.length === 1 && statuses[0].toLowerCase() === "any")) {
+            params.push(statuses);
+            whereConditions.push(`status = ANY($${params.length})`);
+        }
+        if (typeCodes.length > 0) {
+            params.push(typeCodes);
+            whereConditions.push(`type_code = ANY($${params.length})`);
+        }
+        params.push(k);
+
+        // <-> against a constant point walks the GIST index on tracked_assets.location;
+        // distance_m is the true distance in meters for display
+        const query = `
+            SELECT asset_id, type_code, tactical_call, status,
+                   ST_Y(location) AS latitude,
+                   ST_X(location) AS longitude,
+                   ST_Distance(location::geography, ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography) AS distance_m
+            FROM tracked_assets
+            ${whereConditions.length > 0 ? "WHERE " + whereConditions.join(" AND ") : ""}
+            ORDER BY location <-> ST_SetSRID(ST_MakePoint($1, $2), 4326)
+            LIMIT $${params.length}
+        `;
+
+        try {
+            const result = await pool.query(query, params);
+            res.json({
+                success: true,
+                latitude: origin.latitude,
+                longitude: origin.longitude,
+                data: result.rows,
+                count: result.rows.length,
+                timestamp: new Date().toISOString()
+            });
+        } catch (dbError) {
+            console.warn("[assets] Nearest query failed", dbError.message);
+            res.json({
+                success: true,
+                data: [],
+                count: 0,
+                timestamp: new Date().toISOString(),
+                note: "Database query failed"
+            });
+        }
+    } catch (error) {
+        console.error("[assets] Error in asset/nearest:", error);
+        res.status(500).json({
+            success: false,
+            error: { code: "INTERNAL_ERROR", message: "Failed to retrieve nearest assets" }
+        });
+    }
+});
+
 function getMockAssets() {
     return [];
 }
@@ -0,0 +1,73 @@
+const express = require("express");
+const router = express.Router();
+
+// Dimensions of the damage_summary table (see damage_summary.py).  The table is
+// in the damage database, not the main one.
+const SUMMARY_DIMENSIONS = ["tag", "damage_class", "jurisdiction", "type_structure"];
+
+// e.g. /api/v1/damage/summary?group_by=tag,jurisdiction
+router.get("/summary", async (req, res) => {
+    try {
+        const pool = req.app.get("damageDb");
+
+        if (!pool) {
+            console.warn("[damage] Damage database pool not available");
+            return res.json({
+                success: true,
+                data: [],
+                count: 0,
+                timestamp: new Date().toISOString(),
+                note: "Database not connected"
+            });
+        }
+
+        const groupBy = req.query.group_by === undefined
+            ? SUMMARY_DIMENSIONS
+            : String(req.query.group_by).split(",").map((d) => d.trim()).filter((d) => d);
+        const unknown = groupBy.filter((d) => !SUMMARY_DIMENSIONS.includes(d));
+        if (unknown.length > 0) {
+            return res.status(400).json({
+                success: false,
+                error: { code: "INVALID_PARAMETER", message: `Unknown group_by dimension(s): ${unknown.join(", ")}` }
+            });
+        }
+
+        // groupBy is restricted to SUMMARY_DIMENSIONS above, so it is safe to interpolate
+        const selectList = groupBy.concat([
+            "SUM(report_count)::BIGINT AS report_count",
+            "SUM(total_estimate)::BIGINT AS total_estimate"
+        ]);
+        let query = `SELECT ${selectList.join(", ")} FROM damage_summary WHERE report_count > 0`;
+        if (groupBy.length > 0) {
+            query += ` GROUP BY ${groupBy.join(", ")} ORDER BY ${groupBy.join(", ")}`;
+        }
+
+        try {
+            const result = await pool.query(query);
+            res.json({
+                success: true,
+                group_by: groupBy,
+                data: result.rows,
+                count: result.rows.length,
+                timestamp: new Date().toISOString()
+            });
+        } catch (dbError) {
+            console.warn("[damage] Database query failed", dbError.message);
+            res.json({
+                success: true,
+                data: [],
+                count: 0,
+                timestamp: new Date().toISOString(),
+                note: "Database query failed"
+            });
+        }
+    } catch (error) {
+        console.error("[damage] Error in damage/summary:", error);
+        res.status(500).json({
+            success: false,
+            error: { code: "INTERNAL_ERROR", message: "Failed to retrieve damage summary" }
+        });
+    }
+});
+
+module.exports = router;
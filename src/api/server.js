@@ -15,7 +15,7 @@ require('dotenv').config({ path: path.join(__dirname, '../../.env') });
 console.log("🚨 [server] Situational Awareness API Starting...");
 
 // Route imports with error handling
-let incidentsRouter, assetsRouter, logsRouter;
+let incidentsRouter, assetsRouter, logsRouter, damageRouter;
 
 try {
     incidentsRouter = require("./routes/incidents");
@@ -44,6 +44,15 @@ try {
     logsRouter.post("/entry", (req, res) => res.json({ success: true, data: [], note: "Route not implemented" }));
 }
 
+try {
+    damageRouter = require("./routes/damage");
+    console.log("✅ [server] Loaded damage routes");
+} catch (err) {
+    console.warn("⚠️ [server] damage route not found, creating placeholder");
+    damageRouter = express.Router();
+    damageRouter.get("/summary", (req, res) => res.json({ success: true, data: [], note: "Route not implemented" }));
+}
+
 // Configuration
 const config = {
     port: process.env.PORT || 3000,
@@ -60,6 +69,19 @@ const config = {
     }
 };
 
+// Damage reports (and damage_summary, which triggers on them keep current) live
+// in their own database, the "damage" section of the Python daemons' config.
+// Each setting falls back to the main database's.
+config.damageDatabase = {
+    ...config.database,
+    host: process.env.DAMAGE_DB_HOST || config.database.host,
+    port: parseInt(process.env.DAMAGE_DB_PORT) || config.database.port,
+    database: process.env.DAMAGE_DB_NAME || "damage",
+    user: process.env.DAMAGE_DB_USER || config.database.user,
+    password: process.env.DAMAGE_DB_PASSWORD || config.database.password,
+    max: 5,
+};
+
 console.log("📝 [server] Configuration loaded:", {
     port: config.port,
     database: {
@@ -68,6 +90,12 @@ console.log("📝 [server] Configuration loaded:", {
         database: config.database.database,
         user: config.database.user,
         ssl: config.database.ssl
+    },
+    damageDatabase: {
+        host: config.damageDatabase.host,
+        port: config.damageDatabase.port,
+        database: config.damageDatabase.database,
+        user: config.damageDatabase.user
     }
 });
 
@@ -116,6 +144,26 @@ try {
     console.log("⚠️ [server] Continuing without database connection...");
 }
 
+// Damage database pool, used by the damage routes
+let damagePool = null;
+try {
+    damagePool = new Pool(config.damageDatabase);
+    damagePool.query('SELECT NOW() as current_time')
+        .then(() => {
+            app.set("damageDb", damagePool);
+            console.log("✅ [server] Damage database pool configured and ready");
+        })
+        .catch((err) => {
+            console.error("❌ [server] Damage database connection failed:", err.message);
+            console.log("⚠️ [server] Running without damage database connection");
+        });
+    damagePool.on('error', (err) => {
+        console.error('❌ [server] Damage database pool error:', err);
+    });
+} catch (error) {
+    console.error("❌ [server] Failed to create damage database pool:", error.message);
+}
+
 // Middleware
 app.use(helmet({ 
     contentSecurityPolicy: false, 
@@ -155,6 +203,7 @@ app.use((req, res, next) => {
 app.use("/api/v1/incidents", incidentsRouter);
 app.use("/api/v1/assets", assetsRouter);
 app.use("/api/v1/logs", logsRouter);
+app.use("/api/v1/damage", damageRouter);
 
 // Health check endpoint with more comprehensive checks
 app.get("/api/health", async (req, res) => {
@@ -201,7 +250,8 @@ app.get("/api/v1", (req, res) => {
             health: "/api/health",
             incidents: "/api/v1/incidents/active",
             assets: "/api/v1/assets/status",
-            logs: "/api/v1/logs/entry"
+            logs: "/api/v1/logs/entry",
+            damage: "/api/v1/damage/summary"
         },
         documentation: "https://github.com/iannucci/situational-awareness",
         timestamp: new Date().toISOString()
@@ -259,6 +309,9 @@ process.on('SIGTERM', async () => {
     console.log('🔄 [server] Received SIGTERM, shutting down gracefully');
     server.close(() => {
         console.log('✅ [server] HTTP server closed');
+        if (damagePool) {
+            damagePool.end();
+        }
         if (pool) {
             pool.end(() => {
                 console.log('✅ [server] Database pool closed');
@@ -274,6 +327,9 @@ process.on('SIGINT', async () => {
     console.log('🔄 [server] Received SIGINT, shutting down gracefully');
     server.close(() => {
         console.log('✅ [erver] HTTP server closed');
+        if (damagePool) {
+            damagePool.end();
+        }
         if (pool) {
             pool.end(() => {
                 console.log('✅ [server] Database pool closed');
@@ -300,4 +356,4 @@ server.listen(config.port, () => {
     `);
 });
 
-module.exports = { app, server, pool };
+module.exports = { app, server, pool, damagePool };
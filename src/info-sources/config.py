@@ -3,24 +3,43 @@
 # Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
 
 # Configuration singleton.  Holds config data for any number of keys.
+#
+# A loaded key can be reloaded in place, on SIGHUP or when its file changes.
+# The new JSON is parsed and validated completely before it replaces the old,
+# so readers see either the old or the new configuration, never a mix, and a
+# bad edit leaves the running configuration untouched.  Subscribers are called
+# after each successful reload so they can rebuild whatever they derive from it.
+#
+# The first load is lenient: a bad entry (say, a Mattermost user without a
+# token) is logged and left out of the typed sections, so a config that worked
+# before validation existed still starts every daemon.  Only reloads are strict.
 
+from dataclasses import dataclass
 import json
 import os
 import logging
+import log_setup as LG
+import signal
+import threading
+
+# Directories searched, in order, for a relative config file name
+CONFIG_SEARCH_PATH = (None, "/etc/situational-awareness")  # None is the cwd
+
+DEFAULT_WATCH_INTERVAL = 2.0  # seconds between file modification checks
 
 
 def build_logger(level: str):
-    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(message)s")
-    return logging.getLogger("config")
+    return LG.get_logger("config", level)
 
 
-# **FIXME**  Search the current directory and /etc/{project}
 def generate_config_path(name: str):
-    full_path = os.path.abspath(os.path.join(os.getcwd(), f"{name}"))
-    if os.path.exists(full_path):
-        return full_path
-    else:
+    if os.path.isabs(name):
         return name
+    for directory in CONFIG_SEARCH_PATH:
+        full_path = os.path.abspath(os.path.join(directory or os.getcwd(), name))
+        if os.path.exists(full_path):
+            return full_path
+    return name
 
 
 def singleton(cls):
@@ -34,20 +53,154 @@ def singleton(cls):
     return get_instance
 
 
+# Typed views of the config sections that long-running clients re-derive state
+# from.  Each is built from the raw section by from_dict(), which raises
+# ValueError on anything malformed, or, given warn, reports the malformed
+# entries through warn(message) and leaves them out.
+
+
+@dataclass(frozen=True)
+class MeshtasticSection:
+    host: str
+    log_level: str
+    ignore_list: tuple
+
+    @classmethod
+    def from_dict(cls, section: dict, warn=None):
+        ignore_list = section.get("ignore_list", [])
+        if not isinstance(ignore_list, list) or not all(
+            isinstance(node, int) for node in ignore_list
+        ):
+            message = "meshtastic.ignore_list must be a list of node numbers"
+            if warn is None:
+                raise ValueError(message)
+            warn(f"{message}; ignoring the entries that are not")
+            if not isinstance(ignore_list, list):
+                ignore_list = []
+            ignore_list = [node for node in ignore_list if isinstance(node, int)]
+        return cls(
+            host=str(section.get("host", "")),
+            log_level=str(section.get("log_level", "INFO")),
+            ignore_list=tuple(ignore_list),
+        )
+
+
+@dataclass(frozen=True)
+class MattermostUser:
+    callsign: str  # lower case, as Mattermost user names are
+    team: str
+    channel: str
+    token: str
+    digest_channel: str = ""  # where position/telemetry digests go, if not the default
+
+    @classmethod
+    def from_dict(cls, user: dict):
+        missing = [k for k in ("callsign", "team", "channel", "token") if not user.get(k)]
+        if missing:
+            raise ValueError(f"mattermost user {user.get('callsign', '?')} is missing {missing}")
+        return cls(
+            callsign=str(user["callsign"]).lower(),
+            team=str(user["team"]),
+            channel=str(user["channel"]),
+            token=str(user["token"]),
+            digest_channel=str(user.get("digest_channel") or ""),
+        )
+
+
+@dataclass(frozen=True)
+class MattermostSection:
+    host: str
+    log_level: str
+    users: tuple  # of MattermostUser
+
+    @classmethod
+    def from_dict(cls, section: dict, warn=None):
+        users = section.get("users", [])
+        if not isinstance(users, list):
+            if warn is None:
+                raise ValueError("mattermost.users must be a list")
+            warn("mattermost.users must be a list; no users configured")
+            users = []
+        valid = []
+        for user in users:
+            try:
+                valid.append(MattermostUser.from_dict(user))
+            except (ValueError, AttributeError) as e:
+                if warn is None:
+                    raise ValueError(str(e)) from e
+                warn(f"{e}; skipping this user")
+        return cls(
+            host=str(section.get("host", "")),
+            log_level=str(section.get("log_level", "INFO")),
+            users=tuple(valid),
+        )
+
+
+SECTION_TYPES = {
+    "meshtastic": MeshtasticSection,
+    "mattermost": MattermostSection,
+}
+
+
+class LoadedConfig:
+    """One key's parsed JSON and its typed sections, replaced as a unit on reload."""
+
+    __slots__ = ("data", "sections", "path", "mtime")
+
+    def __init__(self, data, sections, path, mtime):
+        self.data = data
+        self.sections = sections
+        self.path = path
+        self.mtime = mtime
+
+
+def parse_config_file(config_path, warn=None):
+    """
+    Read and validate a config file.
+
+    Args:
+                                    config_path (str): File to read
+                                    warn (callable, optional): If given, malformed section entries are reported
+                                                               through warn(message) and skipped rather than raised
+
+    Returns:
+                                    LoadedConfig
+
+    Raises:
+                                    FileNotFoundError, json.JSONDecodeError, ValueError
+    """
+    mtime = os.stat(config_path).st_mtime
+    with open(config_path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("top level must be a JSON object")
+    sections = {
+        name: section_type.from_dict(data[name], warn)
+        for name, section_type in SECTION_TYPES.items()
+        if isinstance(data.get(name), dict)
+    }
+    return LoadedConfig(data, sections, config_path, mtime)
+
+
 # e.g., Config("main", "config.json") loads os.path.abspath(path + config.json) to the "main" key
 @singleton
 class Config:
     def __init__(self):
         self._configs = {}
+        self._subscribers = {}
+        self._reload_lock = threading.Lock()
+        self._reload_requested = threading.Event()  # set by SIGHUP, serviced by the watcher
+        self._watcher = None
         self.logger = build_logger(logging.INFO)
 
     def load(self, key, config_file_name):
+        config_path = generate_config_path(config_file_name)
         try:
-            config_path = generate_config_path(config_file_name)
             self.logger.info(f"🚨 [Config] Path: {config_path}")
-            with open(config_path, "r") as f:
-                config = json.load(f)
-            self._configs[key] = config
+            self._configs[key] = parse_config_file(
+                config_path,
+                warn=lambda message: self.logger.warning(f"🚨 [Config] <{key}> {message}"),
+            )
             self.logger.info(f"✅ [Config] <{key}> loaded successfully")
         except FileNotFoundError:
             self.logger.info(f"❌ Error: The file '{config_path}' was not found.")
@@ -64,4 +217,87 @@ class Config:
         if not hasattr(self, "_configs"):
             raise ValueError("❌ Configuration singleton has not been initialized.")
         else:
-            return self._configs[key]
+            return self._configs[key].data
+
+    def section(self, key, name):
+        """Return the typed section (see SECTION_TYPES) of a loaded key, or None if absent."""
+        return self._configs[key].sections.get(name)
+
+    def subscribe(self, key, callback):
+        """
+        Call callback(config, sections) with the new raw config dict and its typed
+        sections after each successful reload of key.  Callbacks run on the
+        thread that triggered the reload.
+        """
+        self._subscribers.setdefault(key, []).append(callback)
+
+    def reload(self, key=None):
+        """
+        Re-read one key, or every loaded key, from its file.  On any error the
+        current configuration is kept and the error is logged.
+
+        Returns:
+                                    list: Keys that were reloaded
+        """
+        reloaded = []
+        with self._reload_lock:
+            for k in [key] if key is not None else list(self._configs):
+                current = self._configs[k]
+                try:
+                    self._configs[k] = parse_config_file(current.path)
+                except Exception as e:
+                    self.logger.error(
+                        f"❌ [Config] <{k}> not reloaded, keeping current configuration: {e}"
+                    )
+                    # Don't let the watcher retry the same bad file until it changes again
+                    try:
+                        current.mtime = os.stat(current.path).st_mtime
+                    except OSError:
+                        pass
+                    continue
+                self.logger.info(f"✅ [Config] <{k}> reloaded from {current.path}")
+                reloaded.append(k)
+        for k in reloaded:
+            loaded = self._configs[k]
+            for callback in self._subscribers.get(k, []):
+                try:
+                    callback(loaded.data, loaded.sections)
+                except Exception as e:
+                    self.logger.error(f"❌ [Config] Subscriber to <{k}> failed: {e}")
+        return reloaded
+
+    def install_sighup_handler(self):
+        """
+        Reload every key when the process receives SIGHUP.  Call from the main
+        thread.  The handler only flags the request; the watcher thread (started
+        here if need be) does the reload, so a signal arriving mid-reload cannot
+        deadlock on the reload lock.
+        """
+        signal.signal(signal.SIGHUP, lambda signum, frame: self._reload_requested.set())
+        self.watch()
+
+    def watch(self, interval=DEFAULT_WATCH_INTERVAL):
+        """
+        Start a daemon thread that reloads a key whenever its file's mtime
+        changes, and every key when SIGHUP has asked for it.
+        """
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(interval,), name="config-watch", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch_loop(self, interval):
+        while True:
+            if self._reload_requested.wait(interval):
+                self._reload_requested.clear()
+                self.reload()
+                continue
+            for key, current in list(self._configs.items()):
+                try:
+                    changed = os.stat(current.path).st_mtime != current.mtime
+                except OSError:
+                    changed = False  # mid-replace by an editor; check again next time
+                if changed:
+                    self.reload(key)
@@ -3,17 +3,23 @@
 # Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
 
 import re
+import sys
 import json
+from datetime import datetime
 from dateutil import parser as date_parser
 import argparse
 import config as CF
 import logging
+import log_setup as LG
+import metrics as MX
+import os
 import psycopg2
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 
 def build_logger(level: str):
-    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(message)s")
-    return logging.getLogger("damage_assesssment")
+    return LG.get_logger("damage_assesssment", level)
 
 
 def singleton(cls):
@@ -41,6 +47,7 @@ class DamageDB:
         self.logger = build_logger(logging.INFO)
         self.conn = None
         self.cursor = None
+        MX.track_connection("damage", self)
         try:
             self.conn = psycopg2.connect(
                 f"dbname={self.dbname} user={self.user} host={self.host} password={self.password} port={self.port}"
@@ -58,6 +65,100 @@ class DamageDB:
             self.logger.info("✅ [Damage] Connection closed")
 
 
+# Columns of the damage table written by save_to_database and the bulk importer,
+# in the order produced by DamageAssessment.to_row()
+DAMAGE_COLUMNS = (
+    "msg_no",
+    "date",
+    "handling",
+    "to_ics_position",
+    "to_location",
+    "to_name",
+    "to_contact",
+    "from_ics_position",
+    "from_location",
+    "from_name",
+    "from_contact",
+    "jurisdiction",
+    "address",
+    "unit_suite",
+    "type_structure",
+    "stories",
+    "own_rent",
+    "type_damage_flooding",
+    "type_damage_exterior",
+    "type_damage_structural",
+    "type_damage_other",
+    "basement",
+    "damage_class",
+    "tag",
+    "insurance",
+    "estimate",
+    "comments",
+    "contact_name",
+    "contact_phone",
+    "op_relay_rcvd",
+    "op_relay_sent",
+    "op_name",
+    "op_call",
+    "op_time",
+)
+
+# Natural key of a damage report (unique index idx_damage_natural_key).  The same
+# message polled or imported twice maps to the same row.
+DAMAGE_KEY = ("msg_no", "op_call", "date")
+
+# Turns an INSERT into damage into an idempotent upsert on DAMAGE_KEY
+DAMAGE_UPSERT_CLAUSE = f"""
+	ON CONFLICT ({", ".join(DAMAGE_KEY)}) DO UPDATE SET
+	{", ".join(f"{column} = EXCLUDED.{column}" for column in DAMAGE_COLUMNS if column not in DAMAGE_KEY)}
+	"""
+
+_UPSERT_SQL = f"""
+	INSERT INTO damage ({", ".join(DAMAGE_COLUMNS)})
+	VALUES ({", ".join(["%s"] * len(DAMAGE_COLUMNS))})
+	{DAMAGE_UPSERT_CLAUSE}
+	RETURNING id;
+	"""
+
+# Enumerated field values.  Validated values are interned so that every record
+# shares a single string object per value.
+HANDLING_VALUES = frozenset(map(sys.intern, ("Immediate", "Priority", "Routine")))
+TYPE_STRUCTURE_VALUES = frozenset(
+    map(
+        sys.intern,
+        (
+            "Single Family",
+            "Mobile Home",
+            "Non-Profit Orgs",
+            "Multi-Family",
+            "Business",
+            "Outbuilding",
+        ),
+    )
+)
+OWN_RENT_VALUES = frozenset(map(sys.intern, ("Own", "Rent")))
+DAMAGE_CLASS_VALUES = frozenset(
+    map(
+        sys.intern, ("Destroyed", "Minor", "No Visible Damage", "Major", "Affected")
+    )
+)
+TAG_VALUES = frozenset(map(sys.intern, ("Green", "Yellow", "Red")))
+
+# Boolean fields rendered as "checked" or "" in the text message format
+CHECKBOX_FIELDS = frozenset(
+    {
+        "type_damage_flooding",
+        "type_damage_exterior",
+        "type_damage_structural",
+        "type_damage_other",
+        "basement",
+    }
+)
+
+MESSAGE_TERMINATOR = "!/ADDON!"
+
+
 # Enter with a dict having these keys with valid values:
 example_init_dict = {
     "msg_no": "6EI-007",  # text
@@ -99,21 +200,56 @@ example_init_dict = {
 
 
 class DamageAssessment:
-    def __init__(self, init_dict: dict):
-        """
-        Initialize DamageAssessment with validation of input dictionary.
-
-        Args:
-                                        init_dict (dict): Dictionary containing damage assessment report data
+    # Public fields, in to_dict() order
+    FIELDS = (
+        "organization",
+        "form_file_name",
+        "form_version",
+        "msg_no",
+        "datetime",
+        "handling",
+        "to_ics_position",
+        "to_location",
+        "to_name",
+        "to_contact",
+        "from_ics_position",
+        "from_location",
+        "from_name",
+        "from_contact",
+        "jurisdiction",
+        "incident_name",
+        "address",
+        "unit_suite",
+        "type_structure",
+        "stories",
+        "own_rent",
+        "type_damage_flooding",
+        "type_damage_exterior",
+        "type_damage_structural",
+        "type_damage_other",
+        "basement",
+        "damage_class",
+        "tag",
+        "insurance",
+        "estimate",
+        "comments",
+        "contact_name",
+        "contact_phone",
+        "op_relay_rcvd",
+        "op_relay_sent",
+        "op_name",
+        "op_call",
+        "op_date",
+    )
 
-        Raises:
-                                        KeyError: If mandatory keys are missing
-                                        ValueError: If values don't meet validation criteria
-                                        TypeError: If values are of wrong type
-        """
+    # Slots instead of a per-instance __dict__ keep an event's worth of reports
+    # small enough to hold in memory.  _datetime and _op_datetime keep the parsed
+    # forms of datetime and op_date so they are never re-parsed.
+    __slots__ = FIELDS + ("_datetime", "_op_datetime")
 
-        # Define mandatory keys (those without default values)
-        mandatory_keys = {
+    # Mandatory keys (those without default values)
+    _MANDATORY_KEYS = frozenset(
+        {
             "organization",
             "form_file_name",
             "form_version",
@@ -144,26 +280,66 @@ class DamageAssessment:
             "op_call",
             "op_date",
         }
+    )
 
-        # Define optional keys with their default values
-        optional_defaults = {
-            "type_damage_flooding": False,
-            "type_damage_exterior": False,
-            "type_damage_structural": False,
-            "type_damage_other": False,
-            "basement": False,
-            "insurance": False,
-            "comments": "None",
-            "contact_name": "Unknown",
-        }
+    # Optional keys with their default values
+    _OPTIONAL_DEFAULTS = {
+        "type_damage_flooding": False,
+        "type_damage_exterior": False,
+        "type_damage_structural": False,
+        "type_damage_other": False,
+        "basement": False,
+        "insurance": False,
+        "comments": "None",
+        "contact_name": "Unknown",
+    }
+
+    def __init__(self, init_dict: dict):
+        """
+        Initialize DamageAssessment with validation of input dictionary.
+
+        Args:
+                                        init_dict (dict): Dictionary containing damage assessment report data
+
+        Raises:
+                                        KeyError: If mandatory keys are missing
+                                        ValueError: If values don't meet validation criteria
+                                        TypeError: If values are of wrong type
+        """
 
         # Check for missing mandatory keys
-        missing_keys = mandatory_keys - set(init_dict.keys())
+        missing_keys = self._MANDATORY_KEYS - init_dict.keys()
         if missing_keys:
             raise KeyError(f"Missing mandatory keys: {sorted(missing_keys)}")
 
         # Validate and set each field
-        self._validate_and_set_fields(init_dict, optional_defaults)
+        self._validate_and_set_fields(init_dict, self._OPTIONAL_DEFAULTS)
+
+    @classmethod
+    def from_row(cls, record) -> "DamageAssessment":
+        """
+        Build a validated instance from a damage table row.
+
+        Args:
+                                        record (tuple): Column values ordered like DAMAGE_COLUMNS
+
+        Returns:
+                                        DamageAssessment: Validated damage assessment instance
+        """
+        row = dict(zip(DAMAGE_COLUMNS, record))
+        row.update(
+            {
+                # Header fields (provide defaults since not in database)
+                "organization": "!SCCoPIFO!",
+                "form_file_name": "form-damage-assessment.html",
+                "form_version": "3.20-1.0",
+                "incident_name": "Retrieved from database",  # Default since not in DB
+                "datetime": row.pop("date").isoformat(),
+                "op_date": row.pop("op_time").isoformat(),
+                "unit_suite": row["unit_suite"] if row["unit_suite"] else "",
+            }
+        )
+        return cls(row)
 
     def _validate_and_set_fields(self, init_dict: dict, optional_defaults: dict):
         """Validate and set all instance variables."""
@@ -213,31 +389,18 @@ class DamageAssessment:
         self._validate_header_fields(init_dict)
 
         # Validate datetime fields
-        self._validate_datetime("datetime", init_dict["datetime"])
-        self._validate_datetime("op_date", init_dict["op_date"])
+        self._datetime = self._validate_datetime("datetime", init_dict["datetime"])
+        self._op_datetime = self._validate_datetime("op_date", init_dict["op_date"])
 
         # Validate handling
-        valid_handling = {"Immediate", "Priority", "Routine"}
-        if init_dict["handling"] not in valid_handling:
-            raise ValueError(
-                f"handling must be one of {valid_handling}, got '{init_dict['handling']}'"
-            )
-        self.handling = init_dict["handling"]
+        self.handling = self._validate_enum(
+            "handling", init_dict["handling"], HANDLING_VALUES
+        )
 
         # Validate type_structure
-        valid_structures = {
-            "Single Family",
-            "Mobile Home",
-            "Non-Profit Orgs",
-            "Multi-Family",
-            "Business",
-            "Outbuilding",
-        }
-        if init_dict["type_structure"] not in valid_structures:
-            raise ValueError(
-                f"type_structure must be one of {valid_structures}, got '{init_dict['type_structure']}'"
-            )
-        self.type_structure = init_dict["type_structure"]
+        self.type_structure = self._validate_enum(
+            "type_structure", init_dict["type_structure"], TYPE_STRUCTURE_VALUES
+        )
 
         # Validate stories
         if not isinstance(init_dict["stories"], int) or init_dict["stories"] < 1:
@@ -247,12 +410,9 @@ class DamageAssessment:
         self.stories = init_dict["stories"]
 
         # Validate own_rent
-        valid_own_rent = {"Own", "Rent"}
-        if init_dict["own_rent"] not in valid_own_rent:
-            raise ValueError(
-                f"own_rent must be one of {valid_own_rent}, got '{init_dict['own_rent']}'"
-            )
-        self.own_rent = init_dict["own_rent"]
+        self.own_rent = self._validate_enum(
+            "own_rent", init_dict["own_rent"], OWN_RENT_VALUES
+        )
 
         # Validate boolean damage type fields
         boolean_fields = [
@@ -270,26 +430,12 @@ class DamageAssessment:
                 )
 
         # Validate damage_class
-        valid_damage_classes = {
-            "Destroyed",
-            "Minor",
-            "No Visible Damage",
-            "Major",
-            "Affected",
-        }
-        if init_dict["damage_class"] not in valid_damage_classes:
-            raise ValueError(
-                f"damage_class must be one of {valid_damage_classes}, got '{init_dict['damage_class']}'"
-            )
-        self.damage_class = init_dict["damage_class"]
+        self.damage_class = self._validate_enum(
+            "damage_class", init_dict["damage_class"], DAMAGE_CLASS_VALUES
+        )
 
         # Validate tag
-        valid_tags = {"Green", "Yellow", "Red"}
-        if init_dict["tag"] not in valid_tags:
-            raise ValueError(
-                f"tag must be one of {valid_tags}, got '{init_dict['tag']}'"
-            )
-        self.tag = init_dict["tag"]
+        self.tag = self._validate_enum("tag", init_dict["tag"], TAG_VALUES)
 
         # Validate estimate
         if not isinstance(init_dict["estimate"], int) or init_dict["estimate"] < 0:
@@ -304,15 +450,28 @@ class DamageAssessment:
         # Validate op_call
         self._validate_op_call(init_dict["op_call"])
 
+    def _validate_enum(self, field_name: str, value, valid_values: frozenset) -> str:
+        """Validate an enumerated value and return its interned form."""
+        if value not in valid_values:
+            raise ValueError(
+                f"{field_name} must be one of {sorted(valid_values)}, got '{value}'"
+            )
+        return sys.intern(value)
+
     def _validate_datetime(self, field_name: str, value: str):
-        """Validate that a string can be parsed as a datetime."""
+        """Validate that a string can be parsed as a datetime and return the parsed value."""
         if not isinstance(value, str):
             raise TypeError(f"{field_name} must be a string, got {type(value)}")
         try:
-            parsed_date = date_parser.parse(value)
-            setattr(self, field_name, value)
-        except (ValueError, TypeError) as e:
-            raise ValueError(f"{field_name} could not be parsed as a date: {e}")
+            # ISO strings (e.g. rows read back from the database) take the fast path
+            parsed_date = datetime.fromisoformat(value)
+        except ValueError:
+            try:
+                parsed_date = date_parser.parse(value)
+            except (ValueError, TypeError, OverflowError) as e:
+                raise ValueError(f"{field_name} could not be parsed as a date: {e}")
+        setattr(self, field_name, value)
+        return parsed_date
 
     def _validate_contact_phone(self, value: str):
         """Validate contact phone number format."""
@@ -375,16 +534,21 @@ class DamageAssessment:
         Returns:
                                         dict: Dictionary with all instance variable names as keys and their values
         """
-        return self.__dict__.copy()
+        return {field: getattr(self, field) for field in self.FIELDS}
 
-    def to_json(self) -> str:
+    def to_json(self, indent=2) -> str:
         """
         Return a JSON string representation of all instance variables.
 
+        Args:
+                                        indent (int, optional): Pretty-print indent; None gives a compact single line
+
         Returns:
                                         str: JSON string containing all instance variables
         """
-        return json.dumps(self.__dict__, indent=2)
+        if indent is None:
+            return json.dumps(self.to_dict(), separators=(",", ":"))
+        return json.dumps(self.to_dict(), indent=indent)
 
     def to_message_format(self) -> str:
         """
@@ -393,126 +557,29 @@ class DamageAssessment:
         Returns:
                                         str: Formatted text message with sorted field lines
         """
-        lines = []
-
-        # Add header lines (first 3 lines)
-        lines.append(self.organization)
-        lines.append(f"#T: {self.form_file_name}")
-        lines.append(f"#V: {self.form_version}")
-
-        # Add MsgNo as 4th line
-        lines.append(f"MsgNo: [{self.msg_no}]")
-
-        # Create reverse mapping from instance variable to name prefix (excluding MsgNo)
-        field_to_prefix = {
-            "handling": "5",
-            "to_ics_position": "7a",
-            "to_location": "7b",
-            "to_name": "7c",
-            "to_contact": "7d",
-            "from_ics_position": "8a",
-            "from_location": "8b",
-            "from_name": "8c",
-            "from_contact": "8d",
-            "jurisdiction": "20",
-            "incident_name": "21",
-            "address": "22",
-            "unit_suite": "23",
-            "type_structure": "24",
-            "stories": "25",
-            "own_rent": "26",
-            "type_damage_flooding": "27a",
-            "type_damage_exterior": "27b",
-            "type_damage_structural": "27c",
-            "type_damage_other": "27d",
-            "basement": "28",
-            "damage_class": "29",
-            "tag": "30",
-            "insurance": "31",
-            "estimate": "32",
-            "comments": "33",
-            "contact_name": "34",
-            "contact_phone": "35",
-            "op_relay_rcvd": "OpRelayRcvd",
-            "op_relay_sent": "OpRelaySent",
-            "op_name": "OpName",
-            "op_call": "OpCall",
-        }
-
-        # Collect field lines for sorting
-        field_lines = []
-
-        # Handle datetime split into date (1a) and time (1b)
-        if hasattr(self, "datetime"):
-            try:
-                dt = date_parser.parse(self.datetime)
-                date_str = dt.strftime("%m/%d/%Y")
-                time_str = dt.strftime("%H:%M")
-                field_lines.append(("1a", f"1a.: [{date_str}]"))
-                field_lines.append(("1b", f"1b.: [{time_str}]"))
-            except:
-                # Fallback if parsing fails
-                field_lines.append(
-                    (
-                        "1a",
-                        f"1a.: [{self.datetime.split()[0] if ' ' in self.datetime else self.datetime}]",
-                    )
-                )
-                field_lines.append(("1b", f"1b.: [00:00]"))
-
-        # Handle op_date split into OpDate and OpTime
-        if hasattr(self, "op_date"):
-            try:
-                dt = date_parser.parse(self.op_date)
-                date_str = dt.strftime("%m/%d/%Y")
-                time_str = dt.strftime("%H:%M")
-                field_lines.append(("OpDate", f"OpDate: [{date_str}]"))
-                field_lines.append(("OpTime", f"OpTime: [{time_str}]"))
-            except:
-                # Fallback if parsing fails
-                field_lines.append(
-                    (
-                        "OpDate",
-                        f"OpDate: [{self.op_date.split()[0] if ' ' in self.op_date else self.op_date}]",
-                    )
-                )
-                field_lines.append(("OpTime", f"OpTime: [00:00]"))
-
-        # Process regular fields
-        for field_name, prefix in field_to_prefix.items():
-            if hasattr(self, field_name):
-                value = getattr(self, field_name)
-                formatted_value = self._format_field_value(field_name, value)
-
-                # Add period after numeric prefixes
-                if prefix.isdigit() or (len(prefix) > 1 and prefix[:-1].isdigit()):
-                    formatted_prefix = f"{prefix}.:"
-                else:
-                    formatted_prefix = f"{prefix}:"
-
-                field_lines.append((prefix, f"{formatted_prefix} [{formatted_value}]"))
-
-        # Sort field lines by prefix (handling mixed numeric/alpha sorting)
-        def sort_key(item):
-            prefix = item[0]
-            # Extract numeric part for proper sorting
-            if prefix.isdigit():
-                return (0, int(prefix), "")
-            elif len(prefix) > 1 and prefix[:-1].isdigit():
-                return (0, int(prefix[:-1]), prefix[-1])
+        return "\n".join(self._message_lines())
+
+    def _message_lines(self):
+        """Yield the lines of the text message format, in output order."""
+
+        # Header lines (first 3 lines), then MsgNo as 4th line
+        yield self.organization
+        yield f"#T: {self.form_file_name}"
+        yield f"#V: {self.form_version}"
+        yield f"MsgNo: [{self.msg_no}]"
+
+        # Field lines, sorted once at import time (see _MESSAGE_LINES)
+        for field_name, line_prefix in _MESSAGE_LINES:
+            date_part = _DATE_PARTS.get(field_name)
+            if date_part is not None:
+                attribute, date_format = date_part
+                value = getattr(self, attribute).strftime(date_format)
             else:
-                return (1, 0, prefix)
-
-        field_lines.sort(key=sort_key)
-
-        # Add sorted field lines to output
-        for _, line in field_lines:
-            lines.append(line)
+                value = self._format_field_value(field_name, getattr(self, field_name))
+            yield f"{line_prefix} [{value}]"
 
-        # Add closing line
-        lines.append("!/ADDON!")
-
-        return "\n".join(lines)
+        # Closing line
+        yield MESSAGE_TERMINATOR
 
     def _format_field_value(self, field_name: str, value) -> str:
         """Format a field value for text message output."""
@@ -522,14 +589,7 @@ class DamageAssessment:
             return "Yes" if value else "No"
 
         # Handle other boolean fields with checked format
-        boolean_fields = {
-            "type_damage_flooding",
-            "type_damage_exterior",
-            "type_damage_structural",
-            "type_damage_other",
-            "basement",
-        }
-        if field_name in boolean_fields:
+        if field_name in CHECKBOX_FIELDS:
             return "checked" if value else ""
 
         # Handle unit_suite empty string
@@ -539,92 +599,116 @@ class DamageAssessment:
         # Convert everything else to string
         return str(value)
 
+    @property
+    def reported_at(self):
+        """The report's date and time (fields 1a and 1b) as a datetime."""
+        return self._datetime
+
+    def to_row(self) -> tuple:
+        """
+        Return the instance data as a tuple ordered like DAMAGE_COLUMNS.
+
+        Returns:
+                                        tuple: Column values ready for INSERT or COPY into the damage table
+        """
+        return (
+            self.msg_no,
+            self._datetime,
+            self.handling,
+            self.to_ics_position,
+            self.to_location,
+            self.to_name,
+            self.to_contact,
+            self.from_ics_position,
+            self.from_location,
+            self.from_name,
+            self.from_contact,
+            self.jurisdiction,
+            self.address,
+            self.unit_suite if self.unit_suite else None,
+            self.type_structure,
+            self.stories,
+            self.own_rent,
+            self.type_damage_flooding,
+            self.type_damage_exterior,
+            self.type_damage_structural,
+            self.type_damage_other,
+            self.basement,
+            self.damage_class,
+            self.tag,
+            self.insurance,
+            self.estimate,
+            self.comments,
+            self.contact_name,
+            self.contact_phone,
+            self.op_relay_rcvd,
+            self.op_relay_sent,
+            self.op_name,
+            self.op_call.upper(),
+            self._op_datetime,
+        )
+
     def save_to_database(self, connection):
         """
-        Save the DamageAssessment instance to PostgreSQL database.
+        Save the DamageAssessment instance to PostgreSQL database.  Saving a report
+        whose natural key (msg_no, op_call, date) is already present updates that
+        row instead of adding a duplicate, so retries and replays are safe.
 
         Args:
                                         connection: psycopg2 database connection object
 
         Returns:
-                                        int: The ID of the inserted record
+                                        int: The ID of the inserted or updated record
 
         Raises:
                                         Exception: If database operation fails
         """
 
         try:
-            with connection.cursor() as cursor:
-                # Parse datetime strings to timestamp objects
-                dt_parsed = date_parser.parse(self.datetime)
-                op_dt_parsed = date_parser.parse(self.op_date)
-
-                # Prepare the INSERT statement
-                insert_sql = """
-				INSERT INTO damage (
-					msg_no, date, handling, to_ics_position, to_location, to_name, to_contact,
-					from_ics_position, from_location, from_name, from_contact, jurisdiction,
-					address, unit_suite, type_structure, stories, own_rent,
-					type_damage_flooding, type_damage_exterior, type_damage_structural, type_damage_other,
-					basement, damage_class, tag, insurance, estimate, comments, contact_name, contact_phone,
-					op_relay_rcvd, op_relay_sent, op_name, op_call, op_time
-				) VALUES (
-					%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-					%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-				) RETURNING id;
-				"""
-
-                # Execute the INSERT
-                cursor.execute(
-                    insert_sql,
-                    (
-                        self.msg_no,
-                        dt_parsed,
-                        self.handling,
-                        self.to_ics_position,
-                        self.to_location,
-                        self.to_name,
-                        self.to_contact,
-                        self.from_ics_position,
-                        self.from_location,
-                        self.from_name,
-                        self.from_contact,
-                        self.jurisdiction,
-                        self.address,
-                        self.unit_suite if self.unit_suite else None,
-                        self.type_structure,
-                        self.stories,
-                        self.own_rent,
-                        self.type_damage_flooding,
-                        self.type_damage_exterior,
-                        self.type_damage_structural,
-                        self.type_damage_other,
-                        self.basement,
-                        self.damage_class,
-                        self.tag,
-                        self.insurance,
-                        self.estimate,
-                        self.comments,
-                        self.contact_name,
-                        self.contact_phone,
-                        self.op_relay_rcvd,
-                        self.op_relay_sent,
-                        self.op_name,
-                        self.op_call.upper(),
-                        op_dt_parsed,
-                    ),
-                )
+            with MX.DB_WRITE_SECONDS.labels("damage").time():
+                with connection.cursor() as cursor:
+                    # Execute the upsert
+                    cursor.execute(_UPSERT_SQL, self.to_row())
 
-                # Get the inserted record ID
-                record_id = cursor.fetchone()[0]
-                connection.commit()
-                return record_id
+                    # Get the inserted or updated record ID
+                    record_id = cursor.fetchone()[0]
+                    connection.commit()
+            return record_id
 
         except Exception as e:
             connection.rollback()
             raise Exception(f"Failed to save damage assessment to database: {e}")
 
 
+# SELECT list shared by the retrieval functions; id comes first, then DAMAGE_COLUMNS
+_SELECT_SQL = f"SELECT id, {', '.join(DAMAGE_COLUMNS)} FROM damage"
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def _retrieval_filters(op_call=None, start_time=None, end_time=None):
+    """Build the WHERE conditions and parameters shared by the retrieval functions."""
+    where_conditions = []
+    params = []
+
+    # Matches the UPPER(op_call) expression index idx_damage_op_call_date_id
+    if op_call:
+        where_conditions.append("UPPER(op_call) = UPPER(%s)")
+        params.append(op_call)
+
+    if start_time:
+        start_dt = date_parser.parse(start_time)
+        where_conditions.append("date >= %s")
+        params.append(start_dt)
+
+    if end_time:
+        end_dt = date_parser.parse(end_time)
+        where_conditions.append("date <= %s")
+        params.append(end_dt)
+
+    return where_conditions, params
+
+
 def retrieve_from_database(connection, op_call=None, start_time=None, end_time=None):
     """
     Retrieve DamageAssessment records from PostgreSQL database.
@@ -645,106 +729,151 @@ def retrieve_from_database(connection, op_call=None, start_time=None, end_time=N
     try:
         with connection.cursor() as cursor:
             # Build the WHERE clause dynamically
-            where_conditions = []
-            params = []
-
-            if op_call:
-                where_conditions.append("UPPER(op_call) = UPPER(%s)")
-                params.append(op_call)
-
-            if start_time:
-                start_dt = date_parser.parse(start_time)
-                where_conditions.append("date >= %s")
-                params.append(start_dt)
-
-            if end_time:
-                end_dt = date_parser.parse(end_time)
-                where_conditions.append("date <= %s")
-                params.append(end_dt)
+            where_conditions, params = _retrieval_filters(op_call, start_time, end_time)
 
             # Construct the query
-            base_query = """
-			SELECT id, msg_no, date, handling, to_ics_position, to_location, to_name, to_contact,
-				   from_ics_position, from_location, from_name, from_contact, jurisdiction,
-				   address, unit_suite, type_structure, stories, own_rent,
-				   type_damage_flooding, type_damage_exterior, type_damage_structural, type_damage_other,
-				   basement, damage_class, tag, insurance, estimate, comments, contact_name, contact_phone,
-				   op_relay_rcvd, op_relay_sent, op_name, op_call, op_time
-			FROM damage
-			"""
-
+            query = _SELECT_SQL
             if where_conditions:
-                query = base_query + " WHERE " + " AND ".join(where_conditions)
-            else:
-                query = base_query
-
-            query += " ORDER BY date DESC"
+                query += " WHERE " + " AND ".join(where_conditions)
+            query += " ORDER BY date DESC, id DESC"
 
             # Execute the query
             cursor.execute(query, params)
             records = cursor.fetchall()
 
-            # Convert each record to a DamageAssessment instance
-            assessments = []
-            for record in records:
-                # Create a dictionary for the DamageAssessment constructor
-                assessment_dict = {
-                    # Header fields (provide defaults since not in database)
-                    "organization": "!SCCoPIFO!",
-                    "form_file_name": "form-damage-assessment.html",
-                    "form_version": "3.20-1.0",
-                    # Main fields from database
-                    "msg_no": record[1],
-                    "datetime": record[
-                        2
-                    ].isoformat(),  # Convert timestamp to ISO string
-                    "handling": record[3],
-                    "to_ics_position": record[4],
-                    "to_location": record[5],
-                    "to_name": record[6],
-                    "to_contact": record[7],
-                    "from_ics_position": record[8],
-                    "from_location": record[9],
-                    "from_name": record[10],
-                    "from_contact": record[11],
-                    "jurisdiction": record[12],
-                    "incident_name": "Retrieved from database",  # Default since not in DB
-                    "address": record[13],
-                    "unit_suite": record[14] if record[14] else "",
-                    "type_structure": record[15],
-                    "stories": record[16],
-                    "own_rent": record[17],
-                    "type_damage_flooding": record[18],
-                    "type_damage_exterior": record[19],
-                    "type_damage_structural": record[20],
-                    "type_damage_other": record[21],
-                    "basement": record[22],
-                    "damage_class": record[23],
-                    "tag": record[24],
-                    "insurance": record[25],
-                    "estimate": record[26],
-                    "comments": record[27],
-                    "contact_name": record[28],
-                    "contact_phone": record[29],
-                    "op_relay_rcvd": record[30],
-                    "op_relay_sent": record[31],
-                    "op_name": record[32],
-                    "op_call": record[33],
-                    "op_date": record[
-                        34
-                    ].isoformat(),  # Convert timestamp to ISO string
-                }
-
-                # Create and add the DamageAssessment instance
-                assessment = DamageAssessment(assessment_dict)
-                assessments.append(assessment)
-
-            return assessments
+            # Convert each record (less its id) to a DamageAssessment instance
+            return [DamageAssessment.from_row(record[1:]) for record in records]
 
     except Exception as e:
         raise Exception(f"Failed to retrieve damage assessments from database: {e}")
 
 
+def retrieve_page(
+    connection,
+    op_call=None,
+    start_time=None,
+    end_time=None,
+    cursor=None,
+    page_size=DEFAULT_PAGE_SIZE,
+):
+    """
+    Retrieve one page of DamageAssessment records, newest first.  Pages are
+    addressed by a (date, id) keyset cursor rather than OFFSET, so every page
+    costs the same index range scan no matter how deep into the table it is.
+
+    Args:
+                                    connection: psycopg2 database connection object
+                                    op_call (str, optional): Filter by operator call sign (case insensitive)
+                                    start_time (str, optional): Filter by datetime >= start_time (parseable datetime string)
+                                    end_time (str, optional): Filter by datetime <= end_time (parseable datetime string)
+                                    cursor (tuple, optional): (date, id) returned as next_cursor by the previous page
+                                    page_size (int): Maximum number of records to return
+
+    Returns:
+                                    tuple: (assessments, next_cursor); next_cursor is None on the last page
+
+    Raises:
+                                    Exception: If database operation fails
+    """
+
+    try:
+        with connection.cursor() as db_cursor:
+            where_conditions, params = _retrieval_filters(op_call, start_time, end_time)
+            if cursor is not None:
+                where_conditions.append("(date, id) < (%s, %s)")
+                params.extend(cursor)
+
+            query = _SELECT_SQL
+            if where_conditions:
+                query += " WHERE " + " AND ".join(where_conditions)
+            # One extra row tells us whether another page follows
+            query += " ORDER BY date DESC, id DESC LIMIT %s"
+            params.append(page_size + 1)
+
+            db_cursor.execute(query, params)
+            records = db_cursor.fetchall()
+
+            next_cursor = None
+            if len(records) > page_size:
+                records = records[:page_size]
+                last = records[-1]
+                next_cursor = (last[DAMAGE_COLUMNS.index("date") + 1], last[0])
+
+            return [
+                DamageAssessment.from_row(record[1:]) for record in records
+            ], next_cursor
+
+    except Exception as e:
+        raise Exception(f"Failed to retrieve damage assessment page from database: {e}")
+
+
+def iter_from_database(
+    connection, op_call=None, start_time=None, end_time=None, page_size=DEFAULT_PAGE_SIZE
+):
+    """
+    Yield every matching DamageAssessment, newest first, one page at a time.
+    Suitable for feeding write_assessments() without loading the table into memory.
+    """
+    cursor = None
+    while True:
+        assessments, cursor = retrieve_page(
+            connection, op_call, start_time, end_time, cursor, page_size
+        )
+        yield from assessments
+        if cursor is None:
+            return
+
+
+def encode_page_cursor(cursor) -> str:
+    """Encode a (date, id) page cursor as an opaque string for UI and HTTP callers."""
+    date, record_id = cursor
+    return f"{date.isoformat()}|{record_id}"
+
+
+def decode_page_cursor(text: str):
+    """
+    Decode a page cursor produced by encode_page_cursor.
+
+    Raises:
+                                    ValueError: If the text is not a valid cursor
+    """
+    date_text, separator, id_text = text.rpartition("|")
+    if not separator:
+        raise ValueError(f"Invalid page cursor '{text}'")
+    return datetime.fromisoformat(date_text), int(id_text)
+
+
+def write_assessments(assessments, fp, format="message") -> int:
+    """
+    Stream damage assessments to a file object one record at a time.
+
+    Args:
+                                    assessments (iterable): DamageAssessment instances; may be a generator
+                                    fp: Text file object to write to
+                                    format (str): "message" for the text message format, "ndjson" for one JSON object per line
+
+    Returns:
+                                    int: Number of records written
+
+    Raises:
+                                    ValueError: If format is not recognized
+    """
+
+    if format == "message":
+        render = DamageAssessment.to_message_format
+    elif format == "ndjson":
+        render = partial(DamageAssessment.to_json, indent=None)
+    else:
+        raise ValueError(f"format must be 'message' or 'ndjson', got '{format}'")
+
+    count = 0
+    for assessment in assessments:
+        fp.write(render(assessment))
+        fp.write("\n")
+        count += 1
+    return count
+
+
 def parse_damage_assessment(message_text: str) -> "DamageAssessment":
     """
     Parse a structured text message into a DamageAssessment instance.
@@ -783,6 +912,56 @@ def parse_damage_assessment(message_text: str) -> "DamageAssessment":
         ) from e
 
 
+def validate_batch(items, workers=None, chunksize=None, executor=None):
+    """
+    Validate many damage assessments in parallel across a process pool.
+
+    Args:
+                                    items (list): Raw dicts (as for DamageAssessment) and/or message texts
+                                    workers (int, optional): Number of worker processes (default: one per CPU); 1 runs serially.
+                                                             With an executor, its size; chunksize is derived from it
+                                    chunksize (int, optional): Items sent to a worker at a time (default: derived from workers)
+                                    executor (ProcessPoolExecutor, optional): Existing pool to reuse across calls
+
+    Returns:
+                                    tuple: (assessments, errors), two lists in input order.  For each item exactly one of
+                                    assessments[i] (DamageAssessment) and errors[i] (the exception raised) is not None
+    """
+
+    items = list(items)
+    if executor is None and (workers == 1 or len(items) < 2):
+        results = [_validate_one(item) for item in items]
+    else:
+        if chunksize is None:
+            # workers None assumes one per CPU, which is also the executor default
+            chunksize = batch_chunksize(len(items), workers)
+        if executor is not None:
+            results = list(executor.map(_validate_one, items, chunksize=chunksize))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_validate_one, items, chunksize=chunksize))
+
+    assessments = [assessment for assessment, _ in results]
+    errors = [error for _, error in results]
+    return assessments, errors
+
+
+def batch_chunksize(n_items: int, workers=None) -> int:
+    """Chunk size giving each worker about four chunks, to amortize IPC without starving the pool."""
+    workers = workers or os.cpu_count() or 1
+    return max(1, n_items // (4 * workers))
+
+
+def _validate_one(item):
+    """Validate a single raw dict or message text.  Runs in a worker process."""
+    try:
+        if isinstance(item, str):
+            return parse_damage_assessment(item), None
+        return DamageAssessment(item), None
+    except (ValueError, KeyError, TypeError) as e:
+        return None, e
+
+
 def _parse_message_lines(message_text: str) -> dict:
     """Parse message lines into a dictionary of name_prefix -> value."""
     lines = message_text.strip().split("\n")
@@ -859,49 +1038,81 @@ def _parse_header_lines(message_text: str) -> dict:
     return header_data
 
 
+# Mapping from name_prefix to DamageAssessment dictionary key
+FIELD_MAPPING = {
+    "MsgNo": "msg_no",
+    "1a": "date",  # Will be combined with time
+    "1b": "time",  # Will be combined with date
+    "5": "handling",
+    "7a": "to_ics_position",
+    "7b": "to_location",
+    "7c": "to_name",
+    "7d": "to_contact",
+    "8a": "from_ics_position",
+    "8b": "from_location",
+    "8c": "from_name",
+    "8d": "from_contact",
+    "20": "jurisdiction",
+    "21": "incident_name",
+    "22": "address",
+    "23": "unit_suite",
+    "24": "type_structure",
+    "25": "stories",
+    "26": "own_rent",
+    "27a": "type_damage_flooding",
+    "27b": "type_damage_exterior",
+    "27c": "type_damage_structural",
+    "27d": "type_damage_other",
+    "28": "basement",
+    "29": "damage_class",
+    "30": "tag",
+    "31": "insurance",
+    "32": "estimate",
+    "33": "comments",
+    "34": "contact_name",
+    "35": "contact_phone",
+    "OpRelayRcvd": "op_relay_rcvd",
+    "OpRelaySent": "op_relay_sent",
+    "OpName": "op_name",
+    "OpCall": "op_call",
+    "OpDate": "op_date",  # Will be combined with op_time
+    "OpTime": "op_time",  # Will be combined with op_date
+}
+
+# The text message format splits datetime and op_date into separate date and
+# time lines.  Maps those FIELD_MAPPING names to (parsed attribute, strftime format)
+_DATE_PARTS = {
+    "date": ("_datetime", "%m/%d/%Y"),
+    "time": ("_datetime", "%H:%M"),
+    "op_date": ("_op_datetime", "%m/%d/%Y"),
+    "op_time": ("_op_datetime", "%H:%M"),
+}
+
+
+def _message_sort_key(prefix: str):
+    """Sort numbered prefixes numerically (5 < 7a < 20 < 27b), then named ones alphabetically."""
+    if prefix.isdigit():
+        return (0, int(prefix), "")
+    elif len(prefix) > 1 and prefix[:-1].isdigit():
+        return (0, int(prefix[:-1]), prefix[-1])
+    else:
+        return (1, 0, prefix)
+
+
+# (field name, line prefix) for every field line of the text message format, in
+# output order.  Numbered prefixes are followed by a period ("27a.:").
+_MESSAGE_LINES = tuple(
+    (field_name, f"{prefix}.:" if prefix[0].isdigit() else f"{prefix}:")
+    for prefix, field_name in sorted(
+        FIELD_MAPPING.items(), key=lambda item: _message_sort_key(item[0])
+    )
+    if prefix != "MsgNo"
+)
+
+
 def _convert_to_assessment_dict(raw_data: dict) -> dict:
     """Convert raw parsed data to DamageAssessment dictionary format."""
 
-    # Mapping from name_prefix to DamageAssessment dictionary key
-    field_mapping = {
-        "MsgNo": "msg_no",
-        "1a": "date",  # Will be combined with time
-        "1b": "time",  # Will be combined with date
-        "5": "handling",
-        "7a": "to_ics_position",
-        "7b": "to_location",
-        "7c": "to_name",
-        "7d": "to_contact",
-        "8a": "from_ics_position",
-        "8b": "from_location",
-        "8c": "from_name",
-        "8d": "from_contact",
-        "20": "jurisdiction",
-        "21": "incident_name",
-        "22": "address",
-        "23": "unit_suite",
-        "24": "type_structure",
-        "25": "stories",
-        "26": "own_rent",
-        "27a": "type_damage_flooding",
-        "27b": "type_damage_exterior",
-        "27c": "type_damage_structural",
-        "27d": "type_damage_other",
-        "28": "basement",
-        "29": "damage_class",
-        "30": "tag",
-        "31": "insurance",
-        "32": "estimate",
-        "33": "comments",
-        "34": "contact_name",
-        "35": "contact_phone",
-        "OpRelayRcvd": "op_relay_rcvd",
-        "OpRelaySent": "op_relay_sent",
-        "OpName": "op_name",
-        "OpCall": "op_call",
-        "OpDate": "op_date",  # Will be combined with op_time
-        "OpTime": "op_time",  # Will be combined with op_date
-    }
 
     assessment_dict = {}
 
@@ -912,7 +1123,7 @@ def _convert_to_assessment_dict(raw_data: dict) -> dict:
             assessment_dict[field] = raw_data[field]
 
     # Map and convert basic fields
-    for prefix, dict_key in field_mapping.items():
+    for prefix, dict_key in FIELD_MAPPING.items():
         if prefix in raw_data and dict_key not in [
             "date",
             "time",
@@ -963,14 +1174,7 @@ def _convert_field_value(field_name: str, value: str):
             raise ValueError(f"insurance field must be 'Yes' or 'No', got '{value}'")
 
     # Handle other boolean fields
-    boolean_fields = {
-        "type_damage_flooding",
-        "type_damage_exterior",
-        "type_damage_structural",
-        "type_damage_other",
-        "basement",
-    }
-    if field_name in boolean_fields:
+    if field_name in CHECKBOX_FIELDS:
         return _convert_to_boolean(value)
 
     # Handle integer fields
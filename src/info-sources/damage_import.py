@@ -0,0 +1,345 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Bulk import of PackItForms damage assessments from files, directories and zip
+# archives.  Messages are parsed in a process pool and each batch of validated
+# rows is streamed with COPY FROM STDIN into a staging table, then upserted into
+# the damage table on its natural key under a savepoint.  A batch the database
+# refuses (a row breaking a constraint of damage) is retried row by row, and the
+# refused rows go to the reject file along with the messages that failed to
+# parse.  Re-importing the same messages updates rows rather than duplicating them.
+
+import argparse
+import config as CF
+import damage_assessment as DA
+import itertools
+import log_setup as LG
+import metrics as MX
+import os
+import psycopg2
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_CFG = "/etc/situational-awareness/config.json"
+DEFAULT_REJECTS = "damage-rejects.txt"
+DEFAULT_BATCH_SIZE = 1000
+
+REJECT_COMMENT = "##"  # Lines starting with this are ignored on import
+
+# Extra names used in validation errors that do not appear in FIELD_MAPPING
+_FIELD_ALIASES = {"datetime": "1a", "op_date": "OpDate"}
+
+
+def build_logger(level: str):
+    return LG.get_logger("damage_import", level)
+
+
+# Splits a text file into (start_line, message_text) pairs.  A message ends with
+# the !/ADDON! line; reject-file comments are skipped so that a corrected reject
+# file can be imported again as-is.
+def split_messages(text: str):
+    message_lines = []
+    start_line = 0
+    for line_num, line in enumerate(text.splitlines(), start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(REJECT_COMMENT):
+            continue
+        if not message_lines:
+            start_line = line_num
+        message_lines.append(line)
+        if stripped == DA.MESSAGE_TERMINATOR:
+            yield start_line, "\n".join(message_lines)
+            message_lines = []
+    if message_lines:
+        yield start_line, "\n".join(message_lines)
+
+
+# Yields (source, start_line, message_text) for every message found under the
+# given paths.  Directories are walked recursively and zip archives are opened
+# in place, so nothing is extracted to disk.
+def iter_messages(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                yield from iter_messages(
+                    os.path.join(root, name) for name in sorted(files)
+                )
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    text = archive.read(info).decode("utf-8", errors="replace")
+                    source = f"{path}!{info.filename}"
+                    for start_line, message in split_messages(text):
+                        yield source, start_line, message
+        else:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            for start_line, message in split_messages(text):
+                yield path, start_line, message
+
+
+# Best-effort mapping of a validation error back to the offending line of the
+# message.  Returns the line offset within the message (0 if it can't be found).
+def _error_line(message_text: str, error: str) -> int:
+    field_to_prefix = {field: prefix for prefix, field in DA.FIELD_MAPPING.items()}
+    field_to_prefix.update(_FIELD_ALIASES)
+    for field, prefix in field_to_prefix.items():
+        if not re.search(rf"\b{field}\b", error):
+            continue
+        for offset, line in enumerate(message_text.split("\n")):
+            colon_pos = line.find(":")
+            if (
+                colon_pos != -1
+                and re.sub(r"[^a-zA-Z0-9]", "", line[:colon_pos]) == prefix
+            ):
+                return offset
+    return 0
+
+
+# Runs in a worker process.  Returns (row, None) or (None, (line_offset, error))
+def _parse_one(message_text: str):
+    try:
+        return DA.parse_damage_assessment(message_text).to_row(), None
+    except ValueError as e:
+        return None, (_error_line(message_text, str(e)), str(e))
+
+
+def _copy_value(value) -> str:
+    """Format a value for PostgreSQL COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _db_error(error) -> str:
+    return error.diag.message_primary or str(error).strip()
+
+
+# One row at a time, for batches the database refused
+_ROW_UPSERT_SQL = f"""
+	INSERT INTO damage ({", ".join(DA.DAMAGE_COLUMNS)})
+	VALUES ({", ".join(["%s"] * len(DA.DAMAGE_COLUMNS))})
+	{DA.DAMAGE_UPSERT_CLAUSE};
+	"""
+
+
+BATCH_MESSAGES = MX.histogram(
+    "damage_import_batch_messages",
+    "Messages handed to the parser pool per batch",
+    buckets=MX.SIZE_BUCKETS,
+)
+
+
+class RowStream:
+    """File-like object that feeds COPY FROM STDIN from an iterator of row tuples."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += "\t".join(_copy_value(value) for value in row) + "\n"
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+class DamageImporter:
+    def __init__(
+        self, connection, reject_file, logger, workers=None, batch_size=DEFAULT_BATCH_SIZE
+    ):
+        self.connection = connection
+        self.reject_file = reject_file
+        self.logger = logger
+        self.workers = workers
+        self.batch_size = batch_size
+        self.imported = 0
+        self.rejected = 0
+        self.upserted = 0
+
+    def _reject(self, source, start_line, message_text, error):
+        line_offset, reason = error
+        self.rejected += 1
+        self.reject_file.write(
+            f"{REJECT_COMMENT} {source}:{start_line + line_offset}: {reason}\n"
+        )
+        self.reject_file.write(f"{message_text}\n")
+
+    # Parses messages a batch at a time so that memory stays bounded no matter
+    # how many files are imported.  Yields, per batch, the validated messages as
+    # (source, start_line, message_text, row).
+    def _batches(self, messages):
+        chunksize = DA.batch_chunksize(self.batch_size, self.workers)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                batch = list(itertools.islice(messages, self.batch_size))
+                if not batch:
+                    break
+                BATCH_MESSAGES.observe(len(batch))
+                texts = [message_text for _, _, message_text in batch]
+                parsed = []
+                for (source, start_line, message_text), (row, error) in zip(
+                    batch, pool.map(_parse_one, texts, chunksize=chunksize)
+                ):
+                    if error is not None:
+                        self._reject(source, start_line, message_text, error)
+                        continue
+                    parsed.append((source, start_line, message_text, row))
+                yield parsed
+
+    def _upsert_batch(self, cursor, parsed):
+        columns = ", ".join(DA.DAMAGE_COLUMNS)
+        key = ", ".join(DA.DAMAGE_KEY)
+        cursor.execute("TRUNCATE damage_staging;")
+        cursor.copy_expert(
+            f"COPY damage_staging ({columns}) FROM STDIN",
+            RowStream(row for _, _, _, row in parsed),
+        )
+        # ON CONFLICT may touch each target row only once per statement
+        cursor.execute(
+            f"""
+			INSERT INTO damage ({columns})
+			SELECT DISTINCT ON ({key}) {columns}
+			FROM damage_staging
+			ORDER BY {key}, seq DESC
+			{DA.DAMAGE_UPSERT_CLAUSE};
+			"""
+        )
+        return cursor.rowcount
+
+    # Finds the rows of a refused batch that the database rejects.  In input
+    # order, so the last copy of a duplicated message still wins.
+    def _upsert_rows(self, cursor, parsed):
+        upserted = 0
+        for source, start_line, message_text, row in parsed:
+            cursor.execute("SAVEPOINT damage_row;")
+            try:
+                cursor.execute(_ROW_UPSERT_SQL, row)
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT damage_row;")
+                self._reject(source, start_line, message_text, (0, f"database: {_db_error(e)}"))
+                continue
+            cursor.execute("RELEASE SAVEPOINT damage_row;")
+            self.imported += 1
+            upserted += cursor.rowcount
+        return upserted
+
+    def run(self, paths):
+        columns = ", ".join(DA.DAMAGE_COLUMNS)
+        try:
+            with self.connection.cursor() as cursor:
+                # seq records input order so the last copy of a duplicated message
+                # wins.  Built without damage's CHECK constraints; the upsert applies them.
+                cursor.execute(
+                    f"""
+					CREATE TEMP TABLE damage_staging ON COMMIT DROP AS
+					SELECT {columns} FROM damage WITH NO DATA;
+					ALTER TABLE damage_staging ADD COLUMN seq BIGSERIAL;
+					"""
+                )
+                for parsed in self._batches(iter_messages(paths)):
+                    if not parsed:
+                        continue
+                    cursor.execute("SAVEPOINT damage_batch;")
+                    try:
+                        self.upserted += self._upsert_batch(cursor, parsed)
+                        self.imported += len(parsed)
+                    except psycopg2.Error as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT damage_batch;")
+                        self.logger.warning(
+                            f"🚨 [Import] Batch refused ({_db_error(e)}); retrying row by row"
+                        )
+                        self.upserted += self._upsert_rows(cursor, parsed)
+                    cursor.execute("RELEASE SAVEPOINT damage_batch;")
+                    self.logger.info(
+                        f"🚨 [Import] {self.imported} rows imported, {self.rejected} rejected"
+                    )
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"Failed to import damage assessments: {e}")
+        return self.upserted, self.rejected
+
+
+# When invoked, pass the --config, typically pointing to
+# /etc/{installation-name}/config.json, followed by the files, directories or
+# zip archives to import
+def main():
+    ap = argparse.ArgumentParser(description="damage-import")
+    ap.add_argument(
+        "--config",
+        default=DEFAULT_CFG,
+        help=f"Path to config file (default: {DEFAULT_CFG})",
+    )
+    ap.add_argument(
+        "--rejects",
+        default=DEFAULT_REJECTS,
+        help=f"File receiving messages that failed validation or were refused by the database (default: {DEFAULT_REJECTS})",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of parser processes (default: one per CPU)",
+    )
+    ap.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Messages handed to the parser pool at a time (default: {DEFAULT_BATCH_SIZE})",
+    )
+    ap.add_argument("paths", nargs="+", help="Files, directories or zip archives")
+    args = ap.parse_args()
+
+    config_repo = CF.Config()  # singleton
+    config_repo.load("main", args.config)
+    config = config_repo.config("main")
+
+    logger = build_logger(config["damage"].get("log_level", "INFO"))
+    logger.info("✅ [Import] Logging is active")
+
+    database = DA.DamageDB(config)
+    if database.conn is None:
+        return
+
+    try:
+        with open(args.rejects, "w") as reject_file:
+            importer = DamageImporter(
+                database.conn, reject_file, logger, args.workers, args.batch_size
+            )
+            upserted, rejected = importer.run(args.paths)
+        logger.info(
+            f"✅ [Import] Upserted {upserted} damage assessments, {rejected} rejected"
+        )
+        if rejected:
+            logger.info(f"🚨 [Import] Rejected messages written to {args.rejects}")
+    except KeyboardInterrupt:
+        logger.info("\n🚨 [Import] Exiting.")
+    except Exception as e:
+        logger.error(f"❌ [Import] {e}")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
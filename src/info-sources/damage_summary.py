@@ -0,0 +1,175 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Damage rollups for commanders.  Reads the damage_summary table, which triggers
+# on the damage table keep up to date (see database/schema.sql), so a report
+# never touches the damage rows themselves.
+
+import argparse
+import config as CF
+import damage_assessment as DA
+import json
+import log_setup as LG
+
+DEFAULT_CFG = "/etc/situational-awareness/config.json"
+
+# Columns of damage_summary that rollups can be grouped by
+SUMMARY_DIMENSIONS = ("tag", "damage_class", "jurisdiction", "type_structure")
+
+
+def build_logger(level: str):
+    return LG.get_logger("damage_summary", level)
+
+
+def summarize(connection, group_by=SUMMARY_DIMENSIONS):
+    """
+    Roll up damage report counts and estimates.
+
+    Args:
+                                    connection: psycopg2 database connection object
+                                    group_by (iterable): Any of SUMMARY_DIMENSIONS; empty gives a single grand total
+
+    Returns:
+                                    list: One dict per group with the group_by keys plus report_count and total_estimate
+
+    Raises:
+                                    ValueError: If group_by names an unknown dimension
+                                    Exception: If database operation fails
+    """
+
+    group_by = list(group_by)
+    unknown = set(group_by) - set(SUMMARY_DIMENSIONS)
+    if unknown:
+        raise ValueError(
+            f"group_by must be drawn from {SUMMARY_DIMENSIONS}, got {sorted(unknown)}"
+        )
+
+    select_list = group_by + [
+        "SUM(report_count)::BIGINT AS report_count",
+        "SUM(total_estimate)::BIGINT AS total_estimate",
+    ]
+    query = f"SELECT {', '.join(select_list)} FROM damage_summary WHERE report_count > 0"
+    if group_by:
+        query += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            columns = group_by + ["report_count", "total_estimate"]
+            rows = [dict(zip(columns, record)) for record in cursor.fetchall()]
+        # With no rows the grand total comes back as a single row of NULLs
+        for row in rows:
+            row["report_count"] = row["report_count"] or 0
+            row["total_estimate"] = row["total_estimate"] or 0
+        return rows
+    except Exception as e:
+        connection.rollback()
+        raise Exception(f"Failed to summarize damage assessments: {e}")
+
+
+def rebuild_summary(connection):
+    """
+    Recompute damage_summary from the damage table, e.g. after restoring damage
+    from a dump taken without triggers.  Blocks writers to damage while it runs.
+
+    Args:
+                                    connection: psycopg2 database connection object
+
+    Returns:
+                                    int: Number of summary rows written
+    """
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("LOCK TABLE damage IN SHARE MODE")
+            cursor.execute("DELETE FROM damage_summary")
+            cursor.execute(
+                f"""
+				INSERT INTO damage_summary ({', '.join(SUMMARY_DIMENSIONS)}, report_count, total_estimate)
+				SELECT {', '.join(SUMMARY_DIMENSIONS)}, COUNT(*), COALESCE(SUM(estimate), 0)
+				FROM damage
+				GROUP BY {', '.join(SUMMARY_DIMENSIONS)};
+				"""
+            )
+            row_count = cursor.rowcount
+        connection.commit()
+        return row_count
+    except Exception as e:
+        connection.rollback()
+        raise Exception(f"Failed to rebuild damage summary: {e}")
+
+
+def _format_table(rows, group_by):
+    columns = list(group_by) + ["report_count", "total_estimate"]
+    widths = [
+        max([len(column)] + [len(str(row[column])) for row in rows])
+        for column in columns
+    ]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(columns, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    for row in rows:
+        lines.append("  ".join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+    return "\n".join(line.rstrip() for line in lines)
+
+
+# When invoked, pass the --config, typically pointing to
+# /etc/{installation-name}/config.json
+def main():
+    ap = argparse.ArgumentParser(description="damage-summary")
+    ap.add_argument(
+        "--config",
+        default=DEFAULT_CFG,
+        help=f"Path to config file (default: {DEFAULT_CFG})",
+    )
+    ap.add_argument(
+        "--group-by",
+        action="append",
+        choices=SUMMARY_DIMENSIONS,
+        help="Dimension to group by; repeat for several (default: all four)",
+    )
+    ap.add_argument(
+        "--total",
+        action="store_true",
+        help="Print only the grand total",
+    )
+    ap.add_argument(
+        "--json",
+        action="store_true",
+        help="Print JSON instead of a table",
+    )
+    ap.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Recompute the summary table from the damage table first",
+    )
+    args = ap.parse_args()
+
+    config_repo = CF.Config()  # singleton
+    config_repo.load("main", args.config)
+    config = config_repo.config("main")
+
+    logger = build_logger(config["damage"].get("log_level", "INFO"))
+
+    database = DA.DamageDB(config)
+    if database.conn is None:
+        return
+
+    group_by = [] if args.total else (args.group_by or list(SUMMARY_DIMENSIONS))
+    try:
+        if args.rebuild:
+            row_count = rebuild_summary(database.conn)
+            logger.info(f"✅ [Summary] Rebuilt {row_count} summary rows")
+        rows = summarize(database.conn, group_by)
+        if args.json:
+            print(json.dumps({"group_by": group_by, "data": rows}, indent=2))
+        else:
+            print(_format_table(rows, group_by))
+    except Exception as e:
+        logger.error(f"❌ [Summary] {e}")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
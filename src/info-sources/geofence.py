@@ -0,0 +1,160 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# In-process geofencing of incoming positions against service_boundaries.  The
+# boundary polygons are loaded once into an STRtree of prepared geometries, so
+# each position is tested in memory without a PostGIS round trip.  Zone changes
+# are reported as enter/exit events and recorded in geofence_events.
+
+from shapely import wkb
+from shapely.geometry import Point
+from shapely.prepared import prep
+from shapely.strtree import STRtree
+
+ENTER = "enter"
+EXIT = "exit"
+
+
+class GeofenceZone:
+    __slots__ = ("zone_id", "name", "jurisdiction", "geometry", "prepared")
+
+    def __init__(self, zone_id, name, jurisdiction, geometry):
+        self.zone_id = zone_id
+        self.name = name
+        self.jurisdiction = jurisdiction
+        self.geometry = geometry
+        self.prepared = prep(geometry)
+
+
+class GeofenceEngine:
+    """
+    Tracks which zones each asset is in and reports the changes.
+
+    Args:
+                                    zones (iterable): GeofenceZone instances
+    """
+
+    def __init__(self, zones):
+        self.zones = list(zones)
+        self.zones_by_id = {zone.zone_id: zone for zone in self.zones}
+        self.tree = STRtree([zone.geometry for zone in self.zones])
+        # asset_id -> frozenset of zone_ids the asset was last seen inside
+        self.asset_zones = {}
+
+    @classmethod
+    def from_database(cls, connection, boundary_types=None):
+        """
+        Load zones from service_boundaries and the last known zone membership of
+        each asset from geofence_events, so a restart does not re-announce entries.
+
+        Args:
+                                    connection: psycopg2 database connection object
+                                    boundary_types (iterable, optional): Only load these boundary_type values
+        """
+
+        query = "SELECT id, boundary_name, jurisdiction, ST_AsBinary(boundary_geometry) FROM service_boundaries"
+        params = []
+        if boundary_types:
+            query += " WHERE boundary_type = ANY(%s)"
+            params.append(list(boundary_types))
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            zones = [
+                GeofenceZone(zone_id, name, jurisdiction, wkb.loads(bytes(geometry)))
+                for zone_id, name, jurisdiction, geometry in cursor.fetchall()
+            ]
+            cursor.execute(
+                """
+				SELECT asset_id, boundary_id FROM (
+					SELECT DISTINCT ON (asset_id, boundary_id) asset_id, boundary_id, event_type
+					FROM geofence_events
+					ORDER BY asset_id, boundary_id, timestamp DESC
+				) latest
+				WHERE event_type = %s
+				""",
+                (ENTER,),
+            )
+            inside = cursor.fetchall()
+        connection.commit()
+
+        engine = cls(zones)
+        for asset_id, zone_id in inside:
+            if zone_id in engine.zones_by_id:
+                engine.asset_zones[asset_id] = engine.asset_zones.get(
+                    asset_id, frozenset()
+                ) | {zone_id}
+        return engine
+
+    def zones_containing(self, lon, lat):
+        """Return the zones that contain the point, testing only STRtree candidates."""
+        point = Point(lon, lat)
+        return [
+            self.zones[index]
+            for index in self.tree.query(point)
+            if self.zones[index].prepared.contains(point)
+        ]
+
+    def changes(self, asset_id, lon, lat):
+        """
+        Work out what an asset's new position changes, without recording it.
+
+        Returns:
+                                    tuple: (events, zone_ids); events are (event_type, GeofenceZone) tuples,
+                                           exits first, empty if nothing changed; pass zone_ids to move()
+        """
+
+        current = self.zones_containing(lon, lat)
+        current_ids = frozenset(zone.zone_id for zone in current)
+        previous_ids = self.asset_zones.get(asset_id, frozenset())
+        if current_ids == previous_ids:
+            return [], current_ids
+        events = [(EXIT, self.zones_by_id[zone_id]) for zone_id in sorted(previous_ids - current_ids)]
+        events += [(ENTER, zone) for zone in current if zone.zone_id not in previous_ids]
+        return events, current_ids
+
+    def move(self, asset_id, zone_ids):
+        """Record the zones an asset is now inside, as returned by changes()."""
+        self.asset_zones[asset_id] = zone_ids
+
+    def update(self, asset_id, lon, lat):
+        """
+        Record an asset's new position and return what changed.
+
+        Returns:
+                                    list: (event_type, GeofenceZone) tuples, exits first; empty if nothing changed
+        """
+
+        events, zone_ids = self.changes(asset_id, lon, lat)
+        if events:
+            self.move(asset_id, zone_ids)
+        return events
+
+
+def record_events(connection, asset_id, events, lon, lat):
+    """
+    Insert geofence events for one position into geofence_events.
+
+    Args:
+                                    connection: psycopg2 database connection object
+                                    asset_id (str): Asset that moved
+                                    events (list): As returned by GeofenceEngine.update()
+                                    lon (float): Longitude of the position that triggered the events
+                                    lat (float): Latitude of the position that triggered the events
+    """
+
+    if not events:
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                """
+				INSERT INTO geofence_events (asset_id, boundary_id, event_type, location)
+				VALUES (%s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326));
+				""",
+                [(asset_id, zone.zone_id, event_type, lon, lat) for event_type, zone in events],
+            )
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        raise Exception(f"Failed to record geofence events for {asset_id}: {e}")
@@ -0,0 +1,304 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Incident creation.  Incident IDs (INC-YYYY-NNNNNN) are allocated by the
+# database's generate_incident_id(), so callers never supply them.  An incident
+# may record a source_ref naming what it was created from; damage reports are
+# converted to incidents only once.
+
+import argparse
+import config as CF
+import damage_assessment as DA
+import log_setup as LG
+import psycopg2.extras
+import scenario_db as DB
+
+DEFAULT_CFG = "/etc/situational-awareness/config.json"
+
+DAMAGE_INCIDENT_TYPE = "DAMAGE"
+
+# Incident priority (1 = most urgent) for each severity
+PRIORITY_BY_SEVERITY = {"Critical": 1, "High": 2, "Medium": 3, "Low": 4}
+
+_INSERT_TEMPLATE = "(%s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s, %s, %s, %s, %s, %s)"
+
+
+def build_logger(level: str):
+    return LG.get_logger("incident_db", level)
+
+
+def ensure_incident_type(connection, type_code, type_name, default_severity="Medium"):
+    """
+    Return the id of an incident type, creating the type if it does not exist.
+
+    Args:
+                                    connection: psycopg2 database connection object
+                                    type_code (str): Unique code, e.g. "DAMAGE"
+                                    type_name (str): Display name used when creating the type
+                                    default_severity (str): Used when creating the type
+
+    Returns:
+                                    int: incident_types.id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+			INSERT INTO incident_types (type_code, type_name, default_severity)
+			VALUES (%s, %s, %s)
+			ON CONFLICT (type_code) DO NOTHING;
+			SELECT id FROM incident_types WHERE type_code = %s;
+			""",
+            (type_code, type_name, default_severity, type_code),
+        )
+        type_id = cursor.fetchone()[0]
+    connection.commit()
+    return type_id
+
+
+def create_incidents(connection, incidents, created_by="SYSTEM"):
+    """
+    Bulk-create incidents in one statement and transaction.
+
+    Args:
+                                    connection: psycopg2 database connection object
+                                    incidents (iterable): Dicts with incident_type_id, severity, title and location
+                                                          ({"lat", "lon"}), and optionally priority, address,
+                                                          description, reported_at and source_ref
+                                    created_by (str): Recorded in incidents.created_by
+
+    Returns:
+                                    list: Allocated incident IDs, in input order
+
+    Raises:
+                                    Exception: If database operation fails
+    """
+
+    rows = [
+        (
+            None,  # incident_id, filled in below
+            incident["incident_type_id"],
+            incident["severity"],
+            incident.get("priority", PRIORITY_BY_SEVERITY.get(incident["severity"], 3)),
+            incident["location"]["lon"],
+            incident["location"]["lat"],
+            incident.get("address"),
+            incident["title"],
+            incident.get("description"),
+            incident.get("reported_at"),
+            created_by,
+            incident.get("source_ref"),
+        )
+        for incident in incidents
+    ]
+    if not rows:
+        return []
+
+    try:
+        with connection.cursor() as cursor:
+            # Allocate the IDs first and pair them with the rows here, since the
+            # order of RETURNING rows is not guaranteed
+            cursor.execute(
+                "SELECT generate_incident_id() FROM generate_series(1, %s) ORDER BY 1;",
+                (len(rows),),
+            )
+            incident_ids = [incident_id for (incident_id,) in cursor.fetchall()]
+            rows = [(incident_id,) + row[1:] for incident_id, row in zip(incident_ids, rows)]
+            # COALESCE keeps the column default when no report time is given
+            psycopg2.extras.execute_values(
+                cursor,
+                """
+				INSERT INTO incidents (incident_id, incident_type_id, severity, priority, location, address, title, description, reported_at, created_by, source_ref)
+				SELECT v.incident_id, v.incident_type_id, v.severity, v.priority, v.location, v.address, v.title, v.description,
+				       COALESCE(v.reported_at::TIMESTAMPTZ, NOW()), v.created_by, v.source_ref
+				FROM (VALUES %s) AS v (incident_id, incident_type_id, severity, priority, location, address, title, description, reported_at, created_by, source_ref);
+				""",
+                rows,
+                template=_INSERT_TEMPLATE,
+            )
+        connection.commit()
+        return incident_ids
+    except Exception as e:
+        connection.rollback()
+        raise Exception(f"Failed to create incidents: {e}")
+
+
+def create_incident(connection, incident, created_by="SYSTEM"):
+    """Create a single incident (see create_incidents) and return its incident ID."""
+    return create_incidents(connection, [incident], created_by)[0]
+
+
+def jurisdiction_points(connection):
+    """
+    Return a representative point inside each jurisdiction's current service
+    boundary, as {jurisdiction: {"lat", "lon"}}.  Used to place incidents for
+    damage reports that carry only a street address.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+			SELECT DISTINCT ON (jurisdiction) jurisdiction, ST_Y(point), ST_X(point)
+			FROM (
+				SELECT jurisdiction, effective_date, ST_PointOnSurface(boundary_geometry) AS point
+				FROM service_boundaries
+			) b
+			ORDER BY jurisdiction, effective_date DESC;
+			"""
+        )
+        return {
+            jurisdiction: {"lat": lat, "lon": lon}
+            for jurisdiction, lat, lon in cursor.fetchall()
+        }
+
+
+def damage_source_ref(assessment) -> str:
+    """The source_ref of a damage report's incident: its natural key (see DA.DAMAGE_KEY)."""
+    return f"damage:{assessment.msg_no}:{assessment.op_call}:{assessment.reported_at.isoformat()}"
+
+
+def converted_source_refs(connection, source_refs):
+    """Return the subset of source_refs that incidents were already created from."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT source_ref FROM incidents WHERE source_ref = ANY(%s);",
+            (list(source_refs),),
+        )
+        return {source_ref for (source_ref,) in cursor.fetchall()}
+
+
+def damage_severity(assessment) -> str:
+    """Map a damage assessment's tag and class onto an incident severity."""
+    if assessment.damage_class == "Destroyed":
+        return "Critical"
+    return {"Red": "High", "Yellow": "Medium", "Green": "Low"}[assessment.tag]
+
+
+def create_incidents_from_damage(
+    connection, assessments, locate=None, created_by="DAMAGE", logger=None
+):
+    """
+    Bulk-create one incident per damage assessment.  Reports that already have
+    an incident are skipped, so re-running over the same reports is safe.
+
+    Args:
+                                    connection: psycopg2 connection to the situational awareness database
+                                    assessments (iterable): DamageAssessment instances
+                                    locate (callable, optional): assessment -> {"lat", "lon"} or None, e.g. a geocoder.
+                                                                 Falls back to a point inside the report's jurisdiction.
+                                    created_by (str): Recorded in incidents.created_by
+                                    logger (optional): Receives a message for each report that could not be located
+
+    Returns:
+                                    list: (msg_no, incident_id) for each incident created, in input order
+    """
+
+    incident_type_id = ensure_incident_type(
+        connection, DAMAGE_INCIDENT_TYPE, "Property Damage"
+    )
+    fallback_points = jurisdiction_points(connection)
+    assessments = list(assessments)
+    converted = converted_source_refs(
+        connection, [damage_source_ref(assessment) for assessment in assessments]
+    )
+
+    incidents = []
+    msg_nos = []
+    for assessment in assessments:
+        source_ref = damage_source_ref(assessment)
+        if source_ref in converted:
+            continue
+        converted.add(source_ref)  # and once per run, should a report repeat
+        location = locate(assessment) if locate is not None else None
+        if location is None:
+            location = fallback_points.get(assessment.jurisdiction)
+        if location is None:
+            if logger is not None:
+                logger.info(
+                    f"❌ [Incidents] No location for damage report {assessment.msg_no} at {assessment.address}"
+                )
+            continue
+
+        severity = damage_severity(assessment)
+        incidents.append(
+            {
+                "incident_type_id": incident_type_id,
+                "severity": severity,
+                "priority": (
+                    1
+                    if assessment.handling == "Immediate"
+                    else PRIORITY_BY_SEVERITY[severity]
+                ),
+                "location": location,
+                "address": assessment.address,
+                "title": f"{assessment.damage_class} damage: {assessment.address}",
+                "description": (
+                    f"{assessment.type_structure}, tag {assessment.tag}, estimate ${assessment.estimate}. "
+                    f"{assessment.comments} (damage report {assessment.msg_no} from {assessment.op_call})"
+                ),
+                "reported_at": assessment.reported_at,
+                "source_ref": source_ref,
+            }
+        )
+        msg_nos.append(assessment.msg_no)
+
+    incident_ids = create_incidents(connection, incidents, created_by)
+    return list(zip(msg_nos, incident_ids))
+
+
+# When invoked, pass the --config, typically pointing to
+# /etc/{installation-name}/config.json.  Creates incidents for the damage reports
+# matching the filters.
+def main():
+    ap = argparse.ArgumentParser(description="incidents-from-damage")
+    ap.add_argument(
+        "--config",
+        default=DEFAULT_CFG,
+        help=f"Path to config file (default: {DEFAULT_CFG})",
+    )
+    ap.add_argument("--op-call", help="Only reports from this operator")
+    ap.add_argument("--start", help="Only reports at or after this time")
+    ap.add_argument("--end", help="Only reports at or before this time")
+    ap.add_argument(
+        "--tag",
+        action="append",
+        choices=sorted(DA.TAG_VALUES),
+        help="Only reports with this tag; repeat for several (default: all)",
+    )
+    args = ap.parse_args()
+
+    config_repo = CF.Config()  # singleton
+    config_repo.load("main", args.config)
+    config = config_repo.config("main")
+
+    logger = build_logger(config["database"].get("log_level", "INFO"))
+
+    damage_database = DA.DamageDB(config)
+    database = DB.ScenarioDB(config)
+    if damage_database.conn is None or database.conn is None:
+        return
+
+    try:
+        assessments = [
+            assessment
+            for assessment in DA.iter_from_database(
+                damage_database.conn, args.op_call, args.start, args.end
+            )
+            if not args.tag or assessment.tag in args.tag
+        ]
+        created = create_incidents_from_damage(
+            database.conn, assessments, logger=logger
+        )
+        for msg_no, incident_id in created:
+            logger.info(f"✅ [Incidents] {incident_id} created for damage report {msg_no}")
+        logger.info(
+            f"✅ [Incidents] Created {len(created)} incidents from {len(assessments)} damage reports"
+        )
+    except Exception as e:
+        logger.error(f"❌ [Incidents] {e}")
+    finally:
+        damage_database.close()
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
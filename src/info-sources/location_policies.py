@@ -0,0 +1,286 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# TimescaleDB policies for tracked_asset_locations, the position history
+# hypertable.  Compresses old chunks (segmented by asset_id), drops chunks past
+# the retention window and maintains tracked_asset_positions_1m, a continuous
+# aggregate of one position per asset per minute used for track playback.
+#
+#   python location_policies.py --config config.json apply
+#   python location_policies.py --config config.json show
+
+import argparse
+import config as CF
+import log_setup as LG
+import scenario_db as DB
+
+DEFAULT_CFG = "/etc/situational-awareness/config.json"
+
+HYPERTABLE = "tracked_asset_locations"
+ROLLUP_VIEW = "tracked_asset_positions_1m"
+
+# Compression layout of HYPERTABLE: segmentby columns, and (column, ascending) orderby
+COMPRESS_SEGMENTBY = ("asset_id",)
+COMPRESS_ORDERBY = (("timestamp", False),)
+
+# Defaults for the "location_history" config section.  Intervals are PostgreSQL
+# interval strings; a null drop_after keeps data forever.
+DEFAULT_POLICIES = {
+    "compress_after": "1 day",
+    "drop_after": "30 days",
+    "rollup_refresh_interval": "1 minute",
+    "rollup_refresh_lookback": "1 hour",
+    "rollup_drop_after": None,
+}
+
+
+def build_logger(level: str):
+    return LG.get_logger("location_policies", level)
+
+
+def policy_config(config):
+    """Return the location_history config section merged over DEFAULT_POLICIES."""
+    policies = dict(DEFAULT_POLICIES)
+    policies.update(config.get("location_history", {}))
+    return policies
+
+
+def _interval_seconds(cursor, interval):
+    cursor.execute("SELECT EXTRACT(EPOCH FROM %s::INTERVAL)", (interval,))
+    return cursor.fetchone()[0]
+
+
+def _compression_settings(cursor):
+    # Current (segmentby, orderby) of HYPERTABLE in the form of COMPRESS_*; both
+    # empty if compression has never been enabled
+    cursor.execute(
+        """
+		SELECT attname, segmentby_column_index, orderby_column_index, orderby_asc
+		FROM timescaledb_information.compression_settings
+		WHERE hypertable_name = %s;
+		""",
+        (HYPERTABLE,),
+    )
+    records = cursor.fetchall()
+    segmentby = sorted((index, name) for name, index, _, _ in records if index is not None)
+    orderby = sorted(
+        (index, name, ascending) for name, _, index, ascending in records if index is not None
+    )
+    segmentby = tuple(name for _, name in segmentby)
+    orderby = tuple((name, ascending) for _, name, ascending in orderby)
+    return segmentby, orderby
+
+
+def apply_policies(connection, policies, logger):
+    """
+    Create or replace the compression, retention and rollup policies.  Safe to
+    re-run; each policy is removed and re-added with the configured settings.
+    The compression layout is only set when it differs, since TimescaleDB
+    refuses to change it once chunks have been compressed.
+
+    Args:
+                                    connection: psycopg2 connection; switched to autocommit because
+                                                continuous aggregates cannot be created inside a transaction
+                                    policies (dict): As returned by policy_config()
+                                    logger: Logger for progress messages
+
+    Raises:
+                                    ValueError: If raw data would be dropped before the rollup has read it
+    """
+
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        # The rollup refreshes from raw rows up to rollup_refresh_lookback old, so
+        # those rows must outlive the lookback window
+        if policies["drop_after"] is not None and _interval_seconds(
+            cursor, policies["drop_after"]
+        ) <= _interval_seconds(cursor, policies["rollup_refresh_lookback"]):
+            raise ValueError(
+                f"drop_after ({policies['drop_after']}) must be longer than "
+                f"rollup_refresh_lookback ({policies['rollup_refresh_lookback']})"
+            )
+
+        if _compression_settings(cursor) != (COMPRESS_SEGMENTBY, COMPRESS_ORDERBY):
+            orderby = ", ".join(
+                f"{name} {'ASC' if ascending else 'DESC'}" for name, ascending in COMPRESS_ORDERBY
+            )
+            cursor.execute(
+                f"""
+				ALTER TABLE {HYPERTABLE} SET (
+					timescaledb.compress,
+					timescaledb.compress_segmentby = '{", ".join(COMPRESS_SEGMENTBY)}',
+					timescaledb.compress_orderby = '{orderby}'
+				);
+				"""
+            )
+        cursor.execute(
+            "SELECT remove_compression_policy(%s, if_exists => TRUE)", (HYPERTABLE,)
+        )
+        cursor.execute(
+            "SELECT add_compression_policy(%s, compress_after => %s::INTERVAL)",
+            (HYPERTABLE, policies["compress_after"]),
+        )
+        logger.info(
+            f"✅ [Policies] Compressing {HYPERTABLE} chunks older than {policies['compress_after']}"
+        )
+
+        cursor.execute(
+            "SELECT remove_retention_policy(%s, if_exists => TRUE)", (HYPERTABLE,)
+        )
+        if policies["drop_after"] is not None:
+            cursor.execute(
+                "SELECT add_retention_policy(%s, drop_after => %s::INTERVAL)",
+                (HYPERTABLE, policies["drop_after"]),
+            )
+            logger.info(
+                f"✅ [Policies] Dropping {HYPERTABLE} chunks older than {policies['drop_after']}"
+            )
+
+        cursor.execute(
+            f"""
+			CREATE MATERIALIZED VIEW IF NOT EXISTS {ROLLUP_VIEW}
+			WITH (timescaledb.continuous) AS
+			SELECT asset_id,
+			       time_bucket(INTERVAL '1 minute', timestamp) AS bucket,
+			       last(location, timestamp) AS location,
+			       last(status, timestamp) AS status,
+			       COUNT(*) AS samples
+			FROM {HYPERTABLE}
+			GROUP BY asset_id, bucket
+			WITH NO DATA;
+			"""
+        )
+        cursor.execute(
+            "SELECT remove_continuous_aggregate_policy(%s, if_exists => TRUE)",
+            (ROLLUP_VIEW,),
+        )
+        cursor.execute(
+            """
+			SELECT add_continuous_aggregate_policy(%s,
+				start_offset => %s::INTERVAL,
+				end_offset => INTERVAL '1 minute',
+				schedule_interval => %s::INTERVAL)
+			""",
+            (
+                ROLLUP_VIEW,
+                policies["rollup_refresh_lookback"],
+                policies["rollup_refresh_interval"],
+            ),
+        )
+        logger.info(
+            f"✅ [Policies] Refreshing {ROLLUP_VIEW} every {policies['rollup_refresh_interval']}"
+        )
+
+        cursor.execute(
+            "SELECT remove_retention_policy(%s, if_exists => TRUE)", (ROLLUP_VIEW,)
+        )
+        if policies["rollup_drop_after"] is not None:
+            cursor.execute(
+                "SELECT add_retention_policy(%s, drop_after => %s::INTERVAL)",
+                (ROLLUP_VIEW, policies["rollup_drop_after"]),
+            )
+            logger.info(
+                f"✅ [Policies] Dropping {ROLLUP_VIEW} rows older than {policies['rollup_drop_after']}"
+            )
+
+
+def describe_policies(connection):
+    """
+    Report the policy jobs and the current size of the position history.
+
+    Returns:
+                                    dict: "jobs" (list of dicts) and "storage" (dict)
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+			SELECT j.job_id, j.proc_name, j.hypertable_name, j.schedule_interval::TEXT,
+			       j.config::TEXT, s.last_run_status, s.last_successful_finish, s.next_start
+			FROM timescaledb_information.jobs j
+			LEFT JOIN timescaledb_information.job_stats s ON s.job_id = j.job_id
+			WHERE j.proc_name IN ('policy_compression', 'policy_retention', 'policy_refresh_continuous_aggregate')
+			ORDER BY j.job_id;
+			"""
+        )
+        job_columns = [
+            "job_id",
+            "proc_name",
+            "hypertable_name",
+            "schedule_interval",
+            "config",
+            "last_run_status",
+            "last_successful_finish",
+            "next_start",
+        ]
+        jobs = [dict(zip(job_columns, record)) for record in cursor.fetchall()]
+
+        cursor.execute(
+            """
+			SELECT hypertable_size(%s),
+			       (SELECT COUNT(*) FROM timescaledb_information.chunks WHERE hypertable_name = %s),
+			       (SELECT COUNT(*) FROM timescaledb_information.chunks WHERE hypertable_name = %s AND is_compressed),
+			       (SELECT MIN(range_start) FROM timescaledb_information.chunks WHERE hypertable_name = %s)
+			""",
+            (HYPERTABLE, HYPERTABLE, HYPERTABLE, HYPERTABLE),
+        )
+        total_bytes, chunks, compressed_chunks, oldest = cursor.fetchone()
+        storage = {
+            "total_bytes": total_bytes,
+            "chunks": chunks,
+            "compressed_chunks": compressed_chunks,
+            "oldest_chunk_start": oldest,
+        }
+    return {"jobs": jobs, "storage": storage}
+
+
+# When invoked, pass the --config, typically pointing to
+# /etc/{installation-name}/config.json, and either apply or show
+def main():
+    ap = argparse.ArgumentParser(description="location-policies")
+    ap.add_argument(
+        "--config",
+        default=DEFAULT_CFG,
+        help=f"Path to config file (default: {DEFAULT_CFG})",
+    )
+    ap.add_argument(
+        "command",
+        choices=["apply", "show"],
+        help="apply the configured policies, or show the current ones",
+    )
+    args = ap.parse_args()
+
+    config_repo = CF.Config()  # singleton
+    config_repo.load("main", args.config)
+    config = config_repo.config("main")
+
+    logger = build_logger(config["database"].get("log_level", "INFO"))
+
+    database = DB.ScenarioDB(config)
+    if database.conn is None:
+        return
+
+    try:
+        if args.command == "apply":
+            apply_policies(database.conn, policy_config(config), logger)
+        report = describe_policies(database.conn)
+        for job in report["jobs"]:
+            logger.info(
+                f"🚨 [Policies] Job {job['job_id']} {job['proc_name']} on {job['hypertable_name']} "
+                f"every {job['schedule_interval']} {job['config']}: last run {job['last_run_status']}, "
+                f"next {job['next_start']}"
+            )
+        storage = report["storage"]
+        logger.info(
+            f"🚨 [Policies] {HYPERTABLE}: {storage['total_bytes']} bytes in {storage['chunks']} chunks "
+            f"({storage['compressed_chunks']} compressed), oldest from {storage['oldest_chunk_start']}"
+        )
+    except Exception as e:
+        logger.error(f"❌ [Policies] {e}")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Central logging setup.  Every module's build_logger() comes here instead of
+# calling logging.basicConfig itself.
+#
+# Records are put on a queue by the logging thread and formatted and written by
+# a QueueListener thread, so console and file I/O never happen on the packet
+# path.  Messages use %-style arguments, which are only formatted if a record is
+# actually emitted.  Per-packet messages pass extra=PER_PACKET and can be
+# sampled, keeping one in every sample_every of each such message.
+#
+# Settings come from the optional "logging" config section:
+#   {"level": "INFO", "json": false, "file": null, "sample_every": 1}
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime, timezone
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+DEFAULT_SETTINGS = {
+    "level": "INFO",
+    "json": False,
+    "file": None,
+    "sample_every": 1,
+}
+
+# Pass as extra= on messages logged once per packet so they can be sampled
+PER_PACKET = {"per_packet": True}
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with time, level, logger and message."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """Pass the first and then every Nth record of each per-packet message template."""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, int(every))
+        self.counts = {}
+
+    def filter(self, record):
+        if self.every == 1 or not getattr(record, "per_packet", False):
+            return True
+        key = (record.name, record.msg)
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        return count % self.every == 0
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() formats the message on the calling thread; leave that
+    # to the listener.  Records stay in-process, so they need not be pickleable.
+    def prepare(self, record):
+        return record
+
+
+def configure(level="INFO", json_output=False, log_file=None, sample_every=1):
+    """
+    Install (or replace) the root queue handler and its listener.  Safe to call
+    again, e.g. once the config file has been read.
+    """
+    global _listener, _queue_handler
+
+    formatter = JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    with _lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            _listener.stop()
+            root.removeHandler(_queue_handler)
+        _queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+        _queue_handler.addFilter(SampleFilter(sample_every))
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        _listener = logging.handlers.QueueListener(
+            _queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+
+
+def configure_from_config(config):
+    """Configure logging from the "logging" section of a loaded config dict."""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(config.get("logging", {}))
+    configure(
+        settings["level"], settings["json"], settings["file"], settings["sample_every"]
+    )
+
+
+def get_logger(name, level="INFO"):
+    """Return a named logger at the given level, configuring logging on first use."""
+    if _listener is None:
+        configure(level)
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    return logger
+
+
+def _stop():
+    # Flush whatever is still queued when the process exits
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop)
@@ -0,0 +1,222 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Inbound half of the Mattermost bridge: posts in configured Mattermost channels
+# are relayed to the mesh.  The bridge listens on the Mattermost websocket event
+# stream as a bot account that is a member of those channels, and hands each
+# new post to MeshtasticClient.send_text, whose TransmitQueue paces the radio.
+#
+# Posts by the callsign users in mattermost.users are not relayed: those came
+# from the mesh in the first place.
+#
+# The bridge is optional and must never stop mesh ingest: logging in, resolving
+# the channels and the websocket itself all run on the bridge's own thread, and
+# any failure there is logged and retried with backoff.
+#
+# Settings come from the optional "bridge" object of the "mattermost" config
+# section:
+#   {"enabled": false,
+#    "token": null,                            bot token; defaults to admin-token
+#    "format": "{sender}: {message}",
+#    "retry": 30, "max_retry": 300,            seconds between connection attempts
+#    "channels": [{"team": "Palo Alto OES", "channel": "Field Reports",
+#                  "destination": "^all", "channel_index": 0, "priority": null}]}
+# A channel's priority ("high", "normal" or "low") applies to all its posts; null
+# leaves it to the transmit queue (short texts high, others normal).  Low-priority
+# posts are coalesced, held or dropped when the mesh is busy; see TransmitQueue.
+#
+# The bridge subscribes to config reloads (apply_config); only "enabled" needs a
+# restart.
+
+import asyncio
+import json
+import log_setup as LG
+import threading
+
+from mattermostdriver import Driver
+
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "token": None,
+    "format": "{sender}: {message}",
+    "retry": 30,  # seconds before the first reconnection attempt, doubling
+    "max_retry": 300,  # ... up to this
+    "channels": [],
+}
+
+
+def build_logger(level: str):
+    return LG.get_logger("mattermost_bridge", level)
+
+
+class MattermostBridge:
+    """
+    Relays Mattermost posts to the mesh.
+
+    Args:
+                                    config (dict): Loaded config; uses the "mattermost" section
+                                    send_text (callable): send_text(text, destination, channel_index, priority) queues text
+                                                          for the mesh
+    """
+
+    def __init__(self, config, send_text, logger=None):
+        mattermost_config = config.get("mattermost", {})
+        self.send_text = send_text
+        self.logger = logger or build_logger(mattermost_config.get("log_level", "INFO"))
+        self.routes = {}  # channel ID -> (destination, channel_index, priority)
+        self.user_id = None
+        self.driver = None
+        self._stopping = threading.Event()
+        self._reconnect = threading.Event()  # set by a reload that changes the connection, and close()
+        self._thread = None
+        self._configure(mattermost_config)
+
+    def _configure(self, mattermost_config):
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(mattermost_config.get("bridge", {}))
+        self.settings = settings
+        self.driver_options = {
+            "url": mattermost_config.get("host", ""),
+            "token": settings["token"] or mattermost_config.get("admin-token", ""),
+            "scheme": mattermost_config.get("scheme", "http"),
+            "port": int(mattermost_config.get("port", 80)),
+            "basepath": mattermost_config.get("basepath", "/api/v4").rstrip("/"),
+            "keepalive": True,  # the driver reconnects the websocket itself
+            "keepalive_delay": 5,
+        }
+        # Posts from these users came from the mesh
+        self.mesh_users = {
+            user["callsign"].lower()
+            for user in mattermost_config.get("users", [])
+            if "callsign" in user
+        }
+
+    def apply_config(self, config, sections):
+        """
+        Config reload subscriber.  The format and mesh users apply to the next post;
+        changed channels or connection settings reconnect the bridge.  Turning
+        the bridge on or off needs a restart.
+        """
+        old_settings, old_options = self.settings, self.driver_options
+        self._configure(config.get("mattermost", {}))
+        if (
+            self.driver_options != old_options
+            or self.settings["channels"] != old_settings["channels"]
+        ):
+            self.logger.info("🚨 [Bridge] Configuration changed, reconnecting")
+            self._reconnect.set()
+            self._disconnect()
+
+    def start(self):
+        """Connect and listen on a background thread; returns at once and never raises."""
+        self._thread = threading.Thread(target=self._run, name="mattermost-bridge", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        # Logs in and resolves the bridged channels; True if there is anything to listen to
+        self.driver = Driver(self.driver_options)
+        me = self.driver.login()
+        self.user_id = me.get("id")
+        self.routes = self._resolve_routes()
+        if not self.routes:
+            self.logger.warning("🚨 [Bridge] No bridged channels found")
+            return False
+        self.logger.info(f"✅ [Bridge] Relaying {len(self.routes)} Mattermost channels to the mesh")
+        return True
+
+    def _run(self):
+        # The driver runs the websocket on the thread's own event loop
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        retry = float(self.settings["retry"])
+        while not self._stopping.is_set():
+            try:
+                if self._connect():
+                    retry = float(self.settings["retry"])
+                    self.driver.init_websocket(self._on_event)
+            except Exception as e:
+                self.logger.error(f"❌ [Bridge] Not connected to Mattermost: {e}")
+            # close() and a reload that changes the connection cut the wait short
+            self._reconnect.wait(retry)
+            if self._stopping.is_set():
+                break
+            if self._reconnect.is_set():
+                self._reconnect.clear()
+                retry = float(self.settings["retry"])
+                continue
+            self.logger.info("🚨 [Bridge] Reconnecting to Mattermost")
+            retry = min(retry * 2, float(self.settings["max_retry"]))
+
+    def _resolve_routes(self):
+        teams = {team["display_name"]: team["id"] for team in self.driver.teams.get_user_teams(self.user_id)}
+        routes = {}
+        channels_by_team = {}
+        for entry in self.settings["channels"]:
+            team_id = teams.get(entry.get("team"))
+            if team_id is None:
+                self.logger.error(f"❌ [Bridge] Bot is not in team {entry.get('team')}")
+                continue
+            if team_id not in channels_by_team:
+                channels_by_team[team_id] = {
+                    channel["display_name"]: channel["id"]
+                    for channel in self.driver.channels.get_channels_for_user(self.user_id, team_id)
+                }
+            channel_id = channels_by_team[team_id].get(entry.get("channel"))
+            if channel_id is None:
+                self.logger.error(
+                    f"❌ [Bridge] Bot is not in channel {entry.get('channel')} of team {entry.get('team')}"
+                )
+                continue
+            routes[channel_id] = (
+                entry.get("destination", "^all"),
+                int(entry.get("channel_index", 0)),
+                entry.get("priority"),
+            )
+        return routes
+
+    async def _on_event(self, message):
+        try:
+            self.handle_event(json.loads(message))
+        except Exception as e:
+            self.logger.error(f"❌ [Bridge] Error handling event: {e}")
+
+    def handle_event(self, event):
+        """
+        Relay one websocket event if it is a new user post in a bridged channel.
+
+        Returns:
+                                        bool: True if the post was queued for the mesh
+        """
+        if event.get("event") != "posted":
+            return False
+        data = event.get("data", {})
+        post = json.loads(data.get("post", "{}"))
+        route = self.routes.get(post.get("channel_id"))
+        if route is None or post.get("type") or post.get("user_id") == self.user_id:
+            return False  # other channel, system message, or our own post
+        sender = data.get("sender_name", "").lstrip("@")
+        if sender.lower() in self.mesh_users:
+            return False
+        message = " ".join(post.get("message", "").split())
+        if not message:
+            return False
+        destination, channel_index, priority = route
+        text = self.settings["format"].format(sender=sender, message=message)
+        packets = self.send_text(text, destination, channel_index, priority)
+        self.logger.info(
+            f"✅ [Bridge] Relayed post from {sender} to {destination} in {packets} packets"
+        )
+        return True
+
+    def close(self):
+        self._stopping.set()
+        self._reconnect.set()
+        self._disconnect()
+
+    def _disconnect(self):
+        driver = self.driver
+        if driver is not None and getattr(driver, "websocket", None) is not None:
+            try:
+                driver.websocket.disconnect()
+            except Exception as e:
+                self.logger.error(f"❌ [Bridge] Error disconnecting: {e}")
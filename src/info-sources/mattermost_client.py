@@ -3,12 +3,23 @@
 # Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
 
 from mattermostdriver import Driver
-import logging
+from mattermostdriver import exceptions as mm_exceptions
+import log_setup as LG
+import mattermost_digest as MD
+import mattermost_poster as MP
+import metrics as MX
+import tracing as TR
+import time
 
 
 def build_logger(level: str):
-    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(message)s")
-    return logging.getLogger("mattermost_client")
+    return LG.get_logger("mattermost_client", level)
+
+
+POST_SECONDS = MX.histogram(
+    "mattermost_post_seconds", "Time to look up the channel and create a post"
+)
+POST_FAILURES = MX.counter("mattermost_post_failures_total", "Post attempts that failed")
 
 
 class MattermostClient:
@@ -22,6 +33,9 @@ class MattermostClient:
         self.team = self.mattermost_config.get("team", "")
         self.admin_token = self.mattermost_config.get("admin-token", "")
         self.users = self.mattermost_config.get("users", [])
+        self.users_by_callsign = {
+            user["callsign"].lower(): user for user in self.users if "callsign" in user
+        }
         self.mattermost_login_config = {
             "url": self.host,
             "token": self.admin_token,
@@ -29,20 +43,105 @@ class MattermostClient:
             "port": self.port,
             "basepath": self.basepath,
         }
+        self.request_timeout = float(
+            self.mattermost_config.get("posting", {}).get(
+                "request_timeout", MP.DEFAULT_SETTINGS["request_timeout"]
+            )
+        )
         self.logger = build_logger(
             self.mattermost_config.get("log_level", "INFO")
         )  # build_logger(logging.INFO)
+        # Logged-in drivers and resolved channel IDs are kept between posts;
+        # only the poster thread touches them
         self.admin_driver = None
-        self.user_driver = None
+        self.user_drivers = {}  # token -> Driver
+        self.channel_ids = {}  # (callsign, channel name) -> channel ID
+        # Partial lookups, kept so a retry after a 429 resumes where it stopped
+        self.user_ids = {}  # user name -> user ID
+        self.teams = {}  # user ID -> teams list
+        self._pending_users = None  # users_by_callsign from a reload, for the poster thread
+        self.poster = MP.MattermostPoster(
+            self._deliver,
+            lambda callsign: self._lookup_user_by_callsign(callsign)[2],
+            self.mattermost_config.get("posting", {}),
+            self.logger,
+        )
+        self.digest = None
+        self._configure_digest(self.mattermost_config.get("digest", {}))
+
+    def apply_config(self, config, sections):
+        # Config reload subscriber, on the config watcher thread.  The digest is
+        # retuned here; the users and everything looked up for them belong to the
+        # poster thread, which picks them up before its next delivery.
+        mattermost_section = sections.get("mattermost")
+        users = mattermost_section.users if mattermost_section else ()
+        self._pending_users = {
+            user.callsign: {
+                "callsign": user.callsign,
+                "team": user.team,
+                "channel": user.channel,
+                "token": user.token,
+                "digest_channel": user.digest_channel,
+            }
+            for user in users
+        }
+        self.config = config
+        self.mattermost_config = config.get("mattermost", {})
+        self._configure_digest(self.mattermost_config.get("digest", {}))
+        self.logger.info(
+            f"✅ [Mattermost] Configuration reloaded, {len(self._pending_users)} users"
+        )
+
+    def _apply_pending_users(self):
+        # On the poster thread: switch to the reloaded users list
+        users_by_callsign, self._pending_users = self._pending_users, None
+        if users_by_callsign is None:
+            return
+        self.users_by_callsign = users_by_callsign
+        self.users = list(users_by_callsign.values())
+        # Channels or tokens may have changed; look them up again
+        self.channel_ids = {}
+        self.user_ids = {}
+        self.teams = {}
+        user_drivers, self.user_drivers = self.user_drivers, {}
+        for driver in user_drivers.values():
+            self._logout(driver)
+
+    def _configure_digest(self, settings):
+        # Starts, retunes or stops digest mode to match the settings
+        if settings.get("enabled", False):
+            if self.digest is None:
+                self.digest = MD.DigestAggregator(
+                    self._post, self._digest_channel, settings, self.logger
+                )
+            else:
+                self.digest.configure(settings)
+        elif self.digest is not None:
+            self.digest.stop()
+            self.digest = None
+
+    def _digest_channel(self, callsign):
+        user = self.users_by_callsign.get(callsign.lower())
+        return user.get("digest_channel") if user else None
 
     def close(self):
-        if self.user_driver is not None:
-            self.user_driver.logout()
-            self.user_driver = None
-        if self.admin_driver is not None:
-            self.admin_driver.logout()
-            self.admin_driver = None
+        if self.digest is not None:
+            self.digest.stop()
+            self.digest = None
+        self.poster.stop()
+        for driver in [self.admin_driver, *self.user_drivers.values()]:
+            if driver is not None:
+                self._logout(driver)
+        self.admin_driver = None
+        self.user_drivers = {}
+
+    def _logout(self, driver):
+        try:
+            driver.logout()
+        except Exception as e:
+            self.logger.info(f"🚨 [Mattermost] Logout failed: {e}")
 
+    @TR.traced("mattermost.callback")
     def callback(self, callback_data):
         try:
             match callback_data["type"]:
@@ -51,7 +150,11 @@ class MattermostClient:
                     from_number = callback_data["from"]
                     message = callback_data["message"]
                     self.logger.info(
-                        f"✅ [Mattermost] Message from {callsign} ({from_number}): <{message}>"
+                        "✅ [Mattermost] Message from %s (%s): <%s>",
+                        callsign,
+                        from_number,
+                        message,
+                        extra=LG.PER_PACKET,
                     )
                     self._post(callback_data["callsign"], callback_data["message"])
                 case "position":
@@ -61,16 +164,44 @@ class MattermostClient:
                     lon = callback_data.get("longitude", 0.0)
                     alt = callback_data.get("altitude", 0.0)
                     self.logger.info(
-                        f"✅ [Mattermost] Position from {callsign} ({from_number}): lat={lat}, lon={lon}, alt={alt}"
+                        "✅ [Mattermost] Position from %s (%s): lat=%s, lon=%s, alt=%s",
+                        callsign,
+                        from_number,
+                        lat,
+                        lon,
+                        alt,
+                        extra=LG.PER_PACKET,
                     )
+                    if self.digest is not None:
+                        self.digest.add_position(callsign.lower(), lat, lon, alt)
                 case "telemetry":
                     callsign = callback_data["callsign"]
                     from_number = callback_data["from"]
                     battery = callback_data.get("battery", "unknown")
                     uptime = callback_data.get("uptime", "unknown")
                     self.logger.info(
-                        f"✅ [Mattermost] Telemetry from {callsign} ({from_number}): battery={battery}, uptime={uptime}"
+                        "✅ [Mattermost] Telemetry from %s (%s): battery=%s, uptime=%s",
+                        callsign,
+                        from_number,
+                        battery,
+                        uptime,
+                        extra=LG.PER_PACKET,
                     )
+                    if self.digest is not None:
+                        self.digest.add_telemetry(
+                            callsign.lower(),
+                            callback_data.get("battery"),
+                            callback_data.get("uptime"),
+                        )
+                case "geofence":
+                    callsign = callback_data["callsign"]
+                    from_number = callback_data["from"]
+                    verb = "entered" if callback_data["event"] == "enter" else "left"
+                    message = f"{callsign} {verb} {callback_data['zone']} ({callback_data['jurisdiction']})"
+                    self.logger.info(
+                        f"✅ [Mattermost] Geofence from {callsign} ({from_number}): {message}"
+                    )
+                    self._post(callsign, message)
                 case _:
                     self.logger.info(
                         f"❌ [Mattermost] Unknown callback type: {callback_data['type']}"
@@ -80,79 +211,108 @@ class MattermostClient:
 
     # Returns the text team annd channel names as well as the user's token
     def _lookup_user_by_callsign(self, callsign):
-        team = ""
-        channel = ""
-        token = ""
-        callsign_lower = callsign.lower()
-        for user in self.users:
-            if user["callsign"] == callsign_lower:
-                team = user["team"]
-                channel = user["channel"]
-                token = user["token"]
-                break
-        return team, channel, token
+        user = self.users_by_callsign.get(callsign.lower())
+        if user is None:
+            return "", "", ""
+        return user["team"], user["channel"], user["token"]
+
+    def _driver(self, token):
+        driver = Driver(
+            dict(self.mattermost_login_config, token=token, request_timeout=self.request_timeout)
+        )
+        driver.login()
+        return driver
+
+    def _user_driver(self, token):
+        driver = self.user_drivers.get(token)
+        if driver is None:
+            driver = self.user_drivers[token] = self._driver(token)
+        return driver
+
+    def _admin(self, request, *args):
+        # One admin-token request, charged to the admin token's rate limit bucket
+        return self.poster.metered(self.admin_token, request, *args)
 
+    @TR.traced("mattermost.channel_lookup")
     def _get_channel_id_by_name(self, channel_name, team_name, user_name):
-        try:
-            self.admin_driver = Driver(self.mattermost_login_config)
-            self.admin_driver.login()
-        except Exception as e:
-            self.logger.error(
-                f"[Mattermost] Could not establish a connection to the Mattermost server {self.host} for the admin user"
-            )
-        user_id = self.admin_driver.users.get_user_by_username(user_name).get("id")
-        teams = self.admin_driver.teams.get_user_teams(user_id)
+        """
+        Resolve a user's channel by team and channel display names.  Every
+        request uses the admin token and is metered against its own bucket.
+
+        Raises:
+                                        PermanentPostError: If the user, team or channel does not exist
+                                        MP.Throttled: If the admin token is rate limited
+                                        Exception: If the server cannot be reached
+        """
+        admin = self._admin
+        if self.admin_driver is None:
+            self.admin_driver = admin(self._driver, self.admin_token)
+        user_id = self.user_ids.get(user_name)
+        if user_id is None:
+            try:
+                user = admin(self.admin_driver.users.get_user_by_username, user_name)
+            except mm_exceptions.ResourceNotFound:
+                raise MP.PermanentPostError(f"No Mattermost user {user_name}")
+            user_id = self.user_ids[user_name] = user.get("id")
+        teams = self.teams.get(user_id)
+        if teams is None:
+            teams = self.teams[user_id] = admin(self.admin_driver.teams.get_user_teams, user_id)
         team = next((team for team in teams if team["display_name"] == team_name), None)
         if team is None:
-            self.logger.warning(
-                f"[Mattermost] Team {team_name} not found for user {user_name}."
-            )
-            return
-        team_id = team["id"]
-        channels = self.admin_driver.channels.get_channels_for_user(user_id, team_id)
-        if not channels:
-            self.logger.warning(f"[Mattermost] No channels found for team {team_name}.")
-            return
+            raise MP.PermanentPostError(f"Team {team_name} not found for user {user_name}")
+        channels = admin(self.admin_driver.channels.get_channels_for_user, user_id, team["id"])
         channel = next(
             (
                 channel
-                for channel in channels
+                for channel in channels or []
                 if channel["display_name"] == channel_name
             ),
             None,
         )
         if channel is None:
-            self.logger.warning(
-                f"[Mattermost] Channel {channel_name} not found in team {team_name}."
+            raise MP.PermanentPostError(
+                f"Channel {channel_name} not found in team {team_name}"
             )
-            return
-        self.close()
         return channel["id"]
 
-    def _post(self, callsign, message):
-        callsign = (
-            callsign.lower()
-        )  # the user dictionary and Mattermost use lower case callsigns
+    # Queues the post; the poster thread delivers it, see mattermost_poster.
+    # channel names a channel in the user's team to post to instead of their own.
+    def _post(self, callsign, message, channel=None):
+        # the user dictionary and Mattermost use lower case callsigns
+        self.poster.post(callsign.lower(), message, channel)
+
+    @TR.traced("mattermost.post")
+    def _deliver(self, callsign, message, channel=None):
+        self._apply_pending_users()
+        started = time.perf_counter()
+        # Whether this attempt reuses a session logged in by an earlier one
+        reused_session = self.admin_driver is not None
         try:
-            team, channel, token = self._lookup_user_by_callsign(callsign)
-            channel_id = self._get_channel_id_by_name(channel, team, callsign)
-            user_login_config = {
-                "url": self.host,
-                "token": token,
-                "scheme": self.scheme,
-                "port": self.port,
-                "basepath": self.basepath,
-            }
-            self.user_driver = Driver(user_login_config)
-            self.user_driver.login()
+            team, own_channel, token = self._lookup_user_by_callsign(callsign)
+            reused_session = reused_session or token in self.user_drivers
+            if not token:
+                raise MP.PermanentPostError(f"No Mattermost user configured for {callsign}")
+            channel = channel or own_channel
+            channel_id = self.channel_ids.get((callsign, channel))
+            if channel_id is None:
+                channel_id = self._get_channel_id_by_name(channel, team, callsign)
+                self.channel_ids[(callsign, channel)] = channel_id
             post_dict = {
                 "channel_id": channel_id,
                 "message": message,
             }
-            self.user_driver.posts.create_post(post_dict)
+            self._user_driver(token).posts.create_post(post_dict)
         except Exception as e:
-            self.logger.error(
-                f"[Mattermost] Could not establish a connection to the Mattermost server {self.host} for user {callsign}"
-            )
+            POST_FAILURES.inc()
+            if isinstance(e, mm_exceptions.NoAccessTokenProvided):
+                # The session or token is no longer valid; log in again next time
+                self.admin_driver = None
+                self.user_drivers.pop(token, None)
+                if not reused_session:
+                    # Fresh logins were refused, so the token itself is bad
+                    raise MP.PermanentPostError(
+                        f"Mattermost refused the token for {callsign}: {e}"
+                    ) from e
+            raise
         finally:
-            self.close()
+            POST_SECONDS.observe(time.perf_counter() - started)
@@ -0,0 +1,193 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Digests of position and telemetry reports for Mattermost.  Rather than one
+# post per packet, reports are aggregated per callsign over a window and each
+# callsign that reported gets one compact post per window, e.g.
+#
+#   Digest 17:00-17:05  K6ABC: 12 positions, last 37.44190,-122.14300 alt 20 m,
+#   moved 1.24 km; battery 87% -> 81%, uptime 3h12m
+#
+# Chat text is not digested; MattermostClient still posts it immediately.
+#
+# Settings come from the optional "digest" object of the "mattermost" config
+# section:
+#   {"enabled": false, "window": 300, "channel": null}
+# channel null posts each digest to the callsign's own channel; a user entry's
+# "digest_channel" overrides both.
+
+import log_setup as LG
+import math
+import threading
+import time
+
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "window": 300,  # seconds
+    "channel": None,  # channel name in each user's team; None for the user's own channel
+}
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def build_logger(level: str):
+    return LG.get_logger("mattermost_digest", level)
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two points given in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _format_distance(meters):
+    return f"{meters / 1000:.2f} km" if meters >= 1000 else f"{meters:.0f} m"
+
+
+def _format_uptime(seconds):
+    hours, remainder = divmod(int(seconds), 3600)
+    return f"{hours}h{remainder // 60:02d}m"
+
+
+class CallsignDigest:
+    """What one callsign reported during the current window."""
+
+    __slots__ = (
+        "positions",
+        "last_position",
+        "distance_m",
+        "telemetry",
+        "battery_first",
+        "battery_last",
+        "battery_min",
+        "uptime",
+    )
+
+    def __init__(self):
+        self.positions = 0
+        self.last_position = None  # (lat, lon, alt)
+        self.distance_m = 0.0
+        self.telemetry = 0
+        self.battery_first = None
+        self.battery_last = None
+        self.battery_min = None
+        self.uptime = None
+
+    def summary(self):
+        parts = []
+        if self.positions:
+            lat, lon, alt = self.last_position
+            text = f"{self.positions} position{'s' if self.positions != 1 else ''}, last {lat:.5f},{lon:.5f}"
+            if alt is not None:
+                text += f" alt {alt} m"
+            text += f", moved {_format_distance(self.distance_m)}"
+            parts.append(text)
+        if self.battery_last is not None:
+            text = f"battery {self.battery_first}%"
+            if self.battery_last != self.battery_first:
+                text += f" -> {self.battery_last}%"
+            if self.battery_min < min(self.battery_first, self.battery_last):
+                text += f" (min {self.battery_min}%)"
+            if self.uptime is not None:
+                text += f", uptime {_format_uptime(self.uptime)}"
+            parts.append(text)
+        return "; ".join(parts)
+
+
+class DigestAggregator:
+    """
+    Aggregates reports and hands each callsign's summary to post once per window.
+
+    Args:
+                                    post (callable): post(callsign, message, channel) queues a Mattermost post
+                                    channel_for (callable): channel_for(callsign) returns the user's digest channel or None
+                                    settings (dict): Overrides of DEFAULT_SETTINGS
+    """
+
+    def __init__(self, post, channel_for, settings=None, logger=None):
+        self.post = post
+        self.channel_for = channel_for
+        self.logger = logger or build_logger("INFO")
+        self.lock = threading.Lock()
+        self.digests = {}  # callsign -> CallsignDigest for the current window
+        # Last position seen per callsign, kept across windows so the first
+        # move of a window counts toward its distance
+        self.last_positions = {}
+        self.configure(settings)
+        self.window_start = time.time()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mattermost-digest", daemon=True)
+        self._thread.start()
+
+    def configure(self, settings):
+        merged = dict(DEFAULT_SETTINGS)
+        merged.update(settings or {})
+        self.window = float(merged["window"])
+        self.channel = merged["channel"]
+
+    def _digest(self, callsign):
+        digest = self.digests.get(callsign)
+        if digest is None:
+            digest = self.digests[callsign] = CallsignDigest()
+        return digest
+
+    def add_position(self, callsign, lat, lon, alt=None):
+        if lat is None or lon is None:
+            return
+        with self.lock:
+            digest = self._digest(callsign)
+            previous = self.last_positions.get(callsign)
+            if previous is not None:
+                digest.distance_m += haversine_m(previous[0], previous[1], lat, lon)
+            digest.positions += 1
+            digest.last_position = (lat, lon, alt)
+            self.last_positions[callsign] = (lat, lon)
+
+    def add_telemetry(self, callsign, battery=None, uptime=None):
+        with self.lock:
+            digest = self._digest(callsign)
+            digest.telemetry += 1
+            if battery is not None:
+                if digest.battery_first is None:
+                    digest.battery_first = digest.battery_min = battery
+                digest.battery_last = battery
+                digest.battery_min = min(digest.battery_min, battery)
+            if uptime is not None:
+                digest.uptime = uptime
+
+    def flush(self):
+        """Post a summary for every callsign that reported since the last flush."""
+        with self.lock:
+            digests, self.digests = self.digests, {}
+            started, self.window_start = self.window_start, time.time()
+        if not digests:
+            return
+        window = f"{time.strftime('%H:%M', time.localtime(started))}-{time.strftime('%H:%M')}"
+        for callsign, digest in sorted(digests.items()):
+            summary = digest.summary()
+            if not summary:
+                continue
+            try:
+                self.post(
+                    callsign,
+                    f"Digest {window}  {callsign.upper()}: {summary}",
+                    self.channel_for(callsign) or self.channel,
+                )
+            except Exception as e:
+                self.logger.error(f"❌ [Mattermost] Could not queue digest for {callsign}: {e}")
+        self.logger.info(f"✅ [Mattermost] Queued digests for {len(digests)} callsigns")
+
+    def _run(self):
+        while not self._stopping.wait(max(1.0, self.window_start + self.window - time.time())):
+            if time.time() >= self.window_start + self.window:
+                self.flush()
+
+    def stop(self):
+        """Stop the window timer and post what has been gathered so far."""
+        self._stopping.set()
+        self._thread.join(5.0)
+        self.flush()
@@ -0,0 +1,459 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Reliable delivery of Mattermost posts.  Posts are written to an on-disk outbox
+# (SQLite) and delivered by one background thread, so a slow or down server
+# never blocks the packet path and nothing is lost across a restart.
+#
+# - Each user token has a token bucket, so posting stays under the server's rate
+#   limit; a 429 pauses that token's bucket for the Retry-After interval.
+#   Requests a delivery makes with another token (the admin token's channel
+#   lookups) go through metered(), which charges and pauses that token's bucket
+#   instead, and defers the post without counting an attempt.
+# - Transient failures (connection errors, timeouts, 5xx) are retried with
+#   exponential backoff, up to max_attempts per post.
+# - A circuit breaker opens after breaker_failures consecutive transient
+#   failures.  While it is open, no requests are made and posts wait in the
+#   outbox; after breaker_reset seconds a single post is sent as a probe.
+#   Failed probes do not count against the post's attempts, so posts are kept
+#   until the server recovers.
+# - Permanent failures (unknown user or channel, 4xx other than 429) drop the
+#   post with an error.
+#
+# Settings come from the optional "posting" object of the "mattermost" config
+# section; see DEFAULT_SETTINGS.
+
+import log_setup as LG
+import metrics as MX
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+from mattermostdriver import exceptions as mm_exceptions
+
+DEFAULT_SETTINGS = {
+    "outbox": "/var/lib/situational-awareness/mattermost-outbox.sqlite3",
+    "rate": 5.0,  # posts per second per user token
+    "burst": 10,  # posts a token may make at once
+    "max_attempts": 8,  # transient failures before a post is dropped
+    "backoff": 1.0,  # seconds before the first retry, doubling each attempt
+    "max_backoff": 60.0,
+    "breaker_failures": 5,  # consecutive transient failures that open the breaker
+    "breaker_reset": 30.0,  # seconds the breaker stays open before a probe
+    "request_timeout": 10.0,  # seconds per HTTP request
+}
+
+# How _classify sees a failed delivery
+PERMANENT = "permanent"
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"
+
+# mattermostdriver raises these for 4xx responses; retrying will not help.
+# NoAccessTokenProvided (401) is not among them: an expired session is retried
+# after logging in again, and deliver raises PermanentPostError if the new login
+# is refused too.
+_PERMANENT_ERRORS = (
+    mm_exceptions.InvalidOrMissingParameters,
+    mm_exceptions.NotEnoughPermissions,
+    mm_exceptions.ResourceNotFound,
+    mm_exceptions.MethodNotAllowed,
+    mm_exceptions.ContentTooLarge,
+    mm_exceptions.FeatureDisabled,
+)
+
+IDLE_WAIT = 5.0  # seconds between outbox checks when nothing is due
+BATCH = 50  # posts read from the outbox at a time
+
+OUTBOX_DEPTH = MX.gauge("mattermost_outbox_depth", "Posts waiting in the outbox")
+POSTS_DELIVERED = MX.counter("mattermost_posts_delivered_total", "Posts delivered")
+POSTS_DROPPED = MX.counter(
+    "mattermost_posts_dropped_total", "Posts given up on, by reason", ("reason",)
+)
+POST_RETRIES = MX.counter(
+    "mattermost_post_retries_total", "Posts rescheduled, by reason", ("reason",)
+)
+BREAKER_OPEN = MX.gauge(
+    "mattermost_breaker_open", "1 while the circuit breaker is open or probing"
+)
+
+
+def build_logger(level: str):
+    return LG.get_logger("mattermost_poster", level)
+
+
+class PermanentPostError(Exception):
+    """The post can never be delivered as addressed, e.g. the callsign has no channel."""
+
+
+class Throttled(Exception):
+    """A metered request's token is rate limited; the post is retried after retry_after seconds."""
+
+    def __init__(self, token, retry_after, message):
+        super().__init__(message)
+        self.token = token
+        self.retry_after = retry_after
+
+
+def _classify(error):
+    """Return (PERMANENT | RATE_LIMITED | TRANSIENT, retry_after seconds or None)."""
+    if isinstance(error, (PermanentPostError,) + _PERMANENT_ERRORS):
+        return PERMANENT, None
+    if isinstance(error, mm_exceptions.NoAccessTokenProvided):
+        return TRANSIENT, None
+    if isinstance(error, Throttled):
+        return RATE_LIMITED, error.retry_after
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status == 429:
+            try:
+                retry_after = float(error.response.headers.get("Retry-After", 1))
+            except ValueError:
+                retry_after = 1.0
+            return RATE_LIMITED, max(retry_after, 0.0)
+        if 400 <= status < 500:
+            return PERMANENT, None
+    return TRANSIENT, None
+
+
+class TokenBucket:
+    """rate tokens per second up to burst; pause() empties it until a given time."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until a token is available; 0 if one is available now."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def pause(self, now, seconds):
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = now + seconds
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout, logger):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.logger = logger
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self, now):
+        """True if a request may be made; moves an expired open breaker to half-open."""
+        if self.state == self.OPEN and now >= self.opened_at + self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.logger.info("🚨 [Mattermost] Circuit half-open, sending a probe post")
+        return self.state != self.OPEN
+
+    def retry_in(self, now):
+        return max(0.0, self.opened_at + self.reset_timeout - now)
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            self.logger.info("✅ [Mattermost] Circuit closed, server is reachable again")
+        self.state = self.CLOSED
+        self.failures = 0
+        BREAKER_OPEN.set(0)
+
+    def record_failure(self, now):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.logger.info(
+                f"🚨 [Mattermost] Probe failed, holding posts for another {self.reset_timeout}s"
+            )
+        elif self.failures >= self.failure_threshold:
+            self.logger.error(
+                f"❌ [Mattermost] Circuit open after {self.failures} failures, "
+                f"holding posts for {self.reset_timeout}s"
+            )
+        else:
+            return
+        self.state = self.OPEN
+        self.opened_at = now
+        BREAKER_OPEN.set(1)
+
+
+class Outbox:
+    """
+    Posts waiting for delivery, in a SQLite file.  next_attempt is wall-clock
+    time so that schedules survive a restart.
+    """
+
+    def __init__(self, path):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL with synchronous=NORMAL survives a crash of the daemon without an
+        # fsync per post; only a power loss can lose the last few posts
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            """
+			CREATE TABLE IF NOT EXISTS outbox (
+			    id INTEGER PRIMARY KEY AUTOINCREMENT,
+			    callsign TEXT NOT NULL,
+			    message TEXT NOT NULL,
+			    channel TEXT,
+			    attempts INTEGER NOT NULL DEFAULT 0,
+			    next_attempt REAL NOT NULL,
+			    created_at REAL NOT NULL,
+			    last_error TEXT
+			)
+			"""
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_next_attempt ON outbox (next_attempt, id)"
+        )
+        # Outboxes written before posts could name a channel lack the column
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(outbox)")}
+        if "channel" not in columns:
+            self.db.execute("ALTER TABLE outbox ADD COLUMN channel TEXT")
+
+    def put(self, callsign, message, channel=None):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO outbox (callsign, message, channel, next_attempt, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (callsign, message, channel, now, now),
+            )
+
+    def due(self, limit=BATCH):
+        """Return up to limit (id, callsign, message, channel, attempts) rows that are due, oldest first."""
+        with self.lock:
+            return self.db.execute(
+                "SELECT id, callsign, message, channel, attempts FROM outbox "
+                "WHERE next_attempt <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+
+    def next_due_in(self):
+        """Seconds until the earliest post is due, or None if the outbox is empty."""
+        with self.lock:
+            (next_attempt,) = self.db.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()
+        return None if next_attempt is None else max(0.0, next_attempt - time.time())
+
+    def delete(self, post_id):
+        with self.lock:
+            self.db.execute("DELETE FROM outbox WHERE id = ?", (post_id,))
+
+    def reschedule(self, post_id, delay, attempts=None, error=None):
+        with self.lock:
+            self.db.execute(
+                "UPDATE outbox SET next_attempt = ?, attempts = COALESCE(?, attempts), "
+                "last_error = COALESCE(?, last_error) WHERE id = ?",
+                (time.time() + delay, attempts, error, post_id),
+            )
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class MattermostPoster:
+    """
+    Queue posts and deliver them from a background thread.
+
+    Args:
+                                    deliver (callable): deliver(callsign, message, channel) makes one post; raises on failure
+                                    token_for (callable): token_for(callsign) returns the user token, the rate limit key
+                                    settings (dict): Overrides of DEFAULT_SETTINGS
+                                    logger: Logger for delivery problems
+    """
+
+    def __init__(self, deliver, token_for, settings=None, logger=None):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self.deliver = deliver
+        self.token_for = token_for
+        self.logger = logger or build_logger("INFO")
+        try:
+            self.outbox = Outbox(self.settings["outbox"])
+        except (OSError, sqlite3.Error) as e:
+            self.logger.error(
+                f"❌ [Mattermost] Cannot open outbox {self.settings['outbox']}, "
+                f"posts will not survive a restart: {e}"
+            )
+            self.outbox = Outbox(":memory:")
+        OUTBOX_DEPTH.set_function(lambda: len(self.outbox))
+        self.breaker = CircuitBreaker(
+            int(self.settings["breaker_failures"]),
+            float(self.settings["breaker_reset"]),
+            self.logger,
+        )
+        self.buckets = {}  # user token -> TokenBucket
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mattermost-poster", daemon=True)
+        self._thread.start()
+
+    def post(self, callsign, message, channel=None):
+        """Queue a post as callsign, to channel or else the user's own channel; returns at once."""
+        self.outbox.put(callsign, message, channel)
+        self._wakeup.set()
+
+    def stop(self, timeout=5.0):
+        """Stop the delivery thread.  Undelivered posts stay in the outbox for next time."""
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self.outbox.close()
+
+    def metered(self, token, request, *args, **kwargs):
+        """
+        Make one request with a token other than the posting user's, charged to
+        that token's bucket.  Call only from deliver, on the poster thread.
+
+        Raises:
+                                        Throttled: If the token's bucket is empty or the server answered 429
+        """
+        bucket = self._token_bucket(token)
+        now = time.monotonic()
+        delay = bucket.delay(now)
+        if delay > 0:
+            raise Throttled(token, delay, f"waiting {delay:.1f}s for the rate limit")
+        bucket.take(now)
+        try:
+            return request(*args, **kwargs)
+        except Exception as e:
+            kind, retry_after = _classify(e)
+            if kind != RATE_LIMITED:
+                raise
+            bucket.pause(time.monotonic(), retry_after)
+            raise Throttled(token, retry_after, str(e)) from e
+
+    def _bucket(self, callsign):
+        return self._token_bucket(self.token_for(callsign))
+
+    def _token_bucket(self, token):
+        bucket = self.buckets.get(token)
+        if bucket is None:
+            bucket = self.buckets[token] = TokenBucket(
+                float(self.settings["rate"]), self.settings["burst"]
+            )
+        return bucket
+
+    def _backoff(self, attempts):
+        delay = float(self.settings["backoff"]) * 2 ** (attempts - 1)
+        # Jitter spreads retries of posts that failed together
+        return min(float(self.settings["max_backoff"]), delay) * random.uniform(0.5, 1.0)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                wait = self._deliver_due()
+            except Exception as e:
+                self.logger.error(f"❌ [Mattermost] Poster error: {e}")
+                wait = IDLE_WAIT
+            if wait > 0:
+                self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def _deliver_due(self):
+        """Attempt the posts that are due.  Returns how long to wait before the next pass."""
+        if not self.breaker.allow(time.monotonic()):
+            return self.breaker.retry_in(time.monotonic())
+        rows = self.outbox.due()
+        if not rows:
+            next_due = self.outbox.next_due_in()
+            return IDLE_WAIT if next_due is None else min(next_due, IDLE_WAIT)
+
+        for post_id, callsign, message, channel, attempts in rows:
+            if self._stopping.is_set():
+                return 0
+            now = time.monotonic()
+            bucket = self._bucket(callsign)
+            delay = bucket.delay(now)
+            if delay > 0:
+                self.outbox.reschedule(post_id, delay)
+                continue
+            bucket.take(now)
+            probing = self.breaker.state == CircuitBreaker.HALF_OPEN
+            try:
+                self.deliver(callsign, message, channel)
+            except Exception as e:
+                self._failed(post_id, callsign, attempts, probing, bucket, e)
+                if self.breaker.state == CircuitBreaker.OPEN:
+                    return 0  # the next pass waits out the breaker
+                continue
+            self.outbox.delete(post_id)
+            POSTS_DELIVERED.inc()
+            self.breaker.record_success()
+        return 0
+
+    def _failed(self, post_id, callsign, attempts, probing, bucket, error):
+        kind, retry_after = _classify(error)
+        now = time.monotonic()
+        if kind == PERMANENT:
+            # The server answered, so it is healthy; the post itself is bad
+            self.breaker.record_success()
+            self.outbox.delete(post_id)
+            POSTS_DROPPED.labels("rejected").inc()
+            self.logger.error(f"❌ [Mattermost] Dropped post for {callsign}: {error}")
+        elif kind == RATE_LIMITED:
+            if isinstance(error, Throttled):
+                # Another token's bucket (already paused) held the post up before
+                # the user's own request was made
+                bucket.refund()
+            else:
+                bucket.pause(now, retry_after)
+            self.outbox.reschedule(post_id, retry_after, error=str(error))
+            POST_RETRIES.labels("rate_limited").inc()
+            self.logger.warning(
+                f"🚨 [Mattermost] Rate limited posting for {callsign}, retrying in {retry_after}s"
+            )
+        else:
+            self.breaker.record_failure(now)
+            if not probing:
+                attempts += 1
+            if attempts >= int(self.settings["max_attempts"]):
+                self.outbox.delete(post_id)
+                POSTS_DROPPED.labels("attempts_exhausted").inc()
+                self.logger.error(
+                    f"❌ [Mattermost] Dropped post for {callsign} after {attempts} attempts: {error}"
+                )
+                return
+            self.outbox.reschedule(
+                post_id, self._backoff(max(attempts, 1)), attempts, str(error)
+            )
+            POST_RETRIES.labels("transient").inc()
+            self.logger.warning(
+                f"🚨 [Mattermost] Post for {callsign} failed (attempt {attempts}): {error}"
+            )
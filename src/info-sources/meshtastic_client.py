@@ -6,17 +6,439 @@ import meshtastic.tcp_interface as meshtastic_tcp
 
 from pubsub import pub  # https://pypubsub.readthedocs.io/en/v4.0.3/
 import logging
+import log_setup as LG
 import config as CF
 import argparse
+import heapq
+import itertools
+import math
+import threading
 import time
+from collections import Counter, deque
 from mattermost_client import MattermostClient
+from mattermost_bridge import MattermostBridge
 import pprint
 import scenario_db as DB
+import metrics as MX
+import tracing as TR
+import profiler as PF
+import geofence as GF
+
+
+# Reasons _onReceive (or a handler) drops a packet, as counted in drop_counts
+DROP_IGNORED_NODE = "ignored_node"
+DROP_UNDECODED = "undecoded"
+DROP_UNHANDLED_PORTNUM = "unhandled_portnum"
+DROP_NO_DEVICE_METRICS = "no_device_metrics"
+
+
+PACKETS = MX.counter(
+    "meshtastic_packets_total", "Decoded packets received, by portnum", ("portnum",)
+)
+PACKETS_DROPPED = MX.counter(
+    "meshtastic_packets_dropped_total", "Packets dropped, by reason", ("reason",)
+)
+HANDLER_SECONDS = MX.histogram(
+    "meshtastic_handler_seconds", "Time to handle a packet, by portnum", ("portnum",)
+)
+TRANSMIT_QUEUE_DEPTH = MX.gauge(
+    "meshtastic_transmit_queue_depth", "Outbound packets waiting, by priority", ("priority",)
+)
+TRANSMIT_QUEUED_AIRTIME = MX.gauge(
+    "meshtastic_transmit_queued_airtime_seconds", "Estimated airtime of the outbound packets waiting"
+)
+TRANSMIT_WINDOW_AIRTIME = MX.gauge(
+    "meshtastic_transmit_window_airtime_seconds",
+    "Estimated airtime of our transmissions in the current duty window",
+)
+TRANSMIT_AIRTIME = MX.counter(
+    "meshtastic_transmit_airtime_seconds_total", "Estimated airtime of packets sent, by priority", ("priority",)
+)
+TRANSMIT_COALESCED = MX.counter(
+    "meshtastic_transmit_coalesced_total", "Low-priority texts merged into another packet"
+)
+TRANSMIT_EXPIRED = MX.counter(
+    "meshtastic_transmit_expired_total", "Low-priority packets dropped after max_defer"
+)
+CHANNEL_UTILIZATION = MX.gauge(
+    "meshtastic_channel_utilization_percent", "Channel utilization the transmit scheduler is using"
+)
+AIR_UTIL_TX = MX.gauge(
+    "meshtastic_air_util_tx_percent", "Our node's transmit airtime utilization from its telemetry"
+)
 
 
 def build_logger(level: str):
-    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(message)s")
-    return logging.getLogger("meshtastic_client")
+    return LG.get_logger("meshtastic_client", level)
+
+
+# Outbound priorities, most urgent first
+PRIORITY_HIGH = 0  # short operational traffic
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2  # deferrable, e.g. routine status; may be coalesced or held back
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+PRIORITIES_BY_NAME = {name: priority for priority, name in PRIORITY_NAMES.items()}
+COALESCE_SEPARATOR = " | "
+
+# LoRa parameters of the Meshtastic modem presets: spreading factor, bandwidth
+# in Hz and coding rate denominator (4/5 .. 4/8)
+MODEM_PRESETS = {
+    "SHORT_TURBO": (7, 500000, 5),
+    "SHORT_FAST": (7, 250000, 5),
+    "SHORT_SLOW": (8, 250000, 5),
+    "MEDIUM_FAST": (9, 250000, 5),
+    "MEDIUM_SLOW": (10, 250000, 5),
+    "LONG_FAST": (11, 250000, 5),
+    "LONG_MODERATE": (11, 125000, 8),
+    "LONG_SLOW": (12, 125000, 8),
+}
+PREAMBLE_SYMBOLS = 16
+# Mesh packet header, protobuf framing and encryption overhead added to a text payload
+PACKET_OVERHEAD_BYTES = 32
+# Bounds of meshtastic.transmit.max_payload: the data payload limit, and enough
+# below it to leave room for text after the "(n/n) " numbering
+MIN_PAYLOAD = 16
+MAX_PAYLOAD = 233
+
+DEFAULT_TRANSMIT_SETTINGS = {
+    "modem_preset": "LONG_FAST",
+    "duty_cycle": 0.10,  # fraction of duty_window our transmissions may occupy
+    "duty_window": 600,  # seconds
+    "min_interval": 2.0,  # seconds between transmissions
+    "max_payload": 200,  # bytes of text per packet, below the 233-byte data payload limit
+    "short_text": 48,  # texts up to this many bytes go out at PRIORITY_HIGH
+    # Channel utilization (percent, from deviceMetrics telemetry) above which
+    # queued low-priority texts to the same destination are merged into one packet
+    "coalesce_utilization": 15.0,
+    # ... and above which low-priority texts are held until it drops.  Firmware
+    # itself delays most sends above 25%.
+    "defer_utilization": 25.0,
+    "defer_air_util_tx": 7.0,  # percent of the hour our node transmitted, also holds low priority
+    "max_defer": 900,  # seconds a low-priority text may wait before it is dropped
+    "utilization_max_age": 3600,  # seconds a telemetry report counts; device metrics come every 30 min
+}
+
+
+def airtime_seconds(payload_bytes, modem_preset="LONG_FAST"):
+    """
+    Time on air of one LoRa packet (Semtech AN1200.13), explicit header and CRC on.
+
+    Args:
+                                    payload_bytes (int): Application payload; PACKET_OVERHEAD_BYTES is added
+                                    modem_preset (str): Key of MODEM_PRESETS
+    """
+    spreading_factor, bandwidth, coding_rate = MODEM_PRESETS[modem_preset]
+    symbol_time = (2**spreading_factor) / bandwidth
+    low_data_rate = 1 if symbol_time > 0.016 else 0
+    length = payload_bytes + PACKET_OVERHEAD_BYTES
+    payload_symbols = 8 + max(
+        math.ceil(
+            (8 * length - 4 * spreading_factor + 28 + 16)
+            / (4 * (spreading_factor - 2 * low_data_rate))
+        )
+        * coding_rate,
+        0,
+    )
+    return (PREAMBLE_SYMBOLS + 4.25 + payload_symbols) * symbol_time
+
+
+def _split_text(text, budget):
+    # Pieces of at most budget bytes, broken at a space in their second half if there is one
+    pieces = []
+    remaining = text
+    while remaining:
+        piece = remaining
+        while len(piece.encode("utf-8")) > budget:
+            piece = piece[: max(1, len(piece) * budget // len(piece.encode("utf-8")) - 1)]
+        if piece != remaining:
+            space = piece.rfind(" ")
+            if space > budget // 2:
+                piece = piece[:space]
+        pieces.append(piece.strip())
+        remaining = remaining[len(piece) :].lstrip()
+    return pieces
+
+
+def chunk_text(text, max_bytes):
+    """
+    Split text into pieces of at most max_bytes UTF-8 bytes, breaking at spaces
+    where possible and numbering the pieces "(1/3) ..." when there is more than one.
+
+    Raises:
+                                    ValueError: If max_bytes leaves no room for text after the numbering
+    """
+    if len(text.encode("utf-8")) <= max_bytes:
+        return [text]
+    count = 1
+    while True:
+        # Leave room for the "(n/n) " prefix, as wide as the final count makes it
+        budget = max_bytes - len(f"({count}/{count}) ")
+        if budget < 4:  # the longest UTF-8 character
+            raise ValueError(f"{max_bytes} bytes is too small for {count} numbered pieces")
+        chunks = _split_text(text, budget)
+        if len(str(len(chunks))) <= len(str(count)):
+            break
+        count = len(chunks)
+    return [f"({i}/{len(chunks)}) {chunk}" for i, chunk in enumerate(chunks, 1)]
+
+
+class TransmitQueue:
+    """
+    Outbound text for the mesh.  Texts are chunked to the payload limit and
+    queued by priority; one thread sends them through the interface, keeping
+    our estimated airtime within duty_cycle of any duty_window and at least
+    min_interval apart.  A more urgent text waiting behind a paced one goes first.
+
+    Channel utilization and our node's airUtilTx come from deviceMetrics
+    telemetry (note_utilization).  When the channel is busy, waiting
+    PRIORITY_LOW texts are coalesced, then held; a held text that waits longer
+    than max_defer is dropped.  Higher priorities are only paced.
+    """
+
+    def __init__(self, interface, settings=None, logger=None):
+        self.interface = interface
+        self.settings = dict(DEFAULT_TRANSMIT_SETTINGS)
+        self.settings.update(settings or {})
+        self.logger = logger or build_logger("INFO")
+        self.modem_preset = self.settings["modem_preset"]
+        if self.modem_preset not in MODEM_PRESETS:
+            raise ValueError(
+                f"meshtastic.transmit.modem_preset must be one of {sorted(MODEM_PRESETS)}"
+            )
+        if not MIN_PAYLOAD <= int(self.settings["max_payload"]) <= MAX_PAYLOAD:
+            raise ValueError(
+                f"meshtastic.transmit.max_payload must be {MIN_PAYLOAD} to {MAX_PAYLOAD} bytes"
+            )
+        # (priority, sequence, queued at, text, destination, channel_index, airtime)
+        self._heap = []
+        self._sequence = itertools.count()
+        self._sent = deque()  # (monotonic time, airtime) of recent transmissions
+        self._last_sent = 0.0
+        self._reports = {}  # node number -> (monotonic time, channelUtilization, airUtilTx)
+        self._coalesce_pending = False
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="mesh-transmit", daemon=True)
+        self._thread.start()
+
+    def send_text(self, text, destination="^all", channel_index=0, priority=None):
+        """
+        Queue text for the mesh.
+
+        Args:
+                                        text (str): Message text; split into numbered chunks if too long
+                                        destination (str or int): Node ID such as "!da574b90", or "^all"
+                                        channel_index (int): Meshtastic channel to send on
+                                        priority (int or str, optional): PRIORITY_* or its name ("high", "normal",
+                                                                         "low"); by default short texts are PRIORITY_HIGH
+
+        Returns:
+                                        int: Number of packets queued
+
+        Raises:
+                                        ValueError: If priority is not a known priority, or the text needs too many
+                                                    chunks to number within max_payload
+        """
+        if isinstance(priority, str):
+            if priority.lower() not in PRIORITIES_BY_NAME:
+                raise ValueError(f"priority must be one of {sorted(PRIORITIES_BY_NAME)}")
+            priority = PRIORITIES_BY_NAME[priority.lower()]
+        text = " ".join(text.split())
+        if not text:
+            return 0
+        if priority is None:
+            short = len(text.encode("utf-8")) <= int(self.settings["short_text"])
+            priority = PRIORITY_HIGH if short else PRIORITY_NORMAL
+        chunks = chunk_text(text, int(self.settings["max_payload"]))
+        now = time.monotonic()
+        with self._condition:
+            for chunk in chunks:
+                airtime = airtime_seconds(len(chunk.encode("utf-8")), self.modem_preset)
+                heapq.heappush(
+                    self._heap,
+                    (priority, next(self._sequence), now, chunk, destination, channel_index, airtime),
+                )
+            if priority == PRIORITY_LOW:
+                self._coalesce_pending = True
+            self._publish()
+            self._condition.notify()
+        return len(chunks)
+
+    def depth(self):
+        with self._condition:
+            return len(self._heap)
+
+    def note_utilization(self, node_num, channel_utilization, air_util_tx=None):
+        """
+        Record a deviceMetrics report.
+
+        Args:
+                                        node_num (int): Reporting node
+                                        channel_utilization (float): Percent of time the node heard the channel busy
+                                        air_util_tx (float, optional): Percent of the last hour the node transmitted
+        """
+        if channel_utilization is None:
+            return
+        with self._condition:
+            self._reports[node_num] = (time.monotonic(), float(channel_utilization), air_util_tx)
+            self._condition.notify()  # held traffic may now go
+
+    def _local_node_num(self):
+        my_info = getattr(self.interface, "myInfo", None)
+        return getattr(my_info, "my_node_num", None)
+
+    def utilization(self):
+        """
+        Current (channel utilization, our airUtilTx) in percent.  Our own node's
+        report is used when it is fresh; otherwise the busiest fresh report from
+        any node.  Either value is None when unknown.
+        """
+        with self._condition:
+            return self._utilization(time.monotonic())
+
+    def _utilization(self, now):
+        oldest = now - float(self.settings["utilization_max_age"])
+        fresh = {node: report for node, report in self._reports.items() if report[0] >= oldest}
+        own = fresh.get(self._local_node_num())
+        if own is not None:
+            channel, air_util_tx = own[1], own[2]
+        else:
+            channel = max((report[1] for report in fresh.values()), default=None)
+            air_util_tx = None
+        CHANNEL_UTILIZATION.set(channel or 0.0)
+        AIR_UTIL_TX.set(air_util_tx or 0.0)
+        return channel, air_util_tx
+
+    def _defer_low(self, now):
+        channel, air_util_tx = self._utilization(now)
+        return (channel is not None and channel >= float(self.settings["defer_utilization"])) or (
+            air_util_tx is not None and air_util_tx >= float(self.settings["defer_air_util_tx"])
+        )
+
+    def _coalesce_low(self, now):
+        channel, _ = self._utilization(now)
+        return channel is not None and channel >= float(self.settings["coalesce_utilization"])
+
+    def _expire_low(self, now):
+        # Drop low-priority entries that have waited longer than max_defer
+        oldest = now - float(self.settings["max_defer"])
+        kept = [entry for entry in self._heap if entry[0] != PRIORITY_LOW or entry[2] >= oldest]
+        expired = len(self._heap) - len(kept)
+        if expired:
+            heapq.heapify(kept)
+            self._heap = kept
+            TRANSMIT_EXPIRED.inc(expired)
+            self.logger.warning(f"🚨 [Meshtastic] Dropped {expired} low-priority packets held too long")
+
+    def _coalesce(self):
+        # Merge waiting low-priority texts for the same destination and channel,
+        # in queued order, into as few packets as fit max_payload
+        max_payload = int(self.settings["max_payload"])
+        separator_bytes = len(COALESCE_SEPARATOR.encode("utf-8"))
+        others = [entry for entry in self._heap if entry[0] != PRIORITY_LOW]
+        merged = {}  # (destination, channel_index) -> [entry, ...]
+        merges = 0
+        for entry in sorted(entry for entry in self._heap if entry[0] == PRIORITY_LOW):
+            _, sequence, queued_at, text, destination, channel_index, _ = entry
+            group = merged.setdefault((destination, channel_index), [])
+            if group:
+                last = group[-1]
+                size = len(last[3].encode("utf-8")) + separator_bytes + len(text.encode("utf-8"))
+                if size <= max_payload:
+                    combined = last[3] + COALESCE_SEPARATOR + text
+                    # Keeps the earlier sequence and age, so the merged packet keeps its place
+                    group[-1] = last[:3] + (combined, destination, channel_index,
+                                            airtime_seconds(size, self.modem_preset))
+                    merges += 1
+                    continue
+            group.append(entry)
+        if merges:
+            self._heap = others + [entry for group in merged.values() for entry in group]
+            heapq.heapify(self._heap)
+            TRANSMIT_COALESCED.inc(merges)
+        self._coalesce_pending = False
+
+    def _publish(self):
+        depths = Counter(entry[0] for entry in self._heap)
+        for priority, name in PRIORITY_NAMES.items():
+            TRANSMIT_QUEUE_DEPTH.labels(name).set(depths[priority])
+        TRANSMIT_QUEUED_AIRTIME.set(sum(entry[6] for entry in self._heap))
+        TRANSMIT_WINDOW_AIRTIME.set(sum(spent for _, spent in self._sent))
+
+    def _delay(self, airtime, now):
+        # Seconds until a packet of this airtime fits the pacing rules
+        window = float(self.settings["duty_window"])
+        while self._sent and self._sent[0][0] <= now - window:
+            self._sent.popleft()
+        delay = self._last_sent + float(self.settings["min_interval"]) - now
+        budget = float(self.settings["duty_cycle"]) * window
+        used = sum(spent for _, spent in self._sent)
+        for sent_at, spent in self._sent:
+            if used + airtime <= budget:
+                break
+            # Wait for this transmission to age out of the window
+            used -= spent
+            delay = max(delay, sent_at + window - now)
+        return max(0.0, delay)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                now = time.monotonic()
+                if self._heap[0][0] == PRIORITY_LOW:
+                    # Only low-priority traffic is waiting
+                    self._expire_low(now)
+                    if not self._heap:
+                        self._publish()
+                        continue
+                    if self._defer_low(now):
+                        # Woken by new traffic or telemetry, else when the oldest expires
+                        self._publish()
+                        oldest = min(entry[2] for entry in self._heap)
+                        self._condition.wait(
+                            max(0.1, oldest + float(self.settings["max_defer"]) - now)
+                        )
+                        continue
+                    if self._coalesce_pending and self._coalesce_low(now):
+                        self._coalesce()
+                delay = self._delay(self._heap[0][6], now)
+                if delay > 0:
+                    # Re-examined on wake-up, so a more urgent text can overtake
+                    self._condition.wait(delay)
+                    continue
+                priority, _, _, text, destination, channel_index, airtime = heapq.heappop(
+                    self._heap
+                )
+                self._sent.append((now, airtime))
+                self._last_sent = now
+                self._publish()
+            TRANSMIT_AIRTIME.labels(PRIORITY_NAMES.get(priority, priority)).inc(airtime)
+            try:
+                self.interface.sendText(
+                    text, destinationId=destination, channelIndex=channel_index
+                )
+                self.logger.info(
+                    f"✅ [Meshtastic] Sent {len(text.encode('utf-8'))} bytes to {destination} "
+                    f"(priority {priority}, {airtime:.2f}s airtime)"
+                )
+            except Exception as e:
+                self.logger.error(f"❌ [Meshtastic] Could not send to {destination}: {e}")
+
+    def close(self):
+        """Stop sending; texts still queued are dropped."""
+        with self._condition:
+            self._stopping = True
+            dropped = len(self._heap)
+            self._heap = []
+            self._publish()
+            self._condition.notify()
+        self._thread.join(5.0)
+        if dropped:
+            self.logger.info(f"🚨 [Meshtastic] Dropped {dropped} queued outbound packets")
 
 
 def loggerInfo(my_logger):
@@ -28,7 +450,7 @@ def loggerInfo(my_logger):
 
 
 class MeshtasticClient:
-    def __init__(self, config, mattermost_callback, database):
+    def __init__(self, config, mattermost_callback, database, interface=None):
         self.config = config
         self.meshtastic_config = config.get("meshtastic", None)
         self.database_config = config.get("database", None)
@@ -39,7 +461,33 @@ class MeshtasticClient:
         self.database = database
         self.esv_dict = {}
         self.tracked_asset_type_set = set()
-        self.ignore_list = self.meshtastic_config.get("ignore_list", [])
+        self.ignored_nodes = frozenset(self.meshtastic_config.get("ignore_list", []))
+        self.drop_counts = Counter()  # reason -> packets dropped by _onReceive
+        self.portnum_handlers = {
+            "TEXT_MESSAGE_APP": self._onTextMessageReceive,
+            "POSITION_APP": self._onPositionReceive,
+            "TELEMETRY_APP": self._onTelemetryReceive,
+        }
+        self.geofence = None
+        geofence_config = config.get("geofence", {})
+        if geofence_config.get("enabled", False) and database.conn is not None:
+            try:
+                self.geofence = GF.GeofenceEngine.from_database(
+                    database.conn, geofence_config.get("boundary_types", None)
+                )
+                self.logger.info(
+                    f"✅ [Meshtastic] Geofencing against {len(self.geofence.zones)} boundaries"
+                )
+            except Exception as e:
+                self.logger.error(f"❌ [Meshtastic] Error loading geofence boundaries: {e}")
+        if interface is not None:
+            # An already-open interface (or a stand-in for benchmarks); packets
+            # are fed to _onReceive by the caller, so nothing is subscribed
+            self.meshtastic_interface = interface
+            self.transmit = TransmitQueue(
+                interface, self.meshtastic_config.get("transmit", {}), self.logger
+            )
+            return
         # Establish a connection to the Meshtastic device
         try:
             self.meshtastic_interface = meshtastic_tcp.TCPInterface(
@@ -54,19 +502,40 @@ class MeshtasticClient:
             logging.getLogger("meshtastic_client").setLevel(logging.INFO)
             pub.setNotificationFlags(all=False)
             pub.subscribe(self._onReceive, "meshtastic.receive")
-            pub.subscribe(self._onPositionReceive, "meshtastic.receive.position")
-            pub.subscribe(self._onTelemetryReceive, "meshtastic.receive.telemetry")
             self.logger.info(
                 "✅ [Meshtastic] Connected to Meshtastic device and listening for messages"
             )
         except Exception as e:
             self.logger.error(f"❌ [Meshtastic] Error connecting to device: {e}")
             raise
+        self.transmit = TransmitQueue(
+            self.meshtastic_interface, self.meshtastic_config.get("transmit", {}), self.logger
+        )
+
+    def send_text(self, text, destination="^all", channel_index=0, priority=None):
+        """Queue text for the mesh; see TransmitQueue.send_text."""
+        return self.transmit.send_text(text, destination, channel_index, priority)
+
+    def apply_config(self, config, sections):
+        # Config reload subscriber; only the ignore list is re-derived, the radio link stays up
+        self.config = config
+        self.meshtastic_config = config.get("meshtastic", None)
+        meshtastic_section = sections.get("meshtastic")
+        self.ignored_nodes = (
+            frozenset(meshtastic_section.ignore_list) if meshtastic_section else frozenset()
+        )
+        self.logger.info(
+            f"✅ [Meshtastic] Configuration reloaded, ignoring {len(self.ignored_nodes)} nodes"
+        )
 
     def close(self):
+        self.transmit.close()
         if self.meshtastic_interface is not None:
             self.meshtastic_interface.close()
+        if self.drop_counts:
+            self.logger.info(f"🚨 [Meshtastic] Packets dropped: {dict(self.drop_counts)}")
 
+    @TR.traced("meshtastic.update_esv")
     def _update_esv(self, callsign, location):
         if "ESV" not in self.tracked_asset_type_set:
             asset_type = DB.trackedAssetType(
@@ -83,7 +552,32 @@ class MeshtasticClient:
             new_esv.update(self.database)
             self.esv_dict[callsign] = new_esv
 
+    @TR.traced("geofence.check")
+    def _check_geofence(self, callsign, lat, lon, callback_data):
+        # The events are stored before the engine moves the asset or anyone is told,
+        # so a failed insert leaves the transition to be reported on the next position
+        events, zone_ids = self.geofence.changes(callsign, lon, lat)
+        if not events:
+            return
+        try:
+            GF.record_events(self.database.conn, callsign, events, lon, lat)
+        except Exception as e:
+            self.logger.error(f"❌ [Meshtastic] Error recording geofence events: {e}")
+            return
+        self.geofence.move(callsign, zone_ids)
+        for event_type, zone in events:
+            self.mattermost_callback(
+                dict(
+                    callback_data,
+                    type="geofence",
+                    event=event_type,
+                    zone=zone.name,
+                    jurisdiction=zone.jurisdiction,
+                )
+            )
+
     # Translates a node ID into its short name and long name
+    @TR.traced("meshtastic.id_to_name")
     def _id_to_name(self, interface, id):
         short_name = ""
         long_name = ""
@@ -96,111 +590,119 @@ class MeshtasticClient:
         return short_name, long_name
 
     def _onReceive(self, packet, interface):
-        # self.logger.info("🚨 [Meshtastic] _onReceive")
-        # self.logger.info(f"🚨 [Meshtastic] Received packet <{packet}>")
-        # loggerInfo(self.logger)
-        if (
-            "decoded" in packet
-            and "portnum" in packet["decoded"]
-            and packet["decoded"]["portnum"] == "TEXT_MESSAGE_APP"
+        # Every packet arrives here once: pubsub also delivers the subtopics
+        # (meshtastic.receive.position, ...) to this listener.  Unwanted traffic is
+        # dropped before any lookup or dict building, then routed by portnum.
+        if packet.get("from") in self.ignored_nodes:
+            self._drop(DROP_IGNORED_NODE)
+            return
+        decoded = packet.get("decoded")
+        if decoded is None:
+            self._drop(DROP_UNDECODED)
+            return
+        portnum = decoded.get("portnum")
+        PACKETS.labels(portnum).inc()
+        handler = self.portnum_handlers.get(portnum)
+        if handler is None:
+            self._drop(DROP_UNHANDLED_PORTNUM)
+            return
+        rx_time = packet.get("rxTime")
+        with HANDLER_SECONDS.labels(portnum).time(), TR.span(
+            "meshtastic.packet",
+            packet_id=packet.get("id"),
+            rx_time=rx_time,
+            portnum=portnum,
+            # Time between radio reception and the start of handling
+            rx_delay_s=time.time() - rx_time if rx_time else None,
         ):
-            try:
-                if packet.get("from", 0) in self.ignore_list:
-                    return
-                text_message = packet["decoded"]["payload"].decode("utf-8")
-                # from_node = packet["from"]
-                from_id = packet["fromId"]  # from_id is of the form !da574b90
-                _, long_name = self._id_to_name(interface, from_id)
-                callsign = long_name.split()[0].upper()
-                callback_data = {
-                    "type": "message",
-                    "callsign": callsign,
-                    "message": text_message,
-                    "from": packet.get("from", "unknown"),
-                    "fromId": packet.get("fromId", "unknown"),
-                    "toId": packet.get("toId", "unknown"),
-                    "time": packet.get("time", "unknown"),
-                }
-                self.mattermost_callback(callback_data)
-            except Exception as e:
-                self.logger.error(
-                    f"❌ [Meshtastic] Error processing text message packet: {e}"
-                )
+            handler(packet, decoded, interface)
 
-    def _onPositionReceive(self, packet, interface):
-        # self.logger.info("🚨 [Meshtastic] _onPositionReceive")
-        # self.logger.info(f"🚨 [Meshtastic] Received packet <{packet}>")
-        # loggerInfo(self.logger)
-        if (
-            "decoded" in packet
-            and "portnum" in packet["decoded"]
-            and packet["decoded"]["portnum"] == "POSITION_APP"
-        ):
-            try:
-                if packet.get("from", 0) in self.ignore_list:
-                    return
-                pos = packet["decoded"]["position"]
-                from_id = packet["fromId"]  # from_id is of the form !da574b90
-                _, long_name = self._id_to_name(interface, from_id)
-                callsign = long_name.split()[0].upper()
-                lat = pos.get("latitude", None)
-                lon = pos.get("longitude", None)
-                alt = pos.get("altitude", None)
-                callback_data = {
-                    "type": "position",
-                    "callsign": callsign,
-                    "latitude": lat,
-                    "longitude": lon,
-                    "altitude": alt,
-                    "from": packet.get("from", "unknown"),
-                    "fromId": packet.get("fromId", "unknown"),
-                    "toId": packet.get("toId", "unknown"),
-                    "time": packet.get("time", "unknown"),
-                }
-                self.mattermost_callback(callback_data)
-                self._update_esv(callsign, {"lat": lat, "lon": lon})
-            except Exception as e:
-                self.logger.error(
-                    f"❌ [Meshtastic] Error processing position packet: {e}"
-                )
+    def _drop(self, reason):
+        self.drop_counts[reason] += 1
+        PACKETS_DROPPED.labels(reason).inc()
 
-    def _onTelemetryReceive(self, packet, interface):
-        # self.logger.info("🚨 [Meshtastic] _onTelemetryReceive")
-        # self.logger.info(f"🚨 [Meshtastic] Received packet <{packet}>")
-        # loggerInfo(self.logger)
-        if (
-            "decoded" in packet
-            and "portnum" in packet["decoded"]
-            and packet["decoded"]["portnum"] == "TELEMETRY_APP"
-        ):
-            try:
-                if packet.get("from", 0) in self.ignore_list:
-                    return
-                telemetry = packet["decoded"]["telemetry"]
-                deviceMetrics = telemetry.get("deviceMetrics", None)
-                if deviceMetrics is None:
-                    return
-                from_id = packet.get("fromId", None)  # from_id is of the form !da574b90
-                _, long_name = self._id_to_name(interface, from_id)
-                callsign = long_name.split()[0].upper()
-                battery = deviceMetrics.get("batteryLevel", 0)
-                uptime = deviceMetrics.get("uptimeSeconds", 0)
-                callback_data = {
-                    "type": "telemetry",
-                    "callsign": callsign,
-                    "battery": battery,
-                    "uptime": uptime,
-                    "from": packet.get("from", "unknown"),
-                    "fromId": packet.get("fromId", "unknown"),
-                    "toId": packet.get("toId", "unknown"),
-                    "time": packet.get("time", "unknown"),
-                }
-                self.mattermost_callback(callback_data)
-            except Exception as e:
-                pretty_packet = pprint.pformat(packet, indent=2)
-                self.logger.error(
-                    f"❌ [Meshtastic] Error processing telemetry packet: {e}\n<{pretty_packet}>"
-                )
+    def _onTextMessageReceive(self, packet, decoded, interface):
+        try:
+            text_message = decoded["payload"].decode("utf-8")
+            # from_node = packet["from"]
+            from_id = packet["fromId"]  # from_id is of the form !da574b90
+            _, long_name = self._id_to_name(interface, from_id)
+            callsign = long_name.split()[0].upper()
+            callback_data = {
+                "type": "message",
+                "callsign": callsign,
+                "message": text_message,
+                "from": packet.get("from", "unknown"),
+                "fromId": packet.get("fromId", "unknown"),
+                "toId": packet.get("toId", "unknown"),
+                "time": packet.get("time", "unknown"),
+            }
+            self.mattermost_callback(callback_data)
+        except Exception as e:
+            self.logger.error(
+                f"❌ [Meshtastic] Error processing text message packet: {e}"
+            )
+
+    def _onPositionReceive(self, packet, decoded, interface):
+        try:
+            pos = decoded["position"]
+            from_id = packet["fromId"]  # from_id is of the form !da574b90
+            _, long_name = self._id_to_name(interface, from_id)
+            callsign = long_name.split()[0].upper()
+            lat = pos.get("latitude", None)
+            lon = pos.get("longitude", None)
+            alt = pos.get("altitude", None)
+            callback_data = {
+                "type": "position",
+                "callsign": callsign,
+                "latitude": lat,
+                "longitude": lon,
+                "altitude": alt,
+                "from": packet.get("from", "unknown"),
+                "fromId": packet.get("fromId", "unknown"),
+                "toId": packet.get("toId", "unknown"),
+                "time": packet.get("time", "unknown"),
+            }
+            self.mattermost_callback(callback_data)
+            self._update_esv(callsign, {"lat": lat, "lon": lon})
+            if self.geofence is not None and lat is not None and lon is not None:
+                self._check_geofence(callsign, lat, lon, callback_data)
+        except Exception as e:
+            self.logger.error(f"❌ [Meshtastic] Error processing position packet: {e}")
+
+    def _onTelemetryReceive(self, packet, decoded, interface):
+        try:
+            telemetry = decoded["telemetry"]
+            deviceMetrics = telemetry.get("deviceMetrics", None)
+            if deviceMetrics is None:
+                self._drop(DROP_NO_DEVICE_METRICS)
+                return
+            self.transmit.note_utilization(
+                packet.get("from"),
+                deviceMetrics.get("channelUtilization"),
+                deviceMetrics.get("airUtilTx"),
+            )
+            from_id = packet.get("fromId", None)  # from_id is of the form !da574b90
+            _, long_name = self._id_to_name(interface, from_id)
+            callsign = long_name.split()[0].upper()
+            battery = deviceMetrics.get("batteryLevel", 0)
+            uptime = deviceMetrics.get("uptimeSeconds", 0)
+            callback_data = {
+                "type": "telemetry",
+                "callsign": callsign,
+                "battery": battery,
+                "uptime": uptime,
+                "from": packet.get("from", "unknown"),
+                "fromId": packet.get("fromId", "unknown"),
+                "toId": packet.get("toId", "unknown"),
+                "time": packet.get("time", "unknown"),
+            }
+            self.mattermost_callback(callback_data)
+        except Exception as e:
+            pretty_packet = pprint.pformat(packet, indent=2)
+            self.logger.error(
+                f"❌ [Meshtastic] Error processing telemetry packet: {e}\n<{pretty_packet}>"
+            )
 
 
 DEFAULT_CFG = "/etc/situational-awareness/config.json"
@@ -223,6 +725,12 @@ def main():
         default=DEFAULT_ASSETS,
         help=f"Path to assets file (default: {DEFAULT_ASSETS})",
     )
+    ap.add_argument(
+        "--profile",
+        type=float,
+        metavar="SECONDS",
+        help="Profile for SECONDS from startup (SIGUSR1 starts a profile at any time)",
+    )
     args = ap.parse_args()
 
     config_repo = CF.Config()  # singleton
@@ -231,13 +739,28 @@ def main():
     config = config_repo.config("main")
     assets_config = config_repo.config("assets")
 
+    LG.configure_from_config(config)
+    TR.configure_from_config(config)
     logger = build_logger(config["meshtastic"].get("log_level", "INFO"))
     logger.info("✅ [Meshtastic] Logging is active")
 
+    sampler = PF.StackSampler.from_config("meshtastic", config, logger)
+    sampler.install_signal_handler()
+    if args.profile:
+        sampler.start(args.profile)
+
     meshtastic_client = None
     mattermost_client = None
+    bridge = None
     database = None
 
+    metrics_port = config["meshtastic"].get("metrics_port", None)
+    if metrics_port is not None:
+        MX.start_http_server(
+            int(metrics_port),
+            config["meshtastic"].get("metrics_addr", MX.DEFAULT_METRICS_ADDR),
+        )
+
     try:
         assets_list = assets_config.get("assets", [])
         database = DB.ScenarioDB(config)
@@ -246,6 +769,20 @@ def main():
         meshtastic_client = MeshtasticClient(
             config, mattermost_client.callback, database
         )
+        if config.get("mattermost", {}).get("bridge", {}).get("enabled", False):
+            # Connects in the background; a Mattermost outage never stops ingest
+            try:
+                bridge = MattermostBridge(config, meshtastic_client.send_text)
+                bridge.start()
+            except Exception as e:
+                bridge = None
+                logger.error(f"❌ [Meshtastic] Mattermost bridge not started: {e}")
+        config_repo.subscribe("main", mattermost_client.apply_config)
+        config_repo.subscribe("main", meshtastic_client.apply_config)
+        if bridge is not None:
+            config_repo.subscribe("main", bridge.apply_config)
+        config_repo.install_sighup_handler()
+        config_repo.watch()
 
         # loggerInfo(logger)
 
@@ -254,6 +791,8 @@ def main():
     except KeyboardInterrupt:
         logger.info("\n🚨 [Meshtastic] Exiting.")
     finally:
+        if bridge is not None:
+            bridge.close()
         if meshtastic_client is not None:
             meshtastic_client.close()
         if mattermost_client is not None:
@@ -0,0 +1,345 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Process-wide metrics: counters, gauges and histograms, optionally labelled,
+# exported in the Prometheus text format from a small HTTP server.
+#
+#   PACKETS = metrics.counter("meshtastic_packets_total", "Packets received", ("portnum",))
+#   PACKETS.labels("POSITION_APP").inc()
+#   with metrics.histogram("db_write_seconds", "Database write latency", ("table",)).labels("damage").time():
+#       ...
+#   metrics.start_http_server(9108)   # serves /metrics on 127.0.0.1
+#
+# Metrics are created with get-or-create semantics, so any module may declare
+# the metric it needs at import time.
+
+import abc
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import log_setup as LG
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Bucket bounds for counts of rows, messages and the like rather than seconds
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Loopback unless a daemon's "metrics_addr" setting says otherwise
+DEFAULT_METRICS_ADDR = "127.0.0.1"
+
+
+def build_logger(level: str):
+    return LG.get_logger("metrics", level)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self, lock):
+        self.value = 0.0
+        self.lock = lock
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function", "lock")
+
+    def __init__(self, lock):
+        self.value = 0.0
+        self.function = None
+        self.lock = lock
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Report function() at scrape time instead of a stored value."""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, lock, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.lock = lock
+
+    def observe(self, value):
+        # First bound >= value; the last bound is +Inf so there always is one
+        i = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager that observes the elapsed seconds of its block."""
+        return _Timer(self)
+
+
+class _Metric(abc.ABC):
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, *values):
+        """Return the child for one combination of label values, creating it on first use."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes labels {self.labelnames}, got {values}"
+            )
+        values = tuple(str(value) for value in values)
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """Return a new child holding the value(s) for one label combination."""
+
+    @abc.abstractmethod
+    def _samples(self):
+        """Yield (sample name, formatted labels, value) for each exported sample."""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [
+            f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples()
+        ]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(threading.Lock())
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in list(self.children.items()):
+            yield self.name, _format_labels(self.labelnames, values), child.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(threading.Lock())
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def _samples(self):
+        for values, child in list(self.children.items()):
+            try:
+                value = child.get()
+            except Exception:
+                value = math.nan
+            yield self.name, _format_labels(self.labelnames, values), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _HistogramChild(threading.Lock(), self.bounds)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self):
+        for values, child in list(self.children.items()):
+            with child.lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, (("le", _format_value(bound)),))
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def get_or_create(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def render(self):
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labelnames=()):
+    return REGISTRY.get_or_create(Counter, name, help, labelnames)
+
+
+def gauge(name, help, labelnames=()):
+    return REGISTRY.get_or_create(Gauge, name, help, labelnames)
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+
+# Shared database metrics, used by every module that owns or writes through a
+# psycopg2 connection
+DB_WRITE_SECONDS = histogram(
+    "db_write_seconds", "Time to write and commit to the database, by table", ("table",)
+)
+DB_CONNECTION_UP = gauge(
+    "db_connection_up", "1 while the database connection is open", ("database",)
+)
+DB_TRANSACTION_STATUS = gauge(
+    "db_connection_transaction_status",
+    "psycopg2 transaction status: 0 idle, 1 active, 2 in transaction, 3 in error, -1 closed",
+    ("database",),
+)
+
+
+def track_connection(name, owner):
+    """Export the state of owner.conn, a psycopg2 connection that may be replaced or None."""
+
+    def is_open():
+        return 1 if owner.conn is not None and not owner.conn.closed else 0
+
+    DB_CONNECTION_UP.labels(name).set_function(is_open)
+    DB_TRANSACTION_STATUS.labels(name).set_function(
+        lambda: owner.conn.get_transaction_status() if is_open() else -1
+    )
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes would otherwise be logged to stderr every few seconds
+
+
+def start_http_server(port, addr=DEFAULT_METRICS_ADDR):
+    """
+    Serve /metrics from a daemon thread.
+
+    Args:
+                                    port (int): TCP port
+                                    addr (str): Address to bind; "" or "0.0.0.0" for all interfaces
+
+    Returns:
+                                    ThreadingHTTPServer: Call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    ).start()
+    build_logger(logging.INFO).info(f"✅ [Metrics] Serving /metrics on {addr or '*'}:{port}")
+    return server
@@ -0,0 +1,174 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Nearest-asset queries for dispatch, e.g. the five nearest available ESVs to an
+# incident.  Uses PostGIS KNN ordering (<->) on the GIST index of
+# tracked_assets.location, which the ingest path keeps at each asset's latest
+# position, so a query walks the index rather than measuring every asset.
+#
+#   python nearest_assets.py --config config.json --incident INC-2025-000001 --type ESV -k 5
+#   python nearest_assets.py --config config.json --lat 37.4419 --lon -122.1430
+
+import argparse
+import config as CF
+import json
+import log_setup as LG
+import scenario_db as DB
+
+DEFAULT_CFG = "/etc/situational-awareness/config.json"
+
+DEFAULT_K = 5
+DEFAULT_STATUSES = ("Available",)
+
+
+def build_logger(level: str):
+    return LG.get_logger("nearest_assets", level)
+
+
+def nearest_assets(
+    connection, lat, lon, k=DEFAULT_K, statuses=DEFAULT_STATUSES, type_codes=None
+):
+    """
+    Find the k assets nearest to a point.
+
+    Args:
+                                    connection: psycopg2 database connection object
+                                    lat (float): Latitude of the point
+                                    lon (float): Longitude of the point
+                                    k (int): Maximum number of assets to return
+                                    statuses (iterable, optional): Only assets with one of these statuses; None for any
+                                    type_codes (iterable, optional): Only assets of these types, e.g. ("ESV",)
+
+    Returns:
+                                    list: Dicts with asset_id, type_code, tactical_call, status, latitude, longitude
+                                          and distance_m (meters), nearest first
+
+    Raises:
+                                    Exception: If database operation fails
+    """
+
+    where_conditions = []
+    params = [lon, lat]
+    if statuses:
+        where_conditions.append("status = ANY(%s)")
+        params.append(list(statuses))
+    if type_codes:
+        where_conditions.append("type_code = ANY(%s)")
+        params.append([type_code.upper() for type_code in type_codes])
+    params.extend([lon, lat, k])
+
+    # <-> orders by planar distance in degrees, which the index can answer
+    # directly; distance_m is the true distance in meters for display
+    query = """
+		SELECT asset_id, type_code, tactical_call, status,
+		       ST_Y(location), ST_X(location),
+		       ST_Distance(location::geography, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography)
+		FROM tracked_assets
+		"""
+    if where_conditions:
+        query += " WHERE " + " AND ".join(where_conditions)
+    query += " ORDER BY location <-> ST_SetSRID(ST_MakePoint(%s, %s), 4326) LIMIT %s"
+
+    columns = [
+        "asset_id",
+        "type_code",
+        "tactical_call",
+        "status",
+        "latitude",
+        "longitude",
+        "distance_m",
+    ]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = [dict(zip(columns, record)) for record in cursor.fetchall()]
+        connection.commit()
+        return rows
+    except Exception as e:
+        connection.rollback()
+        raise Exception(f"Failed to find nearest assets: {e}")
+
+
+def incident_location(connection, incident_id):
+    """
+    Return the (lat, lon) of an incident.
+
+    Raises:
+                                    ValueError: If there is no incident with that ID
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT ST_Y(location), ST_X(location) FROM incidents WHERE incident_id = %s",
+            (incident_id,),
+        )
+        record = cursor.fetchone()
+    connection.commit()
+    if record is None:
+        raise ValueError(f"Incident {incident_id} not found")
+    return record
+
+
+# When invoked, pass the --config, typically pointing to
+# /etc/{installation-name}/config.json, and either --incident or --lat/--lon
+def main():
+    ap = argparse.ArgumentParser(description="nearest-assets")
+    ap.add_argument(
+        "--config",
+        default=DEFAULT_CFG,
+        help=f"Path to config file (default: {DEFAULT_CFG})",
+    )
+    ap.add_argument("--incident", help="Incident ID to search around")
+    ap.add_argument("--lat", type=float, help="Latitude to search around")
+    ap.add_argument("--lon", type=float, help="Longitude to search around")
+    ap.add_argument(
+        "-k",
+        type=int,
+        default=DEFAULT_K,
+        help=f"Number of assets to return (default: {DEFAULT_K})",
+    )
+    ap.add_argument(
+        "--status",
+        action="append",
+        help="Asset status to include; repeat for several (default: Available)",
+    )
+    ap.add_argument(
+        "--any-status",
+        action="store_true",
+        help="Include assets of any status",
+    )
+    ap.add_argument(
+        "--type",
+        action="append",
+        help="Asset type code to include; repeat for several (default: all types)",
+    )
+    args = ap.parse_args()
+    if args.incident is None and (args.lat is None or args.lon is None):
+        ap.error("either --incident or both --lat and --lon are required")
+
+    config_repo = CF.Config()  # singleton
+    config_repo.load("main", args.config)
+    config = config_repo.config("main")
+
+    logger = build_logger(config["database"].get("log_level", "INFO"))
+
+    database = DB.ScenarioDB(config)
+    if database.conn is None:
+        return
+
+    statuses = None if args.any_status else (args.status or DEFAULT_STATUSES)
+    try:
+        if args.incident is not None:
+            lat, lon = incident_location(database.conn, args.incident)
+        else:
+            lat, lon = args.lat, args.lon
+        rows = nearest_assets(database.conn, lat, lon, args.k, statuses, args.type)
+        print(json.dumps({"latitude": lat, "longitude": lon, "data": rows}, indent=2))
+    except Exception as e:
+        logger.error(f"❌ [Nearest] {e}")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,10 @@
 
 import argparse
 import config as CF
-import logging
+import log_setup as LG
+import metrics as MX
+import tracing as TR
+import profiler as PF
 import poplib as POP
 import time
 from email.parser import BytesParser
@@ -17,8 +20,12 @@ DEFAULT_CFG = "/etc/situational-awareness/config.json"
 
 
 def build_logger(level: str):
-    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(message)s")
-    return logging.getLogger("pop_client")
+    return LG.get_logger("pop_client", level)
+
+
+POLL_SECONDS = MX.histogram("pop_poll_seconds", "Time to connect, fetch and delete messages")
+MESSAGES_FETCHED = MX.counter("pop_messages_fetched_total", "Messages retrieved from the mailbox")
+POLL_FAILURES = MX.counter("pop_poll_failures_total", "Polls that ended in an error")
 
 
 class POPClient:
@@ -27,15 +34,17 @@ class POPClient:
         self.logger = logger
         self.pop_config = config.get("pop", {})
         self.host = self.pop_config.get("host", "pophost")
+        self.port = int(self.pop_config.get("port", POP.POP3_PORT))
         self.userid = userid
         self.password = password
         self.connection = None
 
+    @TR.traced("pop.connect")
     def _connect(self):
         message_count = 0
         try:
             if self.connection is None:
-                self.connection = POP.POP3(self.host)
+                self.connection = POP.POP3(self.host, self.port)
             self.connection.user(self.userid)
             self.connection.pass_(self.password)
             message_list = self.connection.list()[1]
@@ -48,12 +57,15 @@ class POPClient:
         self.connection.quit()
         self.connection = None
 
+    @TR.traced("pop.poll")
     def messages(self):
+        started = time.perf_counter()
         try:
             messages = []
             n_messages = self._connect()
             for i in range(1, n_messages + 1):
-                lines = self.connection.retr(i)[1]
+                with TR.span("pop.retrieve", message=i):
+                    lines = self.connection.retr(i)[1]
                 message_data = b"\n".join(lines)
                 msg = message_from_bytes(message_data, policy=default)
                 headers = {}
@@ -74,11 +86,15 @@ class POPClient:
                             body.replace("\r\n", "\n").replace("\n\n", "\n").strip()
                         )
                 messages.append({"headers": headers, "body": clean_body})
-                self.connection.dele(i)
+                with TR.span("pop.delete", message=i):
+                    self.connection.dele(i)
         except Exception as e:
+            POLL_FAILURES.inc()
             self.logger.info(f"❌ [POP] Could not retrieve messages: {e}")
         finally:
             self._close()
+            MESSAGES_FETCHED.inc(len(messages))
+            POLL_SECONDS.observe(time.perf_counter() - started)
             return messages
 
 
@@ -94,6 +110,12 @@ def main():
             default=DEFAULT_CFG,
             help=f"Path to config file (default: {DEFAULT_CFG})",
         )
+        ap.add_argument(
+            "--profile",
+            type=float,
+            metavar="SECONDS",
+            help="Profile for SECONDS from startup (SIGUSR1 starts a profile at any time)",
+        )
         args = ap.parse_args()
 
         config_repo = CF.Config()  # singleton
@@ -101,12 +123,25 @@ def main():
         config = config_repo.config("main")
         pop_config = config.get("pop", {})
 
+        LG.configure_from_config(config)
+        TR.configure_from_config(config)
         logger = build_logger(config["pop"].get("log_level", "INFO"))
         logger.info("✅ [POP] Logging is active")
 
+        sampler = PF.StackSampler.from_config("pop", config, logger)
+        sampler.install_signal_handler()
+        if args.profile:
+            sampler.start(args.profile)
+
         damage_userid = pop_config.get("damage_userid", "unknown")
         damage_password = pop_config.get("damage_password", "unknown")
 
+        metrics_port = pop_config.get("metrics_port", None)
+        if metrics_port is not None:
+            MX.start_http_server(
+                int(metrics_port), pop_config.get("metrics_addr", MX.DEFAULT_METRICS_ADDR)
+            )
+
         while True:
             # Get damage reports
             client = POPClient(config, damage_userid, damage_password, logger)
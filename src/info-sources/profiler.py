@@ -0,0 +1,124 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# On-demand sampling profiler for the info-source daemons.  Nothing runs until a
+# profile is requested with SIGUSR1 or the daemon's --profile flag; then a
+# background thread samples every thread's stack for a fixed window and writes
+# the counts as collapsed stacks ("thread;outer;...;inner count"), the input
+# format of flamegraph.pl, speedscope and similar tools.
+#
+#   kill -USR1 <pid>        profile for the configured duration
+#
+# Settings come from the optional "profiling" config section:
+#   {"directory": "/var/log/situational-awareness/profiles", "duration": 30, "interval": 0.01}
+
+import log_setup as LG
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_SETTINGS = {
+    "directory": "/var/log/situational-awareness/profiles",
+    "duration": 30,  # seconds per profile
+    "interval": 0.01,  # seconds between samples
+}
+
+
+def build_logger(level: str):
+    return LG.get_logger("profiler", level)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    def __init__(self, name, directory, duration, interval, logger=None):
+        self.name = name
+        self.directory = directory
+        self.duration = duration
+        self.interval = interval
+        self.logger = logger or build_logger("INFO")
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, name, config, logger=None):
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(config.get("profiling", {}))
+        return cls(
+            name,
+            settings["directory"],
+            float(settings["duration"]),
+            float(settings["interval"]),
+            logger,
+        )
+
+    def start(self, duration=None):
+        """
+        Begin a profile in the background.
+
+        Returns:
+                                    bool: False if a profile is already running
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self.logger.info("🚨 [Profiler] A profile is already running")
+            return False
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(duration or self.duration,),
+            name="profiler",
+            daemon=True,
+        )
+        self._thread.start()
+        return True
+
+    def install_signal_handler(self, signum=signal.SIGUSR1):
+        """Start a profile whenever the process receives signum.  Call from the main thread."""
+        signal.signal(signum, lambda received, frame: self.start())
+
+    def _sample(self, counts, own_id, thread_names):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, str(thread_id)))
+            counts[";".join(reversed(stack))] += 1
+
+    def _run(self, duration):
+        own_id = threading.get_ident()
+        counts = Counter()
+        samples = 0
+        self.logger.info(
+            f"🚨 [Profiler] Sampling every {self.interval}s for {duration}s"
+        )
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            # Names are refreshed each sample because threads come and go
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            self._sample(counts, own_id, thread_names)
+            samples += 1
+            time.sleep(self.interval)
+        try:
+            path = self._write(counts)
+            self.logger.info(
+                f"✅ [Profiler] {samples} samples, {len(counts)} distinct stacks written to {path}"
+            )
+        except Exception as e:
+            self.logger.error(f"❌ [Profiler] Could not write profile: {e}")
+
+    def _write(self, counts):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{self.name}-{stamp}-{os.getpid()}.collapsed")
+        with open(path, "w") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
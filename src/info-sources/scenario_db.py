@@ -8,11 +8,13 @@ import psycopg2
 import config as CF
 import argparse
 import logging
+import log_setup as LG
+import metrics as MX
+import tracing as TR
 
 
 def build_logger(level: str):
-    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(message)s")
-    return logging.getLogger("scenario_db")
+    return LG.get_logger("scenario_db", level)
 
 
 def singleton(cls):
@@ -42,6 +44,7 @@ class ScenarioDB:
         self.assets_dict = {}
         self.type_codes_set = set()
         self.type_list = []
+        MX.track_connection("scenario", self)
         try:
             self.conn = psycopg2.connect(
                 f"dbname={self.dbname} user={self.user} host={self.host} password={self.password} port={self.port}"
@@ -116,13 +119,18 @@ class trackedAssetCondition:
         )
 
 
+# Shared by every asset and asset type object rather than built per instance
+ASSET_LOGGER = build_logger(logging.INFO)
+
+
 class trackedAssetType:
+    logger = ASSET_LOGGER
+
     def __init__(self, type_code, type_name, organization, icon="default.png"):
         self.type_code = type_code
         self.type_name = type_name
         self.organization = organization
         self.icon = icon
-        self.logger = build_logger(logging.INFO)
 
     def insert(self, database):
         db_cursor = database.cursor
@@ -146,7 +154,7 @@ class trackedAssetType:
                 ),
             )
             database.conn.commit()
-            self.logger.info(f"✅ [Database] Inserted asset type: {self.type_name}")
+            self.logger.info("✅ [Database] Inserted asset type: %s", self.type_name)
         except Exception as e:
             self.logger.info(
                 f"❌ [Database] Error inserting asset type {self.type_name}: {e}"
@@ -154,6 +162,8 @@ class trackedAssetType:
 
 
 class trackedAsset:
+    logger = ASSET_LOGGER
+
     def __init__(
         self, asset_id, type_code, tactical_call, location, description, url=""
     ):
@@ -161,7 +171,6 @@ class trackedAsset:
         self.type_code = type_code
         self.tactical_call = tactical_call
         self.description = description
-        self.logger = build_logger(logging.INFO)
         self.location = location
         self.url = url
         self.condition = trackedAssetCondition()
@@ -176,52 +185,55 @@ class trackedAsset:
             )
             return
         try:
-            db_cursor.execute(
-                """
+            with MX.DB_WRITE_SECONDS.labels("tracked_asset_locations").time(), TR.span(
+                "db.asset_update", asset_id=self.asset_id
+            ):
+                db_cursor.execute(
+                    """
 				INSERT INTO tracked_assets (asset_id, type_code, tactical_call, description, location, status, url, condition_type, condition_severity)
 				VALUES (%s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s, %s, %s, %s)
 				ON CONFLICT (asset_id) DO UPDATE SET
-                location = EXCLUDED.location,
-                status = EXCLUDED.status,
-                condition_type = EXCLUDED.condition_type,
-                condition_severity = EXCLUDED.condition_severity;
+                    location = EXCLUDED.location,
+                    status = EXCLUDED.status,
+                    condition_type = EXCLUDED.condition_type,
+                    condition_severity = EXCLUDED.condition_severity;
 				""",
-                (
-                    self.asset_id,
-                    self.type_code,
-                    self.tactical_call,
-                    self.description,
-                    self.location["lon"],
-                    self.location["lat"],
-                    self.status,
-                    self.url,
-                    self.condition.type,
-                    self.condition.severity,
-                ),
-            )
+                    (
+                        self.asset_id,
+                        self.type_code,
+                        self.tactical_call,
+                        self.description,
+                        self.location["lon"],
+                        self.location["lat"],
+                        self.status,
+                        self.url,
+                        self.condition.type,
+                        self.condition.severity,
+                    ),
+                )
 
-            db_cursor.execute(
-                """
+                db_cursor.execute(
+                    """
 				INSERT INTO tracked_asset_locations (asset_id, activity, location, status, condition_type, condition_severity)
 				VALUES (%s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s, %s, %s);
 				""",
-                (
-                    self.asset_id,
-                    self.activity,
-                    self.location["lon"],
-                    self.location["lat"],
-                    self.status,
-                    self.condition.type,
-                    self.condition.severity,
-                ),
-            )
+                    (
+                        self.asset_id,
+                        self.activity,
+                        self.location["lon"],
+                        self.location["lat"],
+                        self.status,
+                        self.condition.type,
+                        self.condition.severity,
+                    ),
+                )
 
-            database.conn.commit()
-            self.logger.info(f"✅ [Database] Updated asset: {self.asset_id}")
-        except Exception as e:
+                database.conn.commit()
             self.logger.info(
-                f"❌ [Database] Error inserting asset {self.asset_id}: {e}"
+                "✅ [Database] Updated asset: %s", self.asset_id, extra=LG.PER_PACKET
             )
+        except Exception as e:
+            self.logger.info("❌ [Database] Error inserting asset %s: %s", self.asset_id, e)
             return False
         return True
 
@@ -0,0 +1,276 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Tracing spans for the packet-to-database and mail-to-database paths.
+#
+# A span times one stage (name lookup, Mattermost callback, database commit, ...)
+# and nests under the span already open on the same thread, so each packet or
+# poll becomes one trace.  Finished spans are appended to a local NDJSON file
+# and, if "otel" is set and the opentelemetry package is installed, also
+# recorded through the OpenTelemetry API.  With tracing disabled, span() returns
+# a shared no-op.
+#
+# Settings come from the optional "tracing" config section:
+#   {"enabled": false, "file": "spans.ndjson", "otel": false}
+#
+#   python tracing.py spans.ndjson                          per-stage latency breakdown
+#   python tracing.py spans.ndjson --root meshtastic.packet
+
+import argparse
+import atexit
+import functools
+import json
+import log_setup as LG
+import os
+import threading
+import time
+
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "file": "spans.ndjson",
+    "otel": False,
+}
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_output = None
+_otel_tracer = None
+
+
+def build_logger(level: str):
+    return LG.get_logger("tracing", level)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _otel_value(value):
+    # OpenTelemetry attributes must be primitives
+    return value if isinstance(value, (bool, int, float, str)) else str(value)
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "attributes",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "started",
+        "otel_context",
+        "otel_span",
+    )
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.otel_context = None
+
+    def set(self, key, value):
+        """Attach an attribute learned while the span is open."""
+        self.attributes[key] = value
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        parent = stack[-1] if stack else None
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent else None
+        stack.append(self)
+        if _otel_tracer is not None:
+            self.otel_context = _otel_tracer.start_as_current_span(self.name)
+            self.otel_span = self.otel_context.__enter__()
+        self.start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        if self.otel_context is not None:
+            for key, value in self.attributes.items():
+                self.otel_span.set_attribute(key, _otel_value(value))
+            self.otel_context.__exit__(exc_type, exc, tb)
+        line = json.dumps(
+            {
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "name": self.name,
+                "start": self.start,
+                "duration_ms": duration * 1000.0,
+                "attributes": self.attributes,
+            },
+            default=str,
+        )
+        output = _output
+        if output is not None:
+            with _write_lock:
+                output.write(line + "\n")
+        return False
+
+
+def span(name, **attributes):
+    """Return a context manager timing one stage; a no-op when tracing is off."""
+    if _output is None:
+        return _NOOP
+    return Span(name, attributes)
+
+
+def traced(name):
+    """Decorator that runs every call of the function inside span(name)."""
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _output is None:
+                return function(*args, **kwargs)
+            with Span(name, {}):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def configure(enabled=False, path=DEFAULT_SETTINGS["file"], otel=False):
+    """Turn span recording on or off.  Spans are appended to path, line buffered."""
+    global _output, _otel_tracer
+    logger = build_logger("INFO")
+    with _write_lock:
+        if _output is not None:
+            _output.close()
+            _output = None
+    _otel_tracer = None
+    if not enabled:
+        return
+    if otel:
+        try:
+            from opentelemetry import trace
+
+            _otel_tracer = trace.get_tracer("situational-awareness")
+        except ImportError:
+            logger.warning(
+                "🚨 [Tracing] opentelemetry is not installed; recording to the span file only"
+            )
+    _output = open(path, "a", buffering=1)
+    logger.info(f"✅ [Tracing] Recording spans to {path}")
+
+
+def configure_from_config(config):
+    """Configure tracing from the "tracing" section of a loaded config dict."""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(config.get("tracing", {}))
+    configure(settings["enabled"], settings["file"], settings["otel"])
+
+
+atexit.register(configure, False)
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(lines, root=None):
+    """
+    Per-stage latency breakdown of recorded spans.
+
+    Args:
+                                    lines (iterable): NDJSON span records, e.g. an open span file
+                                    root (str, optional): Only count traces whose root span has this name
+
+    Returns:
+                                    list: One dict per span name with count, mean_ms, p50_ms, p95_ms, max_ms and
+                                          share (of the summed root span time), slowest total first
+    """
+
+    spans = [json.loads(line) for line in lines if line.strip()]
+    if root is not None:
+        traces = {
+            s["trace_id"] for s in spans if s["parent_id"] is None and s["name"] == root
+        }
+        spans = [s for s in spans if s["trace_id"] in traces]
+    root_total = sum(s["duration_ms"] for s in spans if s["parent_id"] is None)
+
+    durations = {}
+    for s in spans:
+        durations.setdefault(s["name"], []).append(s["duration_ms"])
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        total = sum(values)
+        rows.append(
+            {
+                "name": name,
+                "count": len(values),
+                "mean_ms": total / len(values),
+                "p50_ms": _percentile(values, 0.50),
+                "p95_ms": _percentile(values, 0.95),
+                "max_ms": values[-1],
+                "share": total / root_total if root_total else 0.0,
+                "_total": total,
+            }
+        )
+    rows.sort(key=lambda row: row["_total"], reverse=True)
+    for row in rows:
+        del row["_total"]
+    return rows
+
+
+def _format_table(rows):
+    lines = [
+        f"{'stage':<32} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'share':>6}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['name']:<32} {row['count']:>7} {row['mean_ms']:>9.2f} {row['p50_ms']:>9.2f} "
+            f"{row['p95_ms']:>9.2f} {row['max_ms']:>9.2f} {row['share']:>6.0%}"
+        )
+    return "\n".join(lines)
+
+
+# When invoked, pass the span file written by a daemon with tracing enabled
+def main():
+    ap = argparse.ArgumentParser(description="trace-summary")
+    ap.add_argument("path", help="Span file (NDJSON)")
+    ap.add_argument(
+        "--root",
+        help="Only include traces rooted at this span name, e.g. meshtastic.packet",
+    )
+    ap.add_argument(
+        "--json",
+        action="store_true",
+        help="Print JSON instead of a table",
+    )
+    args = ap.parse_args()
+
+    with open(args.path) as f:
+        rows = summarize(f, args.root)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(_format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# Situational Awareness Application
+
+# Copyright © 2025 by Bob Iannucci.  All rights reserved worldwide.
+
+# Track playback.  Builds one simplified line per asset for a time window from
+# tracked_asset_locations (or its 1-minute rollup) and streams the tracks as
+# GeoJSON features, so replaying an incident never ships raw position rows.
+#
+#   python track_playback.py --config config.json --start 2025-09-24T17:00 --end 2025-09-24T21:00
+#   python track_playback.py --config config.json --start ... --end ... --asset KK6ABC --ndjson
+
+import argparse
+import config as CF
+import json
+import log_setup as LG
+import sys
+from dateutil import parser as date_parser
+import scenario_db as DB
+
+DEFAULT_CFG = "/etc/situational-awareness/config.json"
+
+# Douglas-Peucker tolerance in meters.  Positions are stored in SRID 4326, so the
+# tolerance is converted to degrees with METERS_PER_DEGREE.  A degree of longitude
+# is about 20% shorter at Palo Alto's latitude, so east-west the tolerance is about
+# 8 m instead of 10 and tracks are simplified slightly less; fine for playback.
+DEFAULT_TOLERANCE_M = 10.0
+METERS_PER_DEGREE = 111320.0
+
+# Where tracks are read from: raw positions, or the per-minute rollup maintained
+# by location_policies.py
+TRACK_SOURCES = {
+    "raw": ("tracked_asset_locations", "timestamp"),
+    "1m": ("tracked_asset_positions_1m", "bucket"),
+}
+
+# Rows fetched per round trip from the server-side cursor
+FETCH_SIZE = 50
+
+
+def build_logger(level: str):
+    return LG.get_logger("track_playback", level)
+
+
+def _track_query(source, asset_ids):
+    table, time_column = TRACK_SOURCES[source]
+    # (asset_id, timestamp) is the primary key of tracked_asset_locations, so the
+    # asset filter plus time range is a range scan of that index per asset
+    where_conditions = [f"{time_column} >= %s", f"{time_column} < %s"]
+    if asset_ids:
+        where_conditions.append("asset_id = ANY(%s)")
+    # A one-point line is not valid GeoJSON, so a lone fix becomes a Point
+    return f"""
+		SELECT asset_id,
+		       COUNT(*) AS points,
+		       MIN({time_column}) AS started_at,
+		       MAX({time_column}) AS ended_at,
+		       CASE WHEN COUNT(*) > 1
+		            THEN ST_AsGeoJSON(ST_SimplifyPreserveTopology(
+		                     ST_MakeLine(location ORDER BY {time_column}), %s), 6)
+		            ELSE ST_AsGeoJSON((ARRAY_AGG(location))[1], 6)
+		       END AS geometry
+		FROM {table}
+		WHERE {' AND '.join(where_conditions)}
+		GROUP BY asset_id
+		ORDER BY asset_id
+		"""
+
+
+def iter_tracks(
+    connection,
+    start_time,
+    end_time,
+    asset_ids=None,
+    tolerance_m=DEFAULT_TOLERANCE_M,
+    source="raw",
+):
+    """
+    Yield one GeoJSON Feature per asset that reported in [start_time, end_time).
+    Rows come from a server-side cursor, so memory use is bounded by FETCH_SIZE
+    tracks however many assets are in the window.
+
+    Args:
+                                    connection: psycopg2 database connection object
+                                    start_time (str or datetime): Window start, inclusive (parseable datetime string)
+                                    end_time (str or datetime): Window end, exclusive (parseable datetime string)
+                                    asset_ids (iterable, optional): Restrict to these assets
+                                    tolerance_m (float): Simplification tolerance in meters; 0 keeps every vertex
+                                    source (str): "raw" or "1m", see TRACK_SOURCES
+
+    Yields:
+                                    dict: GeoJSON Feature with asset_id, points, started_at and ended_at properties
+
+    Raises:
+                                    ValueError: If source is unknown or the window is empty
+                                    Exception: If database operation fails
+    """
+
+    if source not in TRACK_SOURCES:
+        raise ValueError(f"source must be one of {sorted(TRACK_SOURCES)}, got '{source}'")
+    if isinstance(start_time, str):
+        start_time = date_parser.parse(start_time)
+    if isinstance(end_time, str):
+        end_time = date_parser.parse(end_time)
+    if end_time <= start_time:
+        raise ValueError(f"end_time ({end_time}) must be after start_time ({start_time})")
+
+    asset_ids = list(asset_ids) if asset_ids else None
+    params = [tolerance_m / METERS_PER_DEGREE, start_time, end_time]
+    if asset_ids:
+        params.append(asset_ids)
+
+    try:
+        with connection.cursor(name="track_playback") as cursor:
+            cursor.itersize = FETCH_SIZE
+            cursor.execute(_track_query(source, asset_ids), params)
+            for asset_id, points, started_at, ended_at, geometry in cursor:
+                yield {
+                    "type": "Feature",
+                    "geometry": json.loads(geometry),
+                    "properties": {
+                        "asset_id": asset_id,
+                        "points": points,
+                        "started_at": started_at.isoformat(),
+                        "ended_at": ended_at.isoformat(),
+                    },
+                }
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        raise Exception(f"Failed to retrieve asset tracks: {e}")
+
+
+def write_tracks(features, fp, format="geojson") -> int:
+    """
+    Stream track features to a file object one feature at a time.
+
+    Args:
+                                    features (iterable): GeoJSON Features, e.g. from iter_tracks(); may be a generator
+                                    fp: Text file object to write to
+                                    format (str): "geojson" for a FeatureCollection, "ndjson" for one Feature per line
+
+    Returns:
+                                    int: Number of features written
+
+    Raises:
+                                    ValueError: If format is not recognized
+    """
+
+    if format not in ("geojson", "ndjson"):
+        raise ValueError(f"format must be 'geojson' or 'ndjson', got '{format}'")
+
+    count = 0
+    if format == "geojson":
+        fp.write('{"type": "FeatureCollection", "features": [')
+    for feature in features:
+        if format == "geojson":
+            fp.write(",\n" if count > 0 else "\n")
+            fp.write(json.dumps(feature))
+        else:
+            fp.write(json.dumps(feature))
+            fp.write("\n")
+        count += 1
+    if format == "geojson":
+        fp.write("\n]}\n")
+    return count
+
+
+# When invoked, pass the --config, typically pointing to
+# /etc/{installation-name}/config.json, and the playback window
+def main():
+    ap = argparse.ArgumentParser(description="track-playback")
+    ap.add_argument(
+        "--config",
+        default=DEFAULT_CFG,
+        help=f"Path to config file (default: {DEFAULT_CFG})",
+    )
+    ap.add_argument("--start", required=True, help="Window start (inclusive)")
+    ap.add_argument("--end", required=True, help="Window end (exclusive)")
+    ap.add_argument(
+        "--asset",
+        action="append",
+        help="Asset ID to include; repeat for several (default: all assets)",
+    )
+    ap.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE_M,
+        help=f"Simplification tolerance in meters (default: {DEFAULT_TOLERANCE_M})",
+    )
+    ap.add_argument(
+        "--source",
+        choices=sorted(TRACK_SOURCES),
+        default="raw",
+        help="Read raw positions or the 1-minute rollup (default: raw)",
+    )
+    ap.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Print one feature per line instead of a FeatureCollection",
+    )
+    args = ap.parse_args()
+
+    config_repo = CF.Config()  # singleton
+    config_repo.load("main", args.config)
+    config = config_repo.config("main")
+
+    logger = build_logger(config["database"].get("log_level", "INFO"))
+
+    database = DB.ScenarioDB(config)
+    if database.conn is None:
+        return
+
+    try:
+        features = iter_tracks(
+            database.conn,
+            args.start,
+            args.end,
+            asset_ids=args.asset,
+            tolerance_m=args.tolerance,
+            source=args.source,
+        )
+        count = write_tracks(
+            features, sys.stdout, format="ndjson" if args.ndjson else "geojson"
+        )
+        logger.info(f"✅ [Tracks] Wrote {count} tracks")
+    except Exception as e:
+        logger.error(f"❌ [Tracks] {e}")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()